@@ -0,0 +1,5 @@
+"""Offline benchmarks of the tool.
+
+The benchmarks run the tool's graphs and components with a scripted fake chat model and hash-based fake embeddings,
+so they measure the overhead of the tool itself, without any network access. See `python -m benchmarks --help`.
+"""
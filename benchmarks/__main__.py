@@ -0,0 +1,78 @@
+"""Offline benchmarks of the tool.
+
+Usage:
+    python -m benchmarks [SCENARIO ...] [--repeat N] [--baseline PATH] [--tolerance T] [--update-baseline]
+
+Each scenario runs N times. The report contains the median and 95th percentile latency and the peak memory
+allocated by a single run. If any scenario is slower or allocates more than its baseline by more than
+the tolerance fraction, the command exits with a non-zero status.
+
+The latencies depend on the machine, so the baseline is not part of the repository. Store it with
+--update-baseline on the machine running the benchmarks, before making the measured changes.
+"""
+
+from __future__ import annotations
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+from tool.llm import set_chat_model_factory
+from tool.logs import TOOL_NAME
+from tool.parsers import _task_extractor
+from benchmarks.runner import (
+    format_report,
+    load_baseline,
+    measure,
+    regressions,
+    save_baseline,
+)
+from benchmarks.scenarios import SCENARIOS, chat_model
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_REPEAT = 10
+DEFAULT_TOLERANCE = 1.0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    names = [scenario.name for scenario in SCENARIOS]
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"Scenarios to run, all by default: {', '.join(names)}."
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Store the measurements as the new baseline."
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(names)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+
+    logging.getLogger(TOOL_NAME).setLevel(logging.WARNING)
+    set_chat_model_factory(chat_model)
+    _task_extractor.cache_clear()
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    baseline = load_baseline(args.baseline)
+    with tempfile.TemporaryDirectory() as path:
+        measurements = [measure(scenario, path, args.repeat) for scenario in scenarios]
+    print(format_report(measurements, baseline))
+    if not baseline and not args.update_baseline:
+        print(f"No baseline in '{args.baseline}'. Store it with --update-baseline.")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, measurements)
+        print(f"Baseline stored in '{args.baseline}'.")
+        return 0
+    found = regressions(measurements, baseline, args.tolerance)
+    for regression in found:
+        print(f"Regression: {regression}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
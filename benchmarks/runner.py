@@ -0,0 +1,111 @@
+from __future__ import annotations
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from benchmarks.scenarios import Scenario
+
+
+class Measurement(NamedTuple):
+    """Latencies of the runs of a scenario in milliseconds and the peak memory allocated by a single run in KiB."""
+
+    scenario: str
+    runs: int
+    p50_ms: float
+    p95_ms: float
+    peak_kib: float
+
+
+def measure(scenario: Scenario, path: str, repeat: int) -> Measurement:
+    """Run the scenario `repeat` times and measure the latencies. Then run it once more, tracing the memory
+    allocations, since tracing slows the run down. Each run gets its own directory in `path`.
+
+    The scenario is run once before the measurement, so the one-time costs of the process, e.g. lazy imports,
+    are not attributed to the first run.
+    """
+    assert repeat > 0, "The scenario must run at least once."
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenario.setup(os.path.join(path, scenario.name, "warm_up"))()
+        for i in range(repeat):
+            run = scenario.setup(os.path.join(path, scenario.name, str(i)))
+            start = time.perf_counter()
+            run()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        run = scenario.setup(os.path.join(path, scenario.name, "traced"))
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return Measurement(
+        scenario.name, repeat, statistics.median(latencies), _p95(latencies), peak / 1024
+    )
+
+
+def _p95(values: list[float]) -> float:
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=20, method="inclusive")[18]
+
+
+def load_baseline(path: str) -> dict[str, Measurement]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {name: Measurement(name, **values) for name, values in json.load(f).items()}
+
+
+def save_baseline(path: str, measurements: list[Measurement]) -> None:
+    baseline = load_baseline(path)
+    baseline.update((m.scenario, m) for m in measurements)
+    with open(path, "w") as f:
+        json.dump(
+            {
+                name: {k: round(v, 3) for k, v in m._asdict().items() if k != "scenario"}
+                for name, m in sorted(baseline.items())
+            },
+            f,
+            indent=4,
+        )
+        f.write("\n")
+
+
+def regressions(
+    measurements: list[Measurement], baseline: dict[str, Measurement], tolerance: float
+) -> list[str]:
+    """Describe the measurements exceeding their baseline by more than the `tolerance` fraction.
+    Both the 95th percentile latency and the peak memory are compared."""
+    found = []
+    for m in measurements:
+        base = baseline.get(m.scenario)
+        if base is None:
+            continue
+        for metric in ("p95_ms", "peak_kib"):
+            value, limit = getattr(m, metric), getattr(base, metric) * (1 + tolerance)
+            if value > limit:
+                found.append(f"{m.scenario}: {metric} {value:.1f} exceeds {limit:.1f}")
+    return found
+
+
+def format_report(measurements: list[Measurement], baseline: dict[str, Measurement]) -> str:
+    rows = [
+        f"{'scenario':<28}{'runs':>6}{'p50 ms':>12}{'p95 ms':>12}{'peak KiB':>12}"
+        f"{'base p95':>12}{'change':>10}"
+    ]
+    for m in measurements:
+        base = baseline.get(m.scenario)
+        base_p95 = f"{base.p95_ms:.1f}" if base else "-"
+        change = f"{(m.p95_ms / base.p95_ms - 1) * 100:+.0f} %" if base and base.p95_ms else "-"
+        rows.append(
+            f"{m.scenario:<28}{m.runs:>6}{m.p50_ms:>12.1f}{m.p95_ms:>12.1f}{m.peak_kib:>12.0f}"
+            f"{base_p95:>12}{change:>10}"
+        )
+    return "\n".join(rows)
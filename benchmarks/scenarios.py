@@ -0,0 +1,163 @@
+from __future__ import annotations
+import abc
+import json
+from typing import Any, Callable
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from tool.components import Components
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.memory.recaller import Recaller
+from tool.memory.solution_db import get_solution_database
+from tool.memory.thresholds import NO_THRESHOLDS
+from tool.models import Solution, Test
+from tool.solver import Solver
+from tool.validator import Validator
+from tool.validator.code import implementation_cache
+from tool.validator.critic import critique_cache
+
+
+EMBEDDING_SIZE = 64
+TASK = "What is the answer?"
+CODE_TESTS = 10
+RESOURCES = 50
+STORED_SOLUTIONS = 200
+
+
+RESOURCE_TASK = "Sum the physical constants."
+RESOURCE_REQUESTS = [
+    f"I need to find the value of the constant no. {i}. I expect to get it as a number."
+    for i in range(RESOURCES)
+]
+
+
+def _resource_requests(prompt: str) -> str:
+    return json.dumps(RESOURCE_REQUESTS if RESOURCE_TASK in prompt else [])
+
+
+# Replies to the prompts of the scenarios, falling back to the replies for the whole pipeline.
+RULES: list[tuple[str, Any]] = [
+    ("You must pick the first Recalled solution", "0"),
+    ("convert a test description into a test code", "assert add(1, 2) == 3\nprint('passed')"),
+    ("collects for me a knowledge", _resource_requests),
+    ("helps me to find answer or solution", "The value is 42."),
+    *PIPELINE_RULES,
+]
+
+
+def chat_model(_: str) -> ScriptedChatModel:
+    return ScriptedChatModel(rules=RULES)
+
+
+def embeddings() -> Embeddings:
+    return DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+
+
+class Scenario(abc.ABC):
+    """A piece of work of the tool to be benchmarked.
+
+    Before each measured run, `setup` prepares everything the run needs in the directory at `path` and returns
+    the run itself. Only the run is measured.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def setup(self, path: str) -> Callable[[], object]:
+        """Prepare the run in the directory at `path` and return it."""
+
+
+class ColdStart(Scenario):
+    """Create all the components with an empty memory and solve a task."""
+
+    name = "cold_start"
+
+    def setup(self, path: str) -> Callable[[], object]:
+        _clear_caches()
+        return lambda: Solver(path, Components(path, embeddings())).invoke(TASK)
+
+
+class ExactMatchHit(Scenario):
+    """Solve a task, that has already been solved, by the solver working with the same memory."""
+
+    name = "exact_match_hit"
+
+    def setup(self, path: str) -> Callable[[], object]:
+        solver = Solver(path, Components(path, embeddings()))
+        solver.invoke(TASK)
+        return lambda: solver.invoke(TASK)
+
+
+class WarmRecallHit(Scenario):
+    """Recall a directly usable solution from a memory holding many solutions. The distances of the fake
+    embeddings carry no meaning, so all the recalled solutions are judged by the model."""
+
+    name = "warm_recall_hit"
+
+    def __init__(self) -> None:
+        self._recaller: Recaller | None = None
+
+    def setup(self, path: str) -> Callable[[], object]:
+        if self._recaller is None:
+            db = get_solution_database(path, embeddings())
+            db.add_many(
+                [
+                    Solution(
+                        task=f"Add numbers no. {i}",
+                        context="Math",
+                        requirements=["The result is the sum."],
+                        solution=f"{i} + {i}",
+                    )
+                    for i in range(STORED_SOLUTIONS)
+                ]
+            )
+            self._recaller = Recaller(db=db, thresholds=NO_THRESHOLDS)
+        recaller = self._recaller
+        return lambda: recaller.recall(
+            Solution(
+                task="Add numbers no. 7", context="Math", requirements=["The result is the sum."]
+            )
+        )
+
+
+class CodeValidation(Scenario):
+    """Write and run the code of 10 tests of a code solution and criticize the results."""
+
+    name = f"code_validation_{CODE_TESTS}_tests"
+
+    def setup(self, path: str) -> Callable[[], object]:
+        _clear_caches()
+        validator = Validator()
+        solution = Solution(
+            task="Add two numbers.",
+            context="Math",
+            form="code",
+            solution="def add(a, b):\n    return a + b",
+            tests=[Test(description=f"Test no. {i}: add(1, 2) is 3.") for i in range(CODE_TESTS)],
+        )
+        return lambda: validator.review(solution)
+
+
+class ResourceFanOut(Scenario):
+    """Get 50 resources, that are not in the memory yet, from the provider and store them."""
+
+    name = f"resource_fan_out_{RESOURCES}"
+
+    def setup(self, path: str) -> Callable[[], object]:
+        resource_manager = Components(path, embeddings()).resource_manager
+        solution = Solution(task=RESOURCE_TASK, context="Physics", structure=["Sum them."])
+        return lambda: resource_manager.invoke(solution)
+
+
+SCENARIOS: list[Scenario] = [
+    ColdStart(),
+    ExactMatchHit(),
+    WarmRecallHit(),
+    CodeValidation(),
+    ResourceFanOut(),
+]
+
+
+def _clear_caches() -> None:
+    implementation_cache.clear()
+    critique_cache.clear()
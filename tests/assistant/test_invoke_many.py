@@ -0,0 +1,64 @@
+import asyncio
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.assistant import Assistant
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.parsers import _task_extractor
+
+
+def _requirements(prompt: str) -> str:
+    if "FAIL" in prompt:
+        return "This is not a JSON list."
+    return '["The answer is a number."]'
+
+
+RULES = [("thinks about requirements on the solution", _requirements), *PIPELINE_RULES]
+
+
+class Test_Invoke_Many(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=RULES, latency=0.02))
+        _task_extractor.cache_clear()
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+        self.assistant = Assistant(self.memory_path, components)
+        self.tasks = ["What is the answer no. 0?", "FAIL this task.", "What is the answer no. 2?"]
+
+    def test_every_task_gets_its_result(self):
+        results = sorted(self.assistant.invoke_many(self.tasks, max_concurrency=2))
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        self.assertEqual([r.task for r in results], self.tasks)
+
+    def test_failed_task_does_not_affect_the_others(self):
+        results = sorted(self.assistant.invoke_many(self.tasks, max_concurrency=3))
+        self.assertIsNone(results[1].message)
+        self.assertIsNotNone(results[1].error)
+        for result in (results[0], results[2]):
+            self.assertIsNone(result.error)
+            assert result.message is not None
+            self.assertEqual(result.message.content, "The answer is 42.")
+
+    def test_results_are_yielded_asynchronously(self):
+        async def collect():
+            return [r async for r in self.assistant.ainvoke_many(self.tasks, max_concurrency=2)]
+
+        results = sorted(asyncio.run(collect()))
+        self.assertEqual([r.error is None for r in results], [True, False, True])
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        if os.path.exists(self.memory_path):
+            shutil.rmtree(self.memory_path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
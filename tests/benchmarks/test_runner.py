@@ -0,0 +1,40 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from benchmarks.runner import Measurement, load_baseline, measure, regressions, save_baseline
+from benchmarks.scenarios import WarmRecallHit, chat_model
+from tool.llm import set_chat_model_factory
+
+
+class Test_Benchmark_Runner(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(chat_model)
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        os.makedirs(self.path)
+
+    def test_scenario_is_measured_offline(self):
+        measurement = measure(WarmRecallHit(), self.path, repeat=3)
+        self.assertEqual((measurement.scenario, measurement.runs), ("warm_recall_hit", 3))
+        self.assertLessEqual(measurement.p50_ms, measurement.p95_ms)
+        self.assertGreater(measurement.peak_kib, 0)
+
+    def test_measurements_exceeding_baseline_are_reported(self):
+        baseline_path = os.path.join(self.path, "baseline.json")
+        save_baseline(baseline_path, [Measurement("scenario", 5, 10.0, 20.0, 100.0)])
+        baseline = load_baseline(baseline_path)
+        within = Measurement("scenario", 5, 12.0, 29.0, 140.0)
+        slower = Measurement("scenario", 5, 12.0, 31.0, 100.0)
+        self.assertEqual(regressions([within], baseline, tolerance=0.5), [])
+        self.assertEqual(len(regressions([slower], baseline, tolerance=0.5)), 1)
+        self.assertEqual(regressions([slower], {}, tolerance=0.5), [])
+
+    def tearDown(self):
+        set_chat_model_factory()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
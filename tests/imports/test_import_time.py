@@ -0,0 +1,55 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORT_TIME_THRESHOLD = 0.5
+MODULE_IMPORT_TIME_THRESHOLD = 6.0
+REPETITIONS = 3
+
+
+class Test_Import_Time(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = tempfile.mkdtemp()
+
+    def _import(self, module: str) -> float:
+        """Import the module in a fresh interpreter and return the time spent by the import in seconds."""
+        code = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(time.perf_counter() - start)"
+        )
+        env = dict(os.environ, PYTHONPATH=ROOT_PATH)
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=self.cwd, env=env, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return float(result.stdout)
+
+    def test_importing_tool_is_fast(self):
+        import_time = min(self._import("tool") for _ in range(REPETITIONS))
+        print(f"Importing tool took {import_time * 1e3:.1f} ms")
+        self.assertLess(import_time, IMPORT_TIME_THRESHOLD)
+
+    def test_importing_solver_and_assistant_is_fast(self):
+        for module in ("tool.solver", "tool.assistant"):
+            import_time = min(self._import(module) for _ in range(REPETITIONS))
+            print(f"Importing {module} took {import_time:.2f} s")
+            self.assertLess(import_time, MODULE_IMPORT_TIME_THRESHOLD, module)
+
+    def test_importing_tool_modules_does_not_create_any_files(self):
+        self._import("tool.assistant")
+        self.assertEqual(os.listdir(self.cwd), [])
+
+    def tearDown(self):
+        shutil.rmtree(self.cwd, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
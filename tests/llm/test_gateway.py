@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import unittest
+import uuid
+
+import httpx
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import BaseChatModel
+
+from tool.components import Components
+from tool.llm import (
+    Gateway,
+    configure_gateway,
+    get_chat_model,
+    set_chat_model_factory,
+)
+from tool.llm.fake import ScriptedChatModel
+from tool.llm.rate_limit import TokenBucket
+from tool.parsers import _task_extractor
+from tool.solver import Solver
+
+
+class _Clock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Test_Token_Bucket(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+
+    def test_requests_over_the_limit_wait_for_refill(self):
+        bucket = TokenBucket(requests_per_minute=2, clock=self.clock)
+        self.assertEqual(bucket._reserve(10), 0)
+        self.assertEqual(bucket._reserve(10), 0)
+        self.assertAlmostEqual(bucket._reserve(10), 30.0)
+        self.clock.now = 30.0
+        self.assertEqual(bucket._reserve(10), 0)
+
+    def test_tokens_over_the_limit_wait_for_refill(self):
+        bucket = TokenBucket(tokens_per_minute=600, clock=self.clock)
+        self.assertEqual(bucket._reserve(500), 0)
+        self.assertAlmostEqual(bucket._reserve(200), 10.0)
+
+    def test_tokens_used_over_the_estimate_are_charged(self):
+        bucket = TokenBucket(tokens_per_minute=600, clock=self.clock)
+        bucket._reserve(100)
+        bucket.charge(400)
+        self.assertAlmostEqual(bucket._reserve(200), 10.0)
+
+    def test_request_larger_than_the_limit_waits_only_for_a_full_bucket(self):
+        bucket = TokenBucket(tokens_per_minute=600, clock=self.clock)
+        self.assertEqual(bucket._reserve(1000), 0)
+        self.assertAlmostEqual(bucket._reserve(1000), 100.0)
+
+
+class Test_Gateway(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        os.makedirs(self.path)
+        self.requests: list[dict] = []
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Hello."},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 90, "completion_tokens": 10, "total_tokens": 100},
+            },
+        )
+
+    def _model(self, gateway: Gateway) -> BaseChatModel:
+        transport = httpx.MockTransport(self._respond)
+        gateway._clients = (httpx.Client(transport=transport), httpx.AsyncClient())
+        return gateway.chat_model("gpt-4o-mini")
+
+    def test_openai_models_share_connection_pool(self):
+        gateway = Gateway(api_key="key")
+        first, second = gateway.chat_model("gpt-4o-mini"), gateway.chat_model("gpt-4o")
+        self.assertIs(first.root_client._client, second.root_client._client)  # type: ignore
+        self.assertIs(first.root_client._client, gateway.clients[0])  # type: ignore
+
+    def test_repeated_prompt_is_answered_from_cache(self):
+        gateway = Gateway(api_key="key", cache_path=os.path.join(self.path, "responses.sqlite"))
+        model = self._model(gateway)
+        answers = [model.invoke("Say hello.").content for _ in range(2)]
+        self.assertEqual(answers, ["Hello.", "Hello."])
+        self.assertEqual(len(self.requests), 1)
+        model.invoke("Say hello again.")
+        self.assertEqual(len(self.requests), 2)
+
+    def test_used_tokens_are_taken_from_the_bucket(self):
+        gateway = Gateway(api_key="key", tokens_per_minute=1000)
+        assert gateway.token_bucket is not None
+        self._model(gateway).invoke("Say hello.")
+        self.assertAlmostEqual(gateway.token_bucket._available[1], 900, delta=1)
+
+    def test_pipeline_runs_offline_with_fake_backend(self):
+        configure_gateway(backend="fake")
+        _task_extractor.cache_clear()
+        self.assertIsInstance(get_chat_model(), ScriptedChatModel)
+        solver = Solver(self.path, Components(self.path, DeterministicFakeEmbedding(size=8)))
+        self.assertEqual(solver.invoke("What is the answer?").content, "The answer is 42.")
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import unittest
+from uuid import uuid4
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.memory import RESOURCES_DIR_NAME, SOLUTIONS_DIR_NAME
+from tool.memory.__main__ import import_jsonl
+from tool.memory.resource_db import ResourceDB
+from tool.memory.solution_db import SolutionDB
+from tool.models import Resource, Solution
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return super().embed_documents(texts)
+
+
+def _resource(i: int) -> Resource:
+    return Resource(
+        form="text" if i % 2 else "code",
+        context="Bulk import",
+        request=f"Request no. {i}",
+        content=f"Content no. {i}",
+    )
+
+
+def _solution(i: int) -> Solution:
+    return Solution(context="Bulk import", task=f"Task no. {i}", solution=f"Solution no. {i}")
+
+
+class Test_Bulk_Insert(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.dirname(__file__) + f"/test_data{uuid4()}"
+        self.embeddings = CountingEmbeddings(size=16)
+
+    def test_resources_are_embedded_in_batches(self):
+        db = ResourceDB(self.path, self.embeddings)
+        resources = [_resource(i) for i in range(10)]
+        ids = db.add_many(resources, batch_size=2)
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(ids, [r.id for r in resources])
+        self.assertEqual(self.embeddings.calls, 6)
+        result = db.get("text", "Bulk import", "Request no. 3", k=1)[0]
+        self.assertEqual(result.content, "Content no. 3")
+
+    def test_solutions_are_embedded_in_batches(self):
+        db = SolutionDB(self.path, self.embeddings)
+        solutions = [_solution(i) for i in range(5)]
+        ids = db.add_many(solutions, batch_size=2)
+        self.assertEqual(ids, [s.id for s in solutions])
+        self.assertEqual(self.embeddings.calls, 3)
+        results = db.get_solutions("Task no. 4", "Bulk import", [], k=5)
+        self.assertEqual({r.id for r in results}, set(ids))
+
+    def test_importing_jsonl_file(self):
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, "import.jsonl")
+        with open(path, "w") as f:
+            for i in range(3):
+                f.write(_solution(i).model_dump_json() + "\n")
+                f.write(json.dumps(_resource(i).model_dump()) + "\n")
+        ids = import_jsonl(path, self.path, batch_size=2, embeddings=self.embeddings)
+        self.assertEqual(len(ids["solutions"]), 3)
+        self.assertEqual(len(ids["resources"]), 3)
+
+    def test_importing_same_jsonl_file_again_replaces_records(self):
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, "import.jsonl")
+        with open(path, "w") as f:
+            for i in range(3):
+                f.write(_solution(i).model_dump_json() + "\n")
+                f.write(_resource(i).model_dump_json() + "\n")
+        first = import_jsonl(path, self.path, batch_size=2, embeddings=self.embeddings)
+        second = import_jsonl(path, self.path, batch_size=2, embeddings=self.embeddings)
+        self.assertEqual(first, second)
+        solution_db = SolutionDB(os.path.join(self.path, SOLUTIONS_DIR_NAME), self.embeddings)
+        self.assertEqual(len(solution_db._db.get()["ids"]), 3)
+        resource_db = ResourceDB(os.path.join(self.path, RESOURCES_DIR_NAME), self.embeddings)
+        self.assertEqual(sum(len(db.get()["ids"]) for db in resource_db._db.values()), 3)
+
+    def tearDown(self):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
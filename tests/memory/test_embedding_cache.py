@@ -0,0 +1,80 @@
+import os
+import shutil
+import unittest
+from uuid import uuid4
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.memory.embeddings import CachedEmbeddings, default_cache_path
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self.embedded += 1
+        return super().embed_query(text)
+
+
+class Test_Embedding_Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = os.path.dirname(__file__) + f"/test_data{uuid4()}"
+        self.path = os.path.join(self.dir, "cache.sqlite")
+        self.embeddings = CountingEmbeddings(size=8)
+        self.cache = CachedEmbeddings(self.embeddings, self.path, "fake")
+
+    def test_repeated_query_is_embedded_once(self):
+        first = self.cache.embed_query("Where do I work?")
+        second = self.cache.embed_query("Where do I work?")
+        self.assertEqual(first, second)
+        self.assertEqual(self.embeddings.embedded, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_only_missing_documents_are_embedded(self):
+        self.cache.embed_query("a")
+        vectors = self.cache.embed_documents(["a", "b", "b"])
+        self.assertEqual(vectors, [self.embeddings.embed_query(t) for t in ["a", "b", "b"]])
+        self.assertEqual(self.embeddings.embedded, 2 + 3)
+
+    def test_cache_persists(self):
+        self.cache.embed_query("a")
+        cache = CachedEmbeddings(self.embeddings, self.path, "fake")
+        cache.embed_query("a")
+        self.assertEqual(self.embeddings.embedded, 1)
+        cache.close()
+
+    def test_cache_is_keyed_by_model(self):
+        self.cache.embed_query("a")
+        cache = CachedEmbeddings(self.embeddings, self.path, "other")
+        cache.embed_query("a")
+        self.assertEqual(self.embeddings.embedded, 2)
+        cache.close()
+
+    def test_least_recently_used_embeddings_are_evicted(self):
+        cache = CachedEmbeddings(self.embeddings, self.path, "fake", max_entries=2)
+        for text in ["a", "b", "a", "c"]:
+            cache.embed_query(text)
+        self.assertEqual(cache.stats()["size"], 2)
+        cache.embed_query("a")
+        self.assertEqual(self.embeddings.embedded, 3)
+        cache.embed_query("b")
+        self.assertEqual(self.embeddings.embedded, 4)
+        cache.close()
+
+    def test_default_cache_is_stored_inside_database_directory(self):
+        path = default_cache_path(self.dir)
+        self.assertEqual(os.path.dirname(path), self.dir)
+
+    def tearDown(self):
+        self.cache.close()
+        if os.path.isdir(self.dir):
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.memory.__main__ import migrate
+from tool.memory import SOLUTIONS_DIR_NAME, RESOURCES_DIR_NAME
+from tool.memory.payload_store import PayloadStore
+from tool.memory.resource_db import new_custom_database
+from tool.memory.solution_db import get_solution_database
+from tool.models import Resource, Solution
+
+
+def _solution(task: str = "Add numbers") -> Solution:
+    return Solution(task=task, context="Math", solution="def add(a, b): return a + b")
+
+
+def _resource(request: str = "Get the addition function") -> Resource:
+    return Resource(
+        context="Math", request=request, form="code", content="def add(a, b): return a + b"
+    )
+
+
+class Test_Payload_Store(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.store = PayloadStore(os.path.join(self.path, "payloads.sqlite"))
+
+    def test_payloads_are_returned_by_id(self):
+        self.store.put_many({"a": "first", "b": "second"})
+        self.assertEqual(self.store.get_many(["b", "a", "c"]), {"a": "first", "b": "second"})
+
+    def test_payloads_are_stored_compressed(self):
+        payload = "x" * 10_000
+        self.store.put_many({"a": payload})
+        (size,) = self.store._connection.execute("SELECT length(data) FROM payloads").fetchone()
+        self.assertLess(size, len(payload) / 10)
+
+    def test_deleted_payloads_are_missing(self):
+        self.store.put_many({"a": "first", "b": "second"})
+        self.store.delete(["a"])
+        self.assertEqual(self.store.get_many(["a", "b"]), {"b": "second"})
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Test_Storing_Payloads_Outside_Vector_Database(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.embeddings = DeterministicFakeEmbedding(size=8)
+        self.solution_db = get_solution_database(
+            os.path.join(self.path, SOLUTIONS_DIR_NAME), self.embeddings
+        )
+        self.resource_db = new_custom_database(
+            os.path.join(self.path, RESOURCES_DIR_NAME), self.embeddings
+        )
+
+    def test_vector_database_holds_only_filterable_fields(self):
+        self.solution_db.save(_solution())
+        self.resource_db.add(_resource())
+        (solution_metadata,) = self.solution_db._db.get()["metadatas"]
+        (resource_metadata,) = self.resource_db._db["code"].get()["metadatas"]
+        self.assertNotIn("json", solution_metadata)
+        self.assertEqual(solution_metadata["form"], "text")
+        self.assertEqual(resource_metadata, {"form": "code", "origin": "unknown"})
+
+    def test_search_results_are_hydrated_from_payload_store(self):
+        solution = _solution()
+        self.solution_db.save(solution)
+        self.resource_db.add(_resource())
+        (found,) = self.solution_db.get_solutions(solution.task, solution.context, [], k=1)
+        self.assertEqual(found, solution)
+        (resource,) = self.resource_db.get("code", "Math", "Get the addition function", k=1)
+        self.assertEqual(resource.content, "def add(a, b): return a + b")
+
+    def test_legacy_records_are_read_and_migrated(self):
+        solution, resource = _solution(), _resource()
+        resource.id = str(uuid.uuid4())
+        self.solution_db._db.add_texts(
+            [solution.task_description],
+            [{"json": solution.model_dump_json(indent=4)}],
+            [solution.id],
+        )
+        self.resource_db._db["code"].add_texts(
+            [f"Context: {resource.context}\nTask: {resource.request}"],
+            [{"json": resource.model_dump_json(indent=4)}],
+            [resource.id],
+        )
+        self.assertEqual(
+            self.solution_db.get_solutions(solution.task, solution.context, [], k=1), [solution]
+        )
+
+        self.assertEqual(migrate(self.path, self.embeddings), {"solutions": 1, "resources": 1})
+        (solution_metadata,) = self.solution_db._db.get()["metadatas"]
+        (resource_metadata,) = self.resource_db._db["code"].get()["metadatas"]
+        self.assertNotIn("json", solution_metadata)
+        self.assertNotIn("json", resource_metadata)
+        self.assertEqual(
+            self.solution_db.get_solutions(solution.task, solution.context, [], k=1), [solution]
+        )
+        (found,) = self.resource_db.get("code", resource.context, resource.request, k=1)
+        self.assertEqual(found, resource)
+        self.assertEqual(migrate(self.path, self.embeddings), {"solutions": 0, "resources": 0})
+
+    def test_migrated_records_get_ids_of_vector_database(self):
+        solution, resource = _solution(), _resource()
+        self.solution_db._db.add_texts(
+            [solution.task_description], [{"json": solution.model_dump_json()}], ["solution-id"]
+        )
+        self.resource_db._db["code"].add_texts(
+            [f"Context: {resource.context}\nTask: {resource.request}"],
+            [{"json": resource.model_dump_json()}],
+            ["resource-id"],
+        )
+        migrate(self.path, self.embeddings)
+        (found,) = self.solution_db.get_solutions(solution.task, solution.context, [], k=1)
+        self.assertEqual(found.id, "solution-id")
+        (found,) = self.resource_db.get("code", resource.context, resource.request, k=1)
+        self.assertEqual(found.id, "resource-id")
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
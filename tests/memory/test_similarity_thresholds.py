@@ -0,0 +1,111 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel
+from tool.llm import set_chat_model_factory
+from tool.memory.recaller import Recaller
+from tool.memory.resource_db import new_custom_database
+from tool.memory.solution_db import get_solution_database
+from tool.memory.thresholds import SimilarityThresholds
+from tool.models import Resource, Solution
+from tool.proposer.resources import ResourceManager
+
+
+REQUEST = "I need to find the speed of light."
+
+
+class Test_Similarity_Thresholds(unittest.TestCase):
+
+    def test_verdicts(self):
+        thresholds = SimilarityThresholds(accept_below=0.1, reject_above=1.0)
+        self.assertEqual(thresholds.verdict(0.05), "accept")
+        self.assertEqual(thresholds.verdict(0.5), "judge")
+        self.assertEqual(thresholds.verdict(1.5), "reject")
+
+    def test_every_item_is_judged_by_default(self):
+        self.assertEqual(SimilarityThresholds().verdict(0.0), "judge")
+        self.assertEqual(SimilarityThresholds().verdict(1e9), "judge")
+
+
+class Test_Recall_With_Thresholds(unittest.TestCase):
+
+    def setUp(self):
+        self.prompts: list[str] = []
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=[("", self._answer)]))
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        embeddings = DeterministicFakeEmbedding(size=8)
+        self.resource_db = new_custom_database(os.path.join(self.path, "resources"), embeddings)
+        self.solution_db = get_solution_database(os.path.join(self.path, "solutions"), embeddings)
+        self.resource_db.add_many(
+            [
+                Resource(form="text", context="Physics", request=REQUEST, content="299792458 m/s"),
+                Resource(form="text", context="Physics", request="Other", content="Other"),
+            ]
+        )
+        self.solution_db.add_solution(
+            Solution(task="Add numbers", context="Math", requirements=["Sum"], solution="3")
+        )
+
+    def _answer(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return "Relevance: False"
+
+    def test_resources_are_returned_with_distances_ordered_from_the_closest(self):
+        scored = self.resource_db.get_with_scores("text", "Physics", REQUEST, k=2)
+        self.assertEqual(scored[0][0].content, "299792458 m/s")
+        self.assertAlmostEqual(scored[0][1], 0.0, places=5)
+        self.assertLessEqual(scored[0][1], scored[1][1])
+
+    def test_near_exact_resource_is_accepted_without_model(self):
+        thresholds = SimilarityThresholds(accept_below=0.01, reject_above=1e9)
+        resource_manager = ResourceManager(db=self.resource_db, thresholds=thresholds)
+        content = resource_manager._pick_relevant_recalled_result(
+            "Task", "Physics", REQUEST, "text"
+        )
+        self.assertEqual(content, "299792458 m/s")
+        self.assertEqual(self.prompts, [])
+
+    def test_distant_resources_are_rejected_without_model(self):
+        thresholds = SimilarityThresholds(accept_below=-1, reject_above=-1)
+        resource_manager = ResourceManager(db=self.resource_db, thresholds=thresholds)
+        content = resource_manager._pick_relevant_recalled_result(
+            "Task", "Physics", REQUEST, "text"
+        )
+        self.assertEqual(content, "Not provided.")
+        self.assertEqual(self.prompts, [])
+
+    def test_resources_in_between_are_judged_by_model(self):
+        resource_manager = ResourceManager(db=self.resource_db, thresholds=SimilarityThresholds())
+        resource_manager._pick_relevant_recalled_result("Task", "Physics", REQUEST, "text")
+        self.assertEqual(len(self.prompts), 2)
+
+    def test_close_solution_of_the_same_form_is_used_without_model(self):
+        recaller = Recaller(db=self.solution_db, thresholds=SimilarityThresholds(accept_below=1e9))
+        solution = recaller.recall(
+            Solution(task="Add numbers", context="Math", requirements=["Sum"], form="text")
+        )
+        self.assertEqual(solution.solution, "3")
+        self.assertEqual(self.prompts, [])
+
+    def test_distant_solutions_are_ignored_without_model(self):
+        thresholds = SimilarityThresholds(accept_below=-1, reject_above=-1)
+        recaller = Recaller(db=self.solution_db, thresholds=thresholds)
+        solution = recaller.recall(
+            Solution(task="Add numbers", context="Math", requirements=["Sum"], form="text")
+        )
+        self.assertEqual(solution.solution, "")
+        self.assertEqual(solution.similar_solutions, "")
+        self.assertEqual(self.prompts, [])
+
+    def tearDown(self):
+        set_chat_model_factory()
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
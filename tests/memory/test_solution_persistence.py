@@ -0,0 +1,132 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.memory.__main__ import compact
+from tool.memory import SOLUTIONS_DIR_NAME
+from tool.memory.recaller import Recaller
+from tool.memory.solution_db import get_solution_database
+from tool.memory.thresholds import NO_THRESHOLDS
+from tool.models import Solution, Test as _Test
+from tool.parsers import _task_extractor
+from tool.solver import Solver
+
+
+def _attempt(solution: str, results: list[str], task: str = "Add numbers") -> Solution:
+    tests = [_Test(description=f"Test {i}", result=r) for i, r in enumerate(results)]  # type: ignore
+    return Solution(task=task, context="Math", solution=solution, tests=tests)
+
+
+class Test_Compacting_Solutions(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.embeddings = DeterministicFakeEmbedding(size=8)
+        self.db = get_solution_database(
+            os.path.join(self.path, SOLUTIONS_DIR_NAME), self.embeddings
+        )
+
+    def _stored(self) -> list[Solution]:
+        payloads = self.db._payloads.get_many(self.db._db.get()["ids"])
+        return [Solution.model_validate_json(p) for p in payloads.values()]
+
+    def test_only_the_best_solution_of_each_task_is_kept(self):
+        self.db.save(_attempt("First", ["fail", "fail"]))
+        self.db.save(_attempt("Second", ["pass", "pass"]))
+        self.db.save(_attempt("Third", ["pass", "fail"]))
+        self.db.save(_attempt("Other", ["fail"], task="Multiply numbers"))
+        removed = compact(self.path, self.embeddings)
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(sorted(s.solution for s in self._stored()), ["Other", "Second"])
+
+    def test_solutions_stored_without_test_results_are_compacted(self):
+        for solution in ("Old", "Older"):
+            attempt = _attempt(solution, [])
+            self.db._db.add_texts(
+                [attempt.task_description], [{"json": attempt.model_dump_json()}], [attempt.id]
+            )
+        self.db.save(_attempt("New", ["pass"]))
+        self.assertEqual(len(self.db.compact()), 2)
+        self.assertEqual([s.solution for s in self._stored()], ["New"])
+
+    def test_saving_solution_again_replaces_it(self):
+        solution = _attempt("First", ["fail"])
+        self.db.save(solution)
+        solution.solution = "Second"
+        self.db.save(solution)
+        self.assertEqual([s.solution for s in self._stored()], ["Second"])
+
+    def test_solution_of_another_task_does_not_replace_stored_one(self):
+        solution = _attempt("First", ["pass"])
+        first_id = self.db.save(solution)
+        solution = solution.model_copy(update={"task": "Multiply numbers", "solution": "Second"})
+        second_id = self.db.save(solution)
+        self.assertNotEqual(first_id, second_id)
+        self.assertEqual(sorted(s.solution for s in self._stored()), ["First", "Second"])
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Test_Storing_Validated_Solutions(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=PIPELINE_RULES))
+        _task_extractor.cache_clear()
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.solver = Solver(self.path, Components(self.path, DeterministicFakeEmbedding(size=8)))
+
+    def test_only_the_validated_solution_is_stored_with_test_results(self):
+        self.solver.invoke("What is the answer?")
+        records = self.solver.solution_db._db.get()["metadatas"]
+        self.assertEqual(len(records), 1)
+        self.assertTrue(records[0]["validated"])
+        self.assertEqual((records[0]["passed"], records[0]["failed"]), (1, 0))
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Test_Remembering_Recalled_Solution(unittest.TestCase):
+
+    def setUp(self):
+        rules = [("pick the first Recalled solution", "0"), *PIPELINE_RULES]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules))
+        _task_extractor.cache_clear()
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.components = Components(self.path, DeterministicFakeEmbedding(size=8))
+        self.original = _attempt("def add(a, b): return a + b", ["pass"])
+        self.original.requirements = ["Use Python."]
+        self.components.solution_db.save(self.original)
+
+    def test_recalled_solution_failing_its_tests_does_not_replace_original(self):
+        recaller = Recaller(db=self.components.solution_db, thresholds=NO_THRESHOLDS)
+        task = Solution(task="Add three numbers", context="Math", requirements=["Use Python."])
+        recalled = recaller.recall(task)
+        self.assertEqual(recalled.solution, self.original.solution)
+        self.assertNotEqual(recalled.id, self.original.id)
+
+        recalled.tests = [_Test(description="Test 0", result="fail")]
+        Solver(self.path, self.components)._remember(recalled)
+
+        ids = [self.original.id, recalled.id]
+        payloads = self.components.solution_db._payloads.get_many(ids)
+        self.assertEqual(Solution.model_validate_json(payloads[self.original.id]), self.original)
+        self.assertEqual(Solution.model_validate_json(payloads[recalled.id]).task, task.task)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel
+from tool.llm import set_chat_model_factory
+from tool.memory.recaller import Recaller
+from tool.memory.solution_db import get_solution_database
+from tool.memory.thresholds import SimilarityThresholds
+from tool.models import Solution, Test as _Test
+
+
+ACCEPT_CLOSEST = SimilarityThresholds(accept_below=1e9)
+
+
+def _solution(solution: str, form: str, results: list[str] = ["pass"]) -> Solution:
+    tests = [_Test(description=f"Test {i}", result=r) for i, r in enumerate(results)]  # type: ignore
+    return Solution(
+        task="Add numbers",
+        context="Math",
+        requirements=["Sum"],
+        solution=solution,
+        form=form,  # type: ignore
+        tests=tests,
+    )
+
+
+class Test_Filtering_Solutions_By_Metadata(unittest.TestCase):
+
+    def setUp(self):
+        self.prompts: list[str] = []
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=[("", self._answer)]))
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.db = get_solution_database(self.path, DeterministicFakeEmbedding(size=8))
+        self.db.save(_solution("def add(a, b): return a + b", "code"))
+        self.db.save(_solution("def add(a, b): return a - b", "code", ["fail"]))
+        self.db.save(_solution("The sum is 3.", "text"))
+
+    def _answer(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return "0"
+
+    def test_all_retrieved_solutions_match_the_filter(self):
+        found = self.db.get_solutions("Add numbers", "Math", ["Sum"], k=3, where={"form": "code"})
+        self.assertEqual(len(found), 2)
+        self.assertTrue(all(s.form == "code" for s in found))
+
+    def test_solution_of_the_task_form_is_recalled(self):
+        recaller = Recaller(db=self.db, thresholds=ACCEPT_CLOSEST)
+        text = recaller.recall(Solution(task="Add numbers", context="Math", requirements=["Sum"]))
+        self.assertEqual(text.solution, "The sum is 3.")
+        self.assertEqual(self.prompts, [])
+
+    def test_only_validated_solutions_are_recalled_if_required(self):
+        recaller = Recaller(db=self.db, thresholds=SimilarityThresholds(), validated_only=True)
+        code = recaller.recall(
+            Solution(task="Add numbers", context="Math", requirements=["Sum"], form="code")
+        )
+        self.assertEqual(code.solution, "def add(a, b): return a + b")
+        self.assertEqual(self.prompts[-1].count("Solution:"), 1)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
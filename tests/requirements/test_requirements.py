@@ -1,5 +1,9 @@
 import unittest
 
+from langgraph.graph import StateGraph, START, END
+
+from tool.llm import set_chat_model_factory
+from tool.llm.fake import ScriptedChatModel
 from tool.requirements.requirements import get_requirements
 from tool.test_writer.tests import get_tests
 from tool.models import Solution
@@ -92,5 +96,22 @@ class Test_Obtaining_Requirements_On_Solution(unittest.TestCase):
             print(t.description)
 
 
+class Test_Adding_Tests_In_Graph(unittest.TestCase):
+
+    def setUp(self):
+        rules = [("helps me to verify solution to a given task", '["Test 1", "Test 2"]')]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules))
+        self.addCleanup(set_chat_model_factory)
+
+    def test_added_tests_are_kept_in_graph_state(self):
+        # the tests of the solution are not set explicitly, so extending them in place is not seen by the graph
+        builder = StateGraph(Solution)
+        builder.add_node("add_tests", get_tests, input=Solution)
+        builder.add_edge(START, "add_tests")
+        builder.add_edge("add_tests", END)
+        result = builder.compile().invoke(Solution(task="Task", context="Context"))
+        self.assertEqual([t.description for t in result["tests"]], ["Test 1", "Test 2"])
+
+
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
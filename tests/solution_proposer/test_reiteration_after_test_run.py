@@ -13,7 +13,7 @@ class Test_Reiteration(unittest.TestCase):
         self.test_db_path = os.path.join(os.path.dirname(__file__), f"./test_data_{uuid.uuid1()}")
         if os.path.exists(self.test_db_path):
             shutil.rmtree(self.test_db_path)
-        self.proposer = Compiler(db_dir_path=self.test_db_path)
+        self.proposer = Compiler()
 
     def test_reiteration_with_failed_test_with_critique_returns_the_updated_solution(self):
         solution = Solution(
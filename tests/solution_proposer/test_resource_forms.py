@@ -0,0 +1,90 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel
+from tool.llm import set_chat_model_factory
+from tool.memory.resource_db import new_custom_database
+from tool.models import Solution
+from tool.proposer.resources import ResourceManager, classify_resource_form
+
+
+TEXT_REQUEST = "I need to find the definition of the term 'machine learning'. I expect to get it as a plain text."
+CODE_REQUEST = "I need a Pythonic program for calculating the least common divisor. I expect to get it as a Python code snippet."
+UNCLEAR_REQUEST = "I need to find the speed of light. I expect response in m/s."
+
+
+class Test_Classifying_Resource_Form_Locally(unittest.TestCase):
+
+    def test_obvious_forms_are_recognized(self):
+        self.assertEqual(classify_resource_form(TEXT_REQUEST), "text")
+        self.assertEqual(classify_resource_form(CODE_REQUEST), "code")
+
+    def test_expected_form_at_the_end_of_request_is_preferred(self):
+        request = "I need to know what the Python function zip does. I expect a short plain text explanation."
+        self.assertEqual(classify_resource_form(request), "text")
+
+    def test_form_is_not_guessed_if_not_obvious(self):
+        self.assertIsNone(classify_resource_form(UNCLEAR_REQUEST))
+
+    def test_only_whole_words_are_keywords(self):
+        request = "I need to decode the message. I expect the encoded textbook answer in m/s."
+        self.assertIsNone(classify_resource_form(request))
+
+    def test_form_is_not_guessed_without_expected_result(self):
+        self.assertIsNone(classify_resource_form("I need a Python code snippet."))
+
+    def test_form_is_not_guessed_if_both_forms_are_expected(self):
+        request = "I need to sort a list. I expect a Python function with a text explanation."
+        self.assertIsNone(classify_resource_form(request))
+
+
+class Test_Deciding_Resource_Forms_Once(unittest.TestCase):
+
+    def setUp(self):
+        self.form_queries: list[str] = []
+        rules = [
+            (
+                "collects for me a knowledge",
+                f'["{TEXT_REQUEST}", "{CODE_REQUEST}", "{UNCLEAR_REQUEST}"]',
+            ),
+            ("deciding the form of a resource", self._decide_form),
+            ("determines if the recalled resource is acceptable", "Relevance: False"),
+            ("helps me to find answer or solution", "Resource content."),
+        ]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules))
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.db = new_custom_database(self.path, DeterministicFakeEmbedding(size=8))
+
+    def _decide_form(self, prompt: str) -> str:
+        self.form_queries.append(prompt)
+        return "text"
+
+    def test_only_forms_not_obvious_from_requests_are_decided_by_model(self):
+        resource_manager = ResourceManager(db=self.db, classify_forms_locally=True)
+        solution = resource_manager.invoke(Solution(task="Task", context="Context"))
+        self.assertEqual(
+            solution["resource_forms"],
+            {TEXT_REQUEST: "text", CODE_REQUEST: "code", UNCLEAR_REQUEST: "text"},
+        )
+        self.assertEqual(len(self.form_queries), 1)
+        self.assertIn(UNCLEAR_REQUEST, self.form_queries[0])
+        self.assertEqual(len(self.db.get("code", "Context", CODE_REQUEST, k=5)), 1)
+        self.assertEqual(len(self.db.get("text", "Context", TEXT_REQUEST, k=5)), 2)
+
+    def test_all_forms_are_decided_by_model_by_default(self):
+        resource_manager = ResourceManager(db=self.db)
+        resource_manager.invoke(Solution(task="Task", context="Context"))
+        self.assertEqual(len(self.form_queries), 3)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import shutil
+import time
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel
+from tool.llm import set_chat_model_factory
+from tool.memory.resource_db import new_custom_database
+from tool.memory.thresholds import NO_THRESHOLDS
+from tool.models import Resource
+from tool.proposer.resources import ResourceManager
+
+
+LATENCY = 0.2
+REQUEST = "I need to find the speed of light."
+
+
+class Test_Assessing_Relevance_Of_Recalled_Resources(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.db = new_custom_database(self.path, DeterministicFakeEmbedding(size=8))
+        self.db.add_many(
+            [
+                Resource(form="text", context="Physics", request=f"{REQUEST} {i}", content=str(i))
+                for i in range(3)
+            ]
+        )
+        ranked = [r.content for r in self.db.get("text", "Physics", REQUEST)]
+        # all but the highest ranked resource are relevant
+        self.expected = ranked[1]
+        relevant = set(ranked[1:])
+        rules = [
+            (
+                "determines if the recalled resource is acceptable",
+                lambda prompt: f"Relevance: {prompt.splitlines()[-1][len('Memory: '):] in relevant}",
+            )
+        ]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules, latency=LATENCY))
+        self.resource_manager = ResourceManager(db=self.db, thresholds=NO_THRESHOLDS)
+
+    def test_highest_ranked_relevant_resource_is_picked(self):
+        start = time.perf_counter()
+        picked = self.resource_manager._pick_relevant_recalled_result(
+            "Find the speed of light", "Physics", REQUEST, "text"
+        )
+        elapsed = time.perf_counter() - start
+        self.assertEqual(picked, self.expected)
+        self.assertLess(elapsed, 2 * LATENCY)
+
+    def test_highest_ranked_relevant_resource_is_picked_asynchronously(self):
+        picked = asyncio.run(
+            self.resource_manager._apick_relevant_recalled_result(
+                "Find the speed of light", "Physics", REQUEST, "text"
+            )
+        )
+        self.assertEqual(picked, self.expected)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
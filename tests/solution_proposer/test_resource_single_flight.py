@@ -0,0 +1,127 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel
+from tool.llm import set_chat_model_factory
+from tool.memory.resource_db import new_custom_database
+from tool.models import Solution, EMPTY_RESOURCE
+from tool.proposer.resources import ResourceManager
+from tool.single_flight import SingleFlight
+
+
+REQUEST = "I need to find the speed of light. I expect response in m/s"
+SPEED_OF_LIGHT = "The speed of light is 299792458 m/s."
+CONCURRENT_TASKS = 6
+
+
+class Test_Single_Flight(unittest.TestCase):
+
+    def test_concurrent_calls_with_the_same_key_share_single_computation(self):
+        flight: SingleFlight[int] = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute() -> int:
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(flight.do, "key", compute)
+            started.wait(timeout=5)
+            followers = [executor.submit(flight.do, "key", compute) for _ in range(3)]
+            while flight.shared < 3:
+                time.sleep(0.001)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_key_is_released_after_the_computation(self):
+        flight: SingleFlight[int] = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+        self.assertEqual(flight.do("key", lambda: 2), 2)
+
+    def test_waiting_callers_get_the_exception(self):
+        flight: SingleFlight[int] = SingleFlight()
+
+        async def fail() -> int:
+            await asyncio.sleep(0.05)
+            raise ValueError("Failed")
+
+        async def run_all():
+            return await asyncio.gather(
+                *(flight.ado("key", fail) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(run_all())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.shared, 2)
+
+
+class Test_Deduplicating_Resource_Requests(unittest.TestCase):
+
+    def setUp(self):
+        self.provider_calls = 0
+        rules = [
+            ("collects for me a knowledge", "[]"),
+            ("deciding the form of a resource", "text"),
+            ("determines if the recalled resource is acceptable", "Relevance: False"),
+            ("helps me to find answer or solution", self._provide),
+        ]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules, latency=0.1))
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.db = new_custom_database(self.path, DeterministicFakeEmbedding(size=8))
+        self.resource_manager = ResourceManager(db=self.db)
+
+    def _provide(self, prompt: str) -> str:
+        self.provider_calls += 1
+        return SPEED_OF_LIGHT
+
+    def _solution(self, i: int) -> Solution:
+        return Solution(
+            task=f"Find the speed of light, variant {i}",
+            context="Physics",
+            resources={REQUEST: EMPTY_RESOURCE},
+        )
+
+    def test_concurrent_requests_for_the_same_resource_are_provided_once(self):
+        with ThreadPoolExecutor(max_workers=CONCURRENT_TASKS) as executor:
+            results = list(
+                executor.map(
+                    lambda i: self.resource_manager.invoke(self._solution(i)),
+                    range(CONCURRENT_TASKS),
+                )
+            )
+        self.assertTrue(all(r["resources"][REQUEST] == SPEED_OF_LIGHT for r in results))
+        self.assertEqual(self.provider_calls, 1)
+        self.assertEqual(len(self.db.get("text", "Physics", REQUEST, k=10)), 1)
+
+    def test_concurrent_asynchronous_requests_for_the_same_resource_are_provided_once(self):
+        async def run_all():
+            return await asyncio.gather(
+                *(self.resource_manager.ainvoke(self._solution(i)) for i in range(CONCURRENT_TASKS))
+            )
+
+        results = asyncio.run(run_all())
+        self.assertTrue(all(r["resources"][REQUEST] == SPEED_OF_LIGHT for r in results))
+        self.assertEqual(self.provider_calls, 1)
+        self.assertEqual(len(self.db.get("text", "Physics", REQUEST, k=10)), 1)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -13,7 +13,7 @@ class Test_Solution_Proposal(unittest.TestCase):
         self.test_db_path = os.path.join(os.path.dirname(__file__), f"./test_data_{uuid.uuid1()}")
         if os.path.exists(self.test_db_path):
             shutil.rmtree(self.test_db_path)
-        self.proposer = Compiler(db_dir_path=self.test_db_path)
+        self.proposer = Compiler()
 
     def test_solution_proposal(self):
         draft = Solution(
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import shutil
+import time
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.parsers import _task_extractor
+from tool.solver import Solver
+
+
+TASKS = 8
+LATENCY = 0.05
+
+
+class Test_Async_Load(unittest.TestCase):
+
+    def setUp(self):
+        self.model = ScriptedChatModel(rules=PIPELINE_RULES, latency=LATENCY)
+        set_chat_model_factory(lambda _: self.model)
+        _task_extractor.cache_clear()
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+        self.solver = Solver(self.memory_path, components)
+        self.tasks = [f"What is the answer no. {i}?" for i in range(TASKS)]
+
+    def test_single_task_is_solved_asynchronously(self):
+        result = asyncio.run(self.solver.ainvoke(self.tasks[0]))
+        self.assertEqual(result.content, "The answer is 42.")
+
+    def test_concurrent_tasks_are_processed_faster_than_sequential(self):
+        start = time.perf_counter()
+        sequential = [self.solver.invoke(task) for task in self.tasks]
+        sequential_time = time.perf_counter() - start
+
+        async def solve_all():
+            return await asyncio.gather(*(self.solver.ainvoke(task) for task in self.tasks))
+
+        start = time.perf_counter()
+        concurrent = asyncio.run(solve_all())
+        concurrent_time = time.perf_counter() - start
+
+        print(
+            f"{TASKS} tasks: sequential {TASKS / sequential_time:.2f} tasks/s, "
+            f"concurrent {TASKS / concurrent_time:.2f} tasks/s"
+        )
+        self.assertEqual([r.content for r in concurrent], [r.content for r in sequential])
+        self.assertLess(concurrent_time, sequential_time / 2)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        if os.path.exists(self.memory_path):
+            shutil.rmtree(self.memory_path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
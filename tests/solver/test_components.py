@@ -0,0 +1,43 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.solver import Solver
+
+
+class Test_Shared_Components(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=PIPELINE_RULES))
+        self.addCleanup(set_chat_model_factory)
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        self.addCleanup(shutil.rmtree, self.memory_path, ignore_errors=True)
+        self.components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+        self.solver = Solver(self.memory_path, self.components)
+
+    def test_proposers_share_resource_manager_and_compiler(self):
+        proposer = self.solver._proposer
+        self.assertIs(self.solver._iterator._proposer, proposer)
+        self.assertIs(proposer._resource_manager, self.components.resource_manager)
+        self.assertIs(proposer._compiler, self.components.compiler)
+
+    def test_single_solution_database_is_used(self):
+        self.assertIs(self.solver._recaller.solution_db, self.components.solution_db)
+        self.assertIs(self.solver.solution_db, self.components.solution_db)
+
+    def test_single_resource_database_is_used(self):
+        self.assertIs(self.solver.resource_db, self.components.resource_db)
+        self.assertIs(self.components.resource_manager.db, self.components.resource_db)
+
+    def test_validator_is_shared(self):
+        self.assertIs(self.solver._iterator._validator, self.components.validator)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import timeit
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.solver import Solver
+
+
+REPETITIONS = 20
+
+
+class Test_Entry_Graph(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=PIPELINE_RULES))
+        self.addCleanup(set_chat_model_factory)
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        self.addCleanup(shutil.rmtree, self.memory_path, ignore_errors=True)
+        components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+        self.solver = Solver(self.memory_path, components)
+
+    def test_entry_graph_is_compiled_only_once(self):
+        self.assertIs(self.solver.entry_graph, self.solver.entry_graph)
+
+    def test_per_call_overhead_of_entry_graph(self):
+        compiled_per_call = (
+            timeit.timeit(self.solver._compile_entry_graph, number=REPETITIONS) / REPETITIONS
+        )
+        self.solver.entry_graph
+        cached = timeit.timeit(lambda: self.solver.entry_graph, number=REPETITIONS) / REPETITIONS
+        print(
+            f"Entry graph overhead per call: compiled on every call {compiled_per_call * 1e3:.3f} ms, "
+            f"precompiled {cached * 1e3:.6f} ms"
+        )
+        self.assertLess(cached, compiled_per_call)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
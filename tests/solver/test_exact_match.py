@@ -0,0 +1,95 @@
+import os
+import shutil
+import time
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.memory.solution_index import SolutionIndex
+from tool.models import Solution, Test as _Test
+from tool.parsers import _task_extractor
+from tool.solver import Solver
+
+
+TASK = "What is the answer?"
+
+
+class Test_Solution_Index(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        self.index = SolutionIndex(os.path.join(self.path, "index.sqlite"))
+
+    def test_key_ignores_whitespace_and_order_of_requirements(self):
+        a = Solution(task="Add  numbers", context="Math", requirements=["A", "B"])
+        b = Solution(task="Add numbers ", context="Math", requirements=["B", "A"])
+        self.assertEqual(SolutionIndex.key(a), SolutionIndex.key(b))
+
+    def test_key_depends_on_form(self):
+        a = Solution(task="Add numbers", context="Math", form="text")
+        b = Solution(task="Add numbers", context="Math", form="code")
+        self.assertNotEqual(SolutionIndex.key(a), SolutionIndex.key(b))
+
+    def test_stored_solution_is_found_by_key(self):
+        solution = Solution(task="Add numbers", context="Math", solution="3")
+        self.index.add("key", solution)
+        self.assertEqual(self.index.get("key"), solution)
+        self.assertIsNone(self.index.get("other key"))
+        self.assertEqual(self.index.stats(), {"hits": 1, "misses": 1, "size": 1})
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Test_Solving_Repeated_Task(unittest.TestCase):
+
+    def setUp(self):
+        self.prompts: list[str] = []
+        rules = [(key, self._recorded(reply)) for key, reply in PIPELINE_RULES]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules))
+        _task_extractor.cache_clear()
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+        self.solver = Solver(self.memory_path, components)
+
+    def _recorded(self, reply):
+        def record(prompt: str):
+            self.prompts.append(prompt)
+            return reply(prompt) if callable(reply) else reply
+
+        return record
+
+    def test_validated_solution_of_repeated_task_is_returned_without_model(self):
+        first = self.solver.invoke(TASK)
+        self.assertEqual(self.solver.solution_index.stats()["size"], 1)
+        self.prompts.clear()
+
+        start = time.perf_counter()
+        second = self.solver.invoke(TASK)
+        elapsed = time.perf_counter() - start
+        print(f"Repeated task solved in {elapsed * 1e3:.1f} ms")
+        self.assertEqual(second.content, first.content)
+        # only the task is parsed from the message
+        self.assertEqual(len(self.prompts), 1)
+
+    def test_solution_that_failed_tests_is_not_remembered(self):
+        solution = Solution(task=TASK, context="Load test", tests=[_Test(description="Test")])
+        solution.tests[0].result = "fail"
+        solution.index_key = SolutionIndex.key(solution)
+        self.solver._remember(solution)
+        self.assertEqual(self.solver.solution_index.stats()["size"], 0)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        if os.path.exists(self.memory_path):
+            shutil.rmtree(self.memory_path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
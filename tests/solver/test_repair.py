@@ -0,0 +1,86 @@
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.components import Components
+from tool.llm import set_chat_model_factory
+from tool.models import Solution, Test
+from tool.parsers import _task_extractor
+from tool.solver import Solver
+from tool.validator.critic import critique_cache
+
+
+TASK = "What is the answer?"
+CONSTANT_REQUEST = "I need to find the value of the constant. I expect to get it as a number."
+
+
+def _critique(prompt: str) -> str:
+    if "Solution: The answer is 43." in prompt:
+        return "The answer matches the test. TEST_PASSED"
+    return "The answer is wrong, the constant is missing. TEST_FAILED"
+
+
+RULES = [
+    ("fix a solution to a task", "The answer is 43."),
+    ("knowledge missing in a solution", f'["{CONSTANT_REQUEST}"]'),
+    ("helps me to find answer or solution", "The constant is 43."),
+    ("You are a critic", _critique),
+    *PIPELINE_RULES,
+]
+
+
+class Test_Repair_After_Failed_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.prompts: list[str] = []
+        rules = [(key, self._recorded(reply)) for key, reply in RULES]
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=rules))
+        _task_extractor.cache_clear()
+        critique_cache.clear()
+        self.memory_path = os.path.dirname(__file__) + f"/test_data_{uuid.uuid4()}"
+        self.components = Components(self.memory_path, DeterministicFakeEmbedding(size=8))
+
+    def _recorded(self, reply):
+        def record(prompt: str):
+            self.prompts.append(prompt)
+            return reply(prompt) if callable(reply) else reply
+
+        return record
+
+    def _count(self, key: str) -> int:
+        return len([p for p in self.prompts if key in p])
+
+    def test_repair_keeps_structure_and_gets_only_resources_requested_by_critiques(self):
+        answer = Solver(self.memory_path, self.components).invoke(TASK)
+        self.assertEqual(answer.content, "The answer is 43.")
+        self.assertEqual(self._count("Write down step by step the solution structure"), 1)
+        self.assertEqual(self._count("knowledge necessary for solving given task"), 1)
+        self.assertEqual(self._count("knowledge missing in a solution"), 1)
+        self.assertEqual(self._count("helps me to find answer or solution"), 1)
+        # the test is run again on the repaired solution
+        self.assertEqual(self._count("verify the correctness of the solution by running"), 2)
+
+        (repair,) = [p for p in self.prompts if "fix a solution to a task" in p]
+        self.assertIn("the constant is missing", repair)
+        self.assertIn("The constant is 43.", repair)
+        self.assertNotIn("Solution structure", repair)
+
+    def test_no_resources_are_requested_without_critiques_of_failed_tests(self):
+        solution = Solution(task=TASK, context="", tests=[Test(description="Test", result="pass")])
+        requests = self.components.resource_manager.get_requests_from_critiques(solution)
+        self.assertEqual(requests, [])
+        self.assertEqual(self.prompts, [])
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        critique_cache.clear()
+        shutil.rmtree(self.memory_path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import unittest
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+
+from tool.assistant import Assistant
+from tool.components import Components
+from tool.llm import configure_gateway, set_chat_model_factory
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.parsers import _task_extractor
+from tool.tracing import InMemorySink, JsonlSink, SpanTracker
+
+
+REQUIREMENTS = AIMessage(
+    content='["The answer is a number."]',
+    usage_metadata={"input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100},
+)
+RULES = [("thinks about requirements on the solution", REQUIREMENTS), *PIPELINE_RULES]
+NODES = [
+    "get_requirements",
+    "recall",
+    "add_tests",
+    "get_structure",
+    "get_resources",
+    "compile_solution",
+    "implement_next_test",
+    "run_test",
+]
+
+
+class Test_Node_Spans(unittest.TestCase):
+
+    def setUp(self):
+        _task_extractor.cache_clear()
+        self.path = os.path.join(os.path.dirname(__file__), f"test_data_{uuid.uuid4()}")
+        os.makedirs(self.path)
+
+    def _assistant(self, memory: str, sinks: list) -> Assistant:
+        memory_path = os.path.join(self.path, memory)
+        components = Components(memory_path, DeterministicFakeEmbedding(size=8))
+        return Assistant(memory_path, components, span_sinks=sinks)
+
+    def test_each_node_run_is_exported_to_sinks(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=PIPELINE_RULES))
+        memory, jsonl = InMemorySink(), os.path.join(self.path, "spans.jsonl")
+        self._assistant("memory", [memory, JsonlSink(jsonl)]).invoke("What is the answer?")
+        names = {span.name for span in memory.spans}
+        self.assertTrue(set(NODES) <= names, set(NODES) - names)
+        with open(jsonl) as f:
+            exported = [json.loads(line) for line in f]
+        self.assertEqual([s["span_id"] for s in exported], [s.span_id for s in memory.spans])
+        self.assertTrue(all(s["wall_time"] >= 0 for s in exported))
+        for name in NODES:
+            self.assertIn(name, memory.summary())
+
+    def test_tokens_and_cost_are_attributed_to_the_calling_node(self):
+        model = ScriptedChatModel(rules=RULES, model_name="gpt-4o-mini")
+        set_chat_model_factory(lambda _: model)
+        memory = InMemorySink()
+        self._assistant("memory", [memory]).invoke("What is the answer?")
+        (span,) = [s for s in memory.spans if s.name == "get_requirements"]
+        self.assertEqual(
+            (span.llm_calls, span.prompt_tokens, span.completion_tokens), (1, 1000, 100)
+        )
+        self.assertAlmostEqual(span.cost, (1000 * 0.15 + 100 * 0.60) / 1e6)
+        parents = {s.span_id: s.name for s in memory.spans}
+        self.assertEqual(parents[str(span.parent_id)], "solver")
+
+    def test_cached_responses_are_counted_as_cache_hits(self):
+        configure_gateway(backend="fake", cache_path=os.path.join(self.path, "responses.sqlite"))
+        first, second = InMemorySink(), InMemorySink()
+        self._assistant("first", [first]).invoke("What is the answer?")
+        self._assistant("second", [second]).invoke("What is the answer?")
+        self.assertEqual(sum(s.cache_hits for s in first.spans), 0)
+        cached = {s.name for s in second.spans if s.cache_hits == s.llm_calls == 1}
+        self.assertTrue({"get_requirements", "compile_solution"} <= cached, cached)
+
+    def test_tracker_without_graph_runs_has_empty_summary(self):
+        self.assertEqual(len(SpanTracker().summary().splitlines()), 1)
+
+    def tearDown(self):
+        set_chat_model_factory()
+        _task_extractor.cache_clear()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -1,10 +1,16 @@
+import re
+import time
 import unittest
+from unittest.mock import patch
 
 from pprint import pprint
 from IPython.display import Image
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
 
 from tool.models import Solution, Test
-from tool.validator.code import get_code_validator_builder
+from tool.validator.code import get_code_validator_builder, criticize, implementation_cache
+from tool.validator.critic import critique_cache
 
 
 class Test_Code_Validator(unittest.TestCase):
@@ -34,5 +40,135 @@ class Test_Code_Validator(unittest.TestCase):
             pprint(test)
 
 
+def _print_test_description(messages: list) -> AIMessage:
+    """Stand-in for the chat model. It writes a test printing the test description and passes every test."""
+    content = str(messages[-1].content)
+    if content.startswith("Solution:"):
+        return AIMessage(content="TEST_PASSED")
+    description = re.search(r"The test description is:\n(.*)\n", content).group(1)  # type: ignore
+    return AIMessage(content=f"print({description!r})")
+
+
+def _fail_every_test(messages: list) -> AIMessage:
+    """Stand-in for the chat model, that writes the same tests as `_print_test_description`, but fails all of them."""
+    if str(messages[-1].content).startswith("Solution:"):
+        return AIMessage(content="TEST_FAILED")
+    return _print_test_description(messages)
+
+
+class Test_Parallel_Code_Validator(unittest.TestCase):
+
+    def setUp(self):
+        critique_cache.clear()
+        implementation_cache.clear()
+        self.solution = Solution(
+            context="",
+            task="",
+            solution="def add_one(x: float) -> float:\n    return x + 1",
+            form="code",
+            tests=[Test(description=f"Test no. {i}", form="code") for i in range(6)],
+        )
+
+    @patch("tool.validator.code.get_chat_model", lambda: RunnableLambda(_print_test_description))
+    def test_results_are_merged_in_order_of_tests(self):
+        graph = get_code_validator_builder(max_concurrency=3).compile()
+        result = Solution(**graph.invoke(self.solution.model_dump()))
+        self.assertEqual(
+            [t.description for t in result.tests], [f"Test no. {i}" for i in range(6)]
+        )
+        for test in result.tests:
+            self.assertEqual(test.last_output.strip(), test.description)
+            self.assertEqual(test.result, "pass")
+
+
+class Test_Reusing_Test_Implementations(unittest.TestCase):
+
+    def setUp(self):
+        critique_cache.clear()
+        implementation_cache.clear()
+        self.graph = get_code_validator_builder().compile()
+        self.solution = Solution(
+            context="",
+            task="",
+            solution="def add_one(x: float) -> float:\n    return x + 1",
+            form="code",
+            tests=[Test(description="Test no. 0", form="code")],
+        )
+
+    def _validate(self, solution: Solution) -> Solution:
+        with patch(
+            "tool.validator.code.get_chat_model", lambda: RunnableLambda(_print_test_description)
+        ):
+            return Solution(**self.graph.invoke(solution.model_dump()))
+
+    def test_implementation_is_reused_when_only_solution_implementation_changes(self):
+        self._validate(self.solution)
+        self.solution.solution = "def add_one(x: float) -> float:\n    return 1 + x"
+        result = self._validate(self.solution)
+        self.assertEqual(result.tests[0].last_output.strip(), "Test no. 0")
+        self.assertEqual(implementation_cache.hits, 1)
+        self.assertEqual(implementation_cache.misses, 1)
+
+    def test_implementation_is_written_again_when_solution_interface_changes(self):
+        self._validate(self.solution)
+        self.solution.solution = "def add_one(y: float) -> float:\n    return y + 1"
+        self._validate(self.solution)
+        self.assertEqual(implementation_cache.hits, 0)
+        self.assertEqual(implementation_cache.misses, 2)
+
+    def test_solution_in_code_block_is_tested_and_shares_implementations(self):
+        self._validate(self.solution)
+        self.solution.solution = f"```python\n{self.solution.solution}\n```"
+        result = self._validate(self.solution)
+        self.assertEqual(result.tests[0].last_output.strip(), "Test no. 0")
+        self.assertEqual(result.tests[0].result, "pass")
+        self.assertEqual(implementation_cache.hits, 1)
+
+    def test_implementation_of_recalled_solution_is_reused(self):
+        recalled = self._validate(self.solution)
+        recalled.tests[0].critique_of_last_run = ""
+        implementation_cache.clear()
+        result = self._validate(recalled)
+        self.assertEqual(result.tests[0].implementation, "print('Test no. 0')")
+        self.assertEqual(implementation_cache.misses, 0)
+
+    def test_implementation_of_failed_test_is_written_again(self):
+        with patch("tool.validator.code.get_chat_model", lambda: RunnableLambda(_fail_every_test)):
+            result = Solution(**self.graph.invoke(self.solution.model_dump()))
+        self.assertEqual(result.tests[0].result, "fail")
+        self.assertEqual(result.tests[0].implementation, "")
+        self.assertEqual(len(implementation_cache), 0)
+        result.tests[0].critique_of_last_run = ""
+        self._validate(result)
+        self.assertEqual(implementation_cache.hits, 0)
+        self.assertEqual(implementation_cache.misses, 2)
+
+
+def _pass_even_tests_slowly(messages: list) -> AIMessage:
+    """Stand-in for the critic, that answers sooner for tests with higher number and passes only the even ones."""
+    number = int(re.search(r"Test no. (\d+)", str(messages[-1].content)).group(1))  # type: ignore
+    time.sleep(0.01 * (6 - number))
+    return AIMessage(content="TEST_PASSED" if number % 2 == 0 else "TEST_FAILED")
+
+
+class Test_Critic(unittest.TestCase):
+
+    def setUp(self):
+        critique_cache.clear()
+
+    @patch("tool.validator.code.get_chat_model", lambda: RunnableLambda(_pass_even_tests_slowly))
+    def test_verdicts_are_assigned_to_tests_in_order(self):
+        solution = Solution(
+            context="",
+            task="",
+            form="code",
+            tests=[Test(description=f"Test no. {i}", form="code") for i in range(6)],
+        )
+        criticize(solution)
+        self.assertEqual(
+            [t.result for t in solution.tests], ["pass", "fail", "pass", "fail", "pass", "fail"]
+        )
+
+
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from tool.models import Solution, Test
+from tool.lru_cache import LRUCache
+from tool.validator.critic import critique_cache, critique_tests
+
+
+class Test_Critique_Cache(unittest.TestCase):
+
+    def setUp(self):
+        critique_cache.clear()
+        self.calls = 0
+        self.model = RunnableLambda(self._pass_tests_with_output_ok)
+        self.solution = Solution(
+            context="",
+            task="",
+            solution="def add_one(x: float) -> float:\n    return x + 1",
+            form="code",
+            tests=[
+                Test(description="Passing test", form="code", last_output="ok"),
+                Test(description="Failing test", form="code", last_output="AssertionError"),
+            ],
+        )
+
+    def _pass_tests_with_output_ok(self, messages: list) -> AIMessage:
+        self.calls += 1
+        if "Test result: ok" in str(messages[-1].content):
+            return AIMessage(content="The test passed. TEST_PASSED")
+        return AIMessage(content="The test failed.")
+
+    def test_unchanged_passed_test_is_not_critiqued_again(self):
+        critique_tests(self.solution, self.model, "")
+        critique_tests(self.solution, self.model, "")
+        self.assertEqual(self.calls, 3)
+        self.assertEqual([t.result for t in self.solution.tests], ["pass", "fail"])
+        self.assertEqual(
+            self.solution.tests[0].critique_of_last_run, "The test passed. TEST_PASSED"
+        )
+        self.assertEqual(critique_cache.hits, 1)
+        self.assertEqual(critique_cache.misses, 3)
+
+    def test_passed_test_is_critiqued_again_after_solution_changes(self):
+        critique_tests(self.solution, self.model, "")
+        self.solution.solution = "def add_one(x: float) -> float:\n    return x + 1.0"
+        critique_tests(self.solution, self.model, "")
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(critique_cache.hits, 0)
+
+    def test_passed_test_is_critiqued_again_after_its_output_changes(self):
+        critique_tests(self.solution, self.model, "")
+        self.solution.tests[0].last_output = "AssertionError"
+        critique_tests(self.solution, self.model, "")
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(self.solution.tests[0].result, "fail")
+
+
+class Test_LRU_Cache(unittest.TestCase):
+
+    def test_least_recently_used_value_is_evicted_when_cache_is_full(self):
+        cache: LRUCache[str, int] = LRUCache(maxsize=2)
+        cache.add("a", 1)
+        cache.add("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.add("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats(), {"hits": 3, "misses": 1, "size": 2})
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
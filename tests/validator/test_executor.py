@@ -0,0 +1,73 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from tool.validator.executor import SandboxedPool, TIMEOUT_MESSAGE
+
+
+class Test_Sandboxed_Pool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = SandboxedPool(size=2, cpu_time_limit=2, max_runs_per_worker=3)
+
+    def test_printed_output_is_returned(self):
+        self.assertEqual(self.pool.run("print(1 + 1)", timeout=5), "2\n")
+
+    def test_raised_error_is_returned(self):
+        output = self.pool.run("assert 1 == 2, 'One must equal two.'", timeout=5)
+        self.assertEqual(output, "AssertionError('One must equal two.')")
+
+    def test_state_does_not_leak_between_runs(self):
+        for _ in range(2):
+            self.pool.run("x = 1", timeout=5)
+        self.assertEqual(
+            self.pool.run("print(x)", timeout=5), "NameError(\"name 'x' is not defined\")"
+        )
+
+    def test_runaway_code_does_not_stall_other_runs(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            start = time.perf_counter()
+            runaway = executor.submit(self.pool.run, "import time\ntime.sleep(100)", 3)
+            time.sleep(0.1)
+            self.assertEqual(self.pool.run("print('done')", timeout=5), "done\n")
+            self.assertLess(time.perf_counter() - start, 2)
+            self.assertEqual(runaway.result(), TIMEOUT_MESSAGE)
+        self.assertEqual(self.pool.run("print('done')", timeout=5), "done\n")
+
+    def test_worker_slot_is_kept_when_replacement_cannot_start(self):
+        pool = SandboxedPool(size=1, cpu_time_limit=2, acquire_timeout=5)
+        try:
+            with patch.object(pool, "_new_worker", side_effect=OSError("Cannot start worker")):
+                with self.assertRaises(OSError):
+                    pool.run("import time\ntime.sleep(100)", timeout=0.5)
+            self.assertEqual(pool.run("print('done')", timeout=5), "done\n")
+        finally:
+            pool.close()
+
+    def test_closed_executor_cannot_run_code(self):
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            self.pool.run("print(1)", timeout=5)
+
+    def test_code_exceeding_cpu_time_limit_is_terminated(self):
+        output = self.pool.run("while True:\n    pass", timeout=30)
+        self.assertIn("CPU time limit", output)
+
+    def test_code_exceeding_memory_limit_raises_memory_error(self):
+        output = self.pool.run("x = bytearray(2 * 1024**3)", timeout=5)
+        self.assertEqual(output, "MemoryError()")
+
+    def test_workers_are_recycled(self):
+        pool = SandboxedPool(size=1, max_runs_per_worker=2)
+        pids = [pool.run("import os\nprint(os.getpid())", timeout=5) for _ in range(3)]
+        pool.close()
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def tearDown(self):
+        self.pool.close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from tool.llm import set_chat_model_factory
+from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+from tool.models import Solution, SolutionWithTestsToRun, Test
+from tool.validator import Validator
+from tool.validator.code import implementation_cache
+from tool.validator.critic import critique_cache
+
+
+def _answer_with_resources(prompt: str) -> str:
+    return "Yes, the constant is known." if "The constant is 42." in prompt else "No."
+
+
+RULES = [
+    ("verify the correctness of the solution by running the test", _answer_with_resources),
+    ("convert a test description into a test code", "assert add_one(1) == 2\nprint('passed')"),
+    *PIPELINE_RULES,
+]
+
+
+class Test_Tests_To_Run(unittest.TestCase):
+
+    def test_view_holds_indices_of_tests_not_criticized_yet(self):
+        solution = Solution(
+            context="",
+            task="",
+            tests=[
+                Test(description="A"),
+                Test(description="A", critique_of_last_run="TEST_PASSED"),
+                Test(description="A"),
+            ],
+        )
+        view = SolutionWithTestsToRun.from_solution(solution)
+        self.assertEqual(view.tests_to_run, [0, 2])
+        self.assertIs(view.tests[2], solution.tests[2])
+
+
+class Test_Review(unittest.TestCase):
+
+    def setUp(self):
+        set_chat_model_factory(lambda _: ScriptedChatModel(rules=RULES))
+        implementation_cache.clear()
+        critique_cache.clear()
+
+    def test_text_tests_are_run_with_resources_and_other_fields_are_kept(self):
+        solution = Solution(
+            context="Physics",
+            task="Find the constant.",
+            resources={"The constant": "The constant is 42."},
+            resource_forms={"The constant": "text"},
+            index_key="physics",
+            proposal_tries=2,
+            solution="The constant is 42.",
+            tests=[Test(description=f"Test no. {i}") for i in range(3)],
+        )
+        passed = Test(description="Passed", critique_of_last_run="Old. TEST_PASSED", result="pass")
+        solution.tests.insert(1, passed)
+        fields = solution.model_dump(exclude={"tests"})
+        tests = list(solution.tests)
+
+        reviewed = Validator().review(solution)
+
+        self.assertIs(reviewed, solution)
+        self.assertEqual(solution.model_dump(exclude={"tests"}), fields)
+        self.assertEqual([t.description for t in solution.tests], [t.description for t in tests])
+        self.assertEqual(passed.last_output, "")
+        for test in solution.tests[:1] + solution.tests[2:]:
+            self.assertEqual(test.last_output, "Yes, the constant is known.")
+            self.assertEqual(test.result, "pass")
+
+    def test_code_tests_are_run_in_order_with_and_without_concurrency(self):
+        for concurrency in (1, 4):
+            with self.subTest(concurrency=concurrency):
+                solution = Solution(
+                    context="",
+                    task="",
+                    form="code",
+                    solution="def add_one(x):\n    return x + 1",
+                    tests=[Test(description=f"Test no. {i}") for i in range(6)],
+                )
+                Validator(max_test_concurrency=concurrency).review(solution)
+                self.assertEqual(
+                    [t.description for t in solution.tests], [f"Test no. {i}" for i in range(6)]
+                )
+                self.assertTrue(all(t.last_output.strip() == "passed" for t in solution.tests))
+                self.assertTrue(all(t.result == "pass" for t in solution.tests))
+
+    def tearDown(self):
+        set_chat_model_factory()
+        implementation_cache.clear()
+        critique_cache.clear()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -1 +1,8 @@
-from .assistant import Assistant
+def __getattr__(name: str):
+    # The assistant pulls in the whole tool including the language model and database clients,
+    # so it is imported only when it is actually requested.
+    if name == "Assistant":
+        from .assistant import Assistant
+
+        return Assistant
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
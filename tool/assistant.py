@@ -1,18 +1,27 @@
+import asyncio
 import os
-from typing import Literal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterable, Iterator, Literal, NamedTuple
 
 from IPython.display import Image
 from langgraph.graph import StateGraph as _StateGraph, START, END
 from langgraph.graph.state import CompiledGraph
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage
 
+from tool.components import Components
+from tool.logs import get_logger
 from tool.solver import Solver
 from tool.models import State as _State, Solution as _Solution
-from tool.parsers import task_parser
+from tool.parsers import task_parser, atask_parser
+from tool.runnables import node as _node
+from tool.tracing import SpanSink, SpanTracker
 from tool.memory.resource_db import ResourceDB as _ResourceDB
 from tool.memory.solution_db import SolutionDB as _SolutionDB
 
 
+logger = get_logger()
+
+
 CHAT_MODEL = "gpt-4o-mini"
 CHAT_PROMPT = """
 You are a helpful and brief assistant, that helps me to formulate a task and when it is formulated, you call a tool to provide solution.
@@ -22,10 +31,37 @@ requires running and testing code.
 """
 
 
+class TaskResult(NamedTuple):
+    """Result of a single task from a batch of tasks. If the task failed, `message` is None and `error` is set."""
+
+    index: int
+    task: str
+    message: AIMessage | None = None
+    error: Exception | None = None
+
+
 class Assistant:
-    def __init__(self, memory_path):
-        self.solver = Solver(memory_path)
+
+    MAX_CONCURRENCY = 8
+
+    def __init__(
+        self,
+        memory_path: str,
+        components: Components | None = None,
+        span_sinks: Iterable[SpanSink] = (),
+    ) -> None:
+        """Create the assistant. The spans of the graph nodes run for each task are passed to the `span_sinks`."""
+        self.solver = Solver(memory_path, components)
+        self._span_sinks = list(span_sinks)
         self._compile_graph()
+        self._entry_graph: CompiledGraph | None = None
+
+    @property
+    def entry_graph(self) -> CompiledGraph:
+        """Get the graph processing a task formulated as a plain text. The graph is compiled on first use and then reused."""
+        if self._entry_graph is None:
+            self._entry_graph = self._compile_entry_graph()
+        return self._entry_graph
 
     @property
     def resource_db(self) -> _ResourceDB:
@@ -48,18 +84,79 @@ class Assistant:
         """This method accepts a task, thinks about the solution and returns it.
 
         It is recommended to include both task and a context. Formulate task as a plain text.
+        When the task is processed, the summary of the time and the model calls spent in each node is printed.
         """
         print(f"Processing task: {task}")
+        tracker = SpanTracker(self._span_sinks)
+        result = self.entry_graph.invoke(
+            _State(messages=[HumanMessage(content=task)]), {"callbacks": [tracker]}
+        )
+        print(f"Summary of task: {task}\n{tracker.summary()}")
+        return result["messages"][-1]
+
+    async def ainvoke(self, task: str) -> AIMessage:
+        """Asynchronous version of `invoke`. Multiple tasks can be processed concurrently by a single assistant."""
+        print(f"Processing task: {task}")
+        tracker = SpanTracker(self._span_sinks)
+        result = await self.entry_graph.ainvoke(
+            _State(messages=[HumanMessage(content=task)]), {"callbacks": [tracker]}
+        )
+        print(f"Summary of task: {task}\n{tracker.summary()}")
+        return result["messages"][-1]
+
+    def invoke_many(
+        self, tasks: Iterable[str], max_concurrency: int = MAX_CONCURRENCY
+    ) -> Iterator[TaskResult]:
+        """Process the tasks concurrently, at most `max_concurrency` at a time, and yield the result of each task
+        as soon as it is finished. The results carry the index of the task, as they are not yielded in the order of tasks.
+
+        All the tasks share the assistant's memory and caches. A failure of a task does not affect the other tasks.
+        """
+        assert max_concurrency > 0, "The concurrency limit must be a positive integer."
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [
+                executor.submit(self._invoke_task, index, task) for index, task in enumerate(tasks)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    async def ainvoke_many(
+        self, tasks: Iterable[str], max_concurrency: int = MAX_CONCURRENCY
+    ) -> AsyncIterator[TaskResult]:
+        """Asynchronous version of `invoke_many`."""
+        assert max_concurrency > 0, "The concurrency limit must be a positive integer."
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def ainvoke_task(index: int, task: str) -> TaskResult:
+            async with semaphore:
+                try:
+                    return TaskResult(index, task, message=await self.ainvoke(task))
+                except Exception as e:
+                    logger.exception(f"Task no. {index} failed: {task}")
+                    return TaskResult(index, task, error=e)
+
+        for result in asyncio.as_completed(
+            [ainvoke_task(index, task) for index, task in enumerate(tasks)]
+        ):
+            yield await result
+
+    def _invoke_task(self, index: int, task: str) -> TaskResult:
+        try:
+            return TaskResult(index, task, message=self.invoke(task))
+        except Exception as e:
+            logger.exception(f"Task no. {index} failed: {task}")
+            return TaskResult(index, task, error=e)
+
+    def _compile_entry_graph(self) -> CompiledGraph:
         builder = _StateGraph(_State)
-        builder.add_node("parse_task", task_parser, input=_State)
+        builder.add_node("parse_task", _node(task_parser, atask_parser), input=_State)
         builder.add_node("core", self._graph, input=_Solution)
         builder.add_node("output_solution", self._output_solution, input=_Solution)
         builder.add_edge(START, "parse_task")
         builder.add_edge("parse_task", "core")
         builder.add_edge("core", "output_solution")
         builder.add_edge("output_solution", END)
-        graph = builder.compile()
-        return graph.invoke(_State(messages=[HumanMessage(content=task)]))["messages"][-1]
+        return builder.compile()
 
     def _compile_graph(self) -> None:
         builder = _StateGraph(_Solution)
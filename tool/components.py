@@ -0,0 +1,95 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Callable, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+from tool.memory import SOLUTIONS_DIR_NAME, RESOURCES_DIR_NAME
+from tool.memory.embeddings import (
+    EMBEDDING_CACHE_FILE_NAME,
+    get_cached_embeddings as _get_cached_embeddings,
+)
+from tool.memory.recaller import Recaller
+from tool.memory.resource_db import ResourceDB, new_custom_database as _resource_db
+from tool.memory.solution_db import SolutionDB, get_solution_database as _solution_db
+from tool.memory.solution_index import SolutionIndex, SOLUTION_INDEX_FILE_NAME
+from tool.proposer.proposer import Compiler
+from tool.proposer.resources import ResourceManager
+from tool.validator import Validator
+
+
+_T = TypeVar("_T")
+
+
+class Components:
+    """This class provides the components of the tool working with a memory stored at `memory_path`.
+
+    Each component is created on first use and then shared by everyone asking for it, so there is a single client
+    for each database directory, a single resource manager with its agent and a single compiler per memory.
+    """
+
+    def __init__(self, memory_path: str, embeddings: Embeddings | None = None) -> None:
+        self._memory_path = memory_path
+        self._embeddings = embeddings
+        self._components: dict[str, object] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def memory_path(self) -> str:
+        return self._memory_path
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._get(
+            "embeddings",
+            lambda: self._embeddings
+            or _get_cached_embeddings(os.path.join(self._memory_path, EMBEDDING_CACHE_FILE_NAME)),
+        )
+
+    @property
+    def solution_db(self) -> SolutionDB:
+        return self._get(
+            "solution_db",
+            lambda: _solution_db(
+                os.path.join(self._memory_path, SOLUTIONS_DIR_NAME), self.embeddings
+            ),
+        )
+
+    @property
+    def resource_db(self) -> ResourceDB:
+        return self._get(
+            "resource_db",
+            lambda: _resource_db(
+                os.path.join(self._memory_path, RESOURCES_DIR_NAME), self.embeddings
+            ),
+        )
+
+    @property
+    def solution_index(self) -> SolutionIndex:
+        return self._get(
+            "solution_index",
+            lambda: SolutionIndex(os.path.join(self._memory_path, SOLUTION_INDEX_FILE_NAME)),
+        )
+
+    @property
+    def recaller(self) -> Recaller:
+        return self._get("recaller", lambda: Recaller(db=self.solution_db))
+
+    @property
+    def compiler(self) -> Compiler:
+        return self._get("compiler", Compiler)
+
+    @property
+    def resource_manager(self) -> ResourceManager:
+        return self._get("resource_manager", lambda: ResourceManager(db=self.resource_db))
+
+    @property
+    def validator(self) -> Validator:
+        return self._get("validator", Validator)
+
+    def _get(self, name: str, create: Callable[[], _T]) -> _T:
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = create()
+            return self._components[name]  # type: ignore
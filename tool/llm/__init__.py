@@ -0,0 +1,218 @@
+"""Chat models shared across the tool. A model is created on first use, not on import.
+
+All the models are created by a single gateway. By default, the gateway creates OpenAI chat models sharing one pool
+of HTTP connections. It can be configured to keep the models within the provider's rate limits, to cache
+the responses on disk or to answer by a local fake model, so the whole pipeline runs offline.
+"""
+
+from __future__ import annotations
+import functools
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, Literal
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from tool.llm.rate_limit import TokenBucket
+
+
+DEFAULT_MODEL = "gpt-4o-mini"
+MAX_CONNECTIONS = 20
+MAX_RETRIES = 2
+CHARS_PER_TOKEN = 4
+
+
+Backend = Literal["openai", "fake"]
+
+
+class RateLimitedChatOpenAI(ChatOpenAI):
+    """OpenAI chat model waiting for the capacity of the shared token bucket before sending each request.
+
+    The tokens of the request are estimated from the length of the messages. When the response reports the tokens
+    actually used, the difference is charged to the bucket.
+    """
+
+    token_bucket: TokenBucket | None = None
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimate = _estimate_tokens(messages)
+        if self.token_bucket is not None:
+            self.token_bucket.acquire(estimate)
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        self._charge_usage(result, estimate)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimate = _estimate_tokens(messages)
+        if self.token_bucket is not None:
+            await self.token_bucket.aacquire(estimate)
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+        self._charge_usage(result, estimate)
+        return result
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.token_bucket is not None:
+            self.token_bucket.acquire(_estimate_tokens(messages))
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.token_bucket is not None:
+            await self.token_bucket.aacquire(_estimate_tokens(messages))
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+    def _get_llm_string(self, stop: list[str] | None = None, **kwargs: Any) -> str:
+        """Key the cached responses by the model and its parameters only, leaving out the shared clients."""
+        params = {**self._get_invocation_params(stop=stop, **kwargs), **kwargs}
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def _charge_usage(self, result: ChatResult, estimate: int) -> None:
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        if self.token_bucket is not None and usage.get("total_tokens"):
+            self.token_bucket.charge(usage["total_tokens"] - estimate)
+
+
+def _estimate_tokens(messages: list[BaseMessage]) -> int:
+    return sum(len(str(m.content)) for m in messages) // CHARS_PER_TOKEN + 1
+
+
+class Gateway:
+    """This class creates the chat models of the tool.
+
+    All the OpenAI models share a single pool of HTTP connections and a single token bucket, if the rate limits are
+    given. If `cache_path` is given, the responses are cached in a SQLite database, keyed by the model, its
+    parameters and the messages, so a repeated prompt is answered without calling the provider. The cache is meant
+    for deterministic runs, e.g. tests and benchmarks. The fake backend answers all the prompts of the pipeline by
+    a scripted model taking `fake_latency` seconds per answer. Without `api_key`, the OpenAI models take the key
+    from the `OPENAI_API_KEY` environment variable.
+    """
+
+    def __init__(
+        self,
+        backend: Backend = "openai",
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        cache_path: str | None = None,
+        max_connections: int = MAX_CONNECTIONS,
+        max_retries: int = MAX_RETRIES,
+        fake_latency: float = 0.0,
+        api_key: str | None = None,
+    ) -> None:
+        self.backend = backend
+        self.token_bucket = (
+            TokenBucket(requests_per_minute, tokens_per_minute)
+            if requests_per_minute or tokens_per_minute
+            else None
+        )
+        self._cache_path = cache_path
+        self._max_connections = max_connections
+        self._max_retries = max_retries
+        self._fake_latency = fake_latency
+        self._api_key = api_key
+        self._clients: tuple[httpx.Client, httpx.AsyncClient] | None = None
+        self._cache: BaseCache | None = None
+        self._lock = threading.Lock()
+
+    def chat_model(self, model: str) -> BaseChatModel:
+        if self.backend == "fake":
+            from tool.llm.fake import ScriptedChatModel, PIPELINE_RULES
+
+            return ScriptedChatModel(
+                rules=PIPELINE_RULES,
+                latency=self._fake_latency,
+                model_name=model,
+                cache=self.cache,
+            )
+        client, async_client = self.clients
+        credentials = {} if self._api_key is None else {"api_key": self._api_key}
+        return RateLimitedChatOpenAI(
+            model=model,
+            http_client=client,
+            http_async_client=async_client,
+            max_retries=self._max_retries,
+            token_bucket=self.token_bucket,
+            cache=self.cache,
+            **credentials,
+        )
+
+    @property
+    def clients(self) -> tuple[httpx.Client, httpx.AsyncClient]:
+        with self._lock:
+            if self._clients is None:
+                limits = httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                )
+                self._clients = (httpx.Client(limits=limits), httpx.AsyncClient(limits=limits))
+            return self._clients
+
+    @property
+    def cache(self) -> BaseCache | None:
+        if self._cache_path is None:
+            return None
+        with self._lock:
+            if self._cache is None:
+                from tool.llm.cache import ResponseCache
+
+                self._cache = ResponseCache(database_path=self._cache_path)
+            return self._cache
+
+
+_factory: Callable[[str], BaseChatModel] = Gateway().chat_model
+
+
+@functools.cache
+def get_chat_model(model: str = DEFAULT_MODEL) -> BaseChatModel:
+    """Get the chat model of given name. All callers asking for the same model share a single client."""
+    return _factory(model)
+
+
+def set_chat_model_factory(factory: Callable[[str], BaseChatModel] | None = None) -> None:
+    """Create the chat models by the `factory` from now on. Without the factory, the default gateway is used.
+
+    Components already holding a chat model keep using it, so the factory should be set before creating them.
+    """
+    global _factory
+    _factory = factory or Gateway().chat_model
+    get_chat_model.cache_clear()
+
+
+def configure_gateway(**config: Any) -> Gateway:
+    """Create the chat models by a gateway configured by the keyword arguments of `Gateway` from now on.
+
+    Return the gateway. Like with `set_chat_model_factory`, the gateway should be configured before creating
+    the components of the tool.
+    """
+    gateway = Gateway(**config)
+    set_chat_model_factory(gateway.chat_model)
+    return gateway
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from langchain_community.cache import SQLiteCache
+from langchain_core.outputs import Generation
+
+
+CACHE_HIT = "cache_hit"
+"""Key of the generation info marking the generations returned from the cache."""
+
+
+class ResponseCache(SQLiteCache):
+    """SQLite cache of the chat model responses. The generations returned from the cache are marked,
+    so the callbacks can tell the cache hits from the calls to the provider."""
+
+    def lookup(self, prompt: str, llm_string: str) -> list[Generation] | None:
+        generations = super().lookup(prompt, llm_string)
+        for generation in generations or []:
+            generation.generation_info = {**(generation.generation_info or {}), CACHE_HIT: True}
+        return generations
@@ -0,0 +1,101 @@
+"""Fake chat model answering the prompts of the tool without calling any API.
+
+It is the backend of the gateway for running the whole pipeline offline, e.g. in tests and load tests.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Callable
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+Reply = str | AIMessage | Callable[[str], str | AIMessage]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """This chat model answers with the reply of the first rule, whose key is contained in the prompt.
+
+    Each answer takes `latency` seconds, simulating the round trip to the model provider.
+    """
+
+    rules: list[tuple[str, Any]]
+    """Pairs of a prompt substring and the reply, which is a string, a message or a function of the prompt."""
+    default: str = ""
+    latency: float = 0.0
+    model_name: str = "scripted"
+    """Name of the imitated model, reported to the callbacks."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":  # type: ignore
+        return self
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        reply: Reply = self.default
+        for key, rule_reply in self.rules:
+            if key in prompt:
+                reply = rule_reply
+                break
+        if callable(reply):
+            reply = reply(prompt)
+        message = reply if isinstance(reply, AIMessage) else AIMessage(content=reply)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def parsed_task(prompt: str) -> AIMessage:
+    """Reply to the task extractor with a text task given by the last line of the prompt."""
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "Solution",
+                "args": {"task": prompt.splitlines()[-1], "context": "Load test", "form": "text"},
+                "id": str(uuid.uuid4()),
+            }
+        ],
+    )
+
+
+# Replies to the prompts of the whole pipeline. Every task gets a single text test, which passes.
+PIPELINE_RULES: list[tuple[str, Any]] = [
+    ("Extract a task context", parsed_task),
+    ("What are the indices of the useful solutions", "[]"),
+    ("You must pick the first Recalled solution", "None"),
+    ("assess the best solution from the list", "Best solution: none"),
+    ("thinks about requirements on the solution", '["The answer is a number."]'),
+    ("helps me to verify solution to a given task", '["The answer is 42."]'),
+    ("experienced problem solver", "The answer is 42."),
+    ("helps me to design solution to a task", '["State the answer."]'),
+    ("collects for me a knowledge", "[]"),
+    ("convert a test description into specific questions", "Is the answer 42?"),
+    ("verify the correctness of the solution by running the test", "Yes, the answer is 42."),
+    ("You are a critic", "The answer matches the test. TEST_PASSED"),
+]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """This class schedules the requests to the model provider so they stay within the provider's rate limits.
+
+    Both the number of requests and the number of tokens are limited per minute. Each limit is a bucket, which
+    holds at most a minute's worth of capacity and refills continuously. A request waits until both buckets hold
+    enough capacity for it. A limit set to `None` is not applied.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._limits = (requests_per_minute, tokens_per_minute)
+        self._available = [requests_per_minute or 0.0, tokens_per_minute or 0.0]
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Wait until a request using `tokens` tokens can be sent and take its capacity from the buckets."""
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        """Asynchronous version of `acquire`. Waiting does not block the event loop."""
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def charge(self, tokens: int) -> None:
+        """Take additional tokens from the bucket, e.g. when a request used more tokens than estimated.
+        The negative number of tokens returns them to the bucket."""
+        with self._lock:
+            self._refill()
+            if self._limits[1] is not None:
+                self._available[1] = min(self._available[1] - tokens, self._limits[1])
+
+    def _reserve(self, tokens: int) -> float:
+        """Take the capacity for the request and return zero, if there is enough of it.
+        Otherwise, return the number of seconds to wait before trying again."""
+        needed = (1.0, float(tokens))
+        with self._lock:
+            self._refill()
+            wait = 0.0
+            for limit, available, amount in zip(self._limits, self._available, needed):
+                if limit is not None and available < min(amount, limit):
+                    wait = max(wait, (min(amount, limit) - available) * 60.0 / limit)
+            if wait == 0.0:
+                for i, amount in enumerate(needed):
+                    self._available[i] -= amount
+            return wait
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed, self._updated = now - self._updated, now
+        for i, limit in enumerate(self._limits):
+            if limit is not None:
+                self._available[i] = min(self._available[i] + elapsed * limit / 60.0, limit)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class LRUCache(Generic[_K, _V]):
+    """This class stores at most `maxsize` values. When it is full, adding a new value evicts the least recently used one.
+
+    The cache is thread-safe and counts the hits and misses of `get`.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        assert maxsize > 0, "The size of the cache must be a positive integer."
+        self.maxsize = maxsize
+        self._values: OrderedDict[_K, _V] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: _K) -> _V | None:
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._values.move_to_end(key)
+            return value
+
+    def add(self, key: _K, value: _V) -> None:
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def discard(self, key: _K) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._values)}
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,2 @@
+SOLUTIONS_DIR_NAME = "solutions"
+RESOURCES_DIR_NAME = "resources"
@@ -0,0 +1,114 @@
+"""Maintenance of the tool's memory.
+
+Usage:
+    python -m tool.memory import <jsonl> [--memory-path PATH] [--batch-size N]
+    python -m tool.memory compact [--memory-path PATH]
+    python -m tool.memory migrate [--memory-path PATH]
+
+Each line of the imported file contains a JSON of either a solution or a resource.
+The compaction keeps only the best stored solution for each task and removes the superseded ones.
+The migration moves solutions and resources stored as JSON in the metadata of the vector databases
+to the compressed payload stores.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from tool.models import Resource as _Resource, Solution as _Solution
+from tool.memory import SOLUTIONS_DIR_NAME, RESOURCES_DIR_NAME
+from tool.memory.resource_db import BATCH_SIZE, new_custom_database as _resource_db
+from tool.memory.solution_db import get_solution_database as _solution_db
+
+
+DEFAULT_MEMORY_PATH = "./data"
+
+
+def import_jsonl(
+    path: str,
+    memory_path: str,
+    batch_size: int = BATCH_SIZE,
+    embeddings: Embeddings | None = None,
+) -> dict[str, list[str]]:
+    """Import solutions and resources from a JSONL file into the memory at `memory_path`.
+
+    Return ids of the imported solutions and resources.
+    """
+    solutions: list[_Solution] = []
+    resources: list[_Resource] = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "request" in item:
+                resources.append(_Resource(**item))
+            else:
+                solutions.append(_Solution(**item))
+    ids: dict[str, list[str]] = {"solutions": [], "resources": []}
+    if solutions:
+        db = _solution_db(os.path.join(memory_path, SOLUTIONS_DIR_NAME), embeddings)
+        ids["solutions"] = db.add_many(solutions, batch_size)
+    if resources:
+        resource_db = _resource_db(os.path.join(memory_path, RESOURCES_DIR_NAME), embeddings)
+        ids["resources"] = resource_db.add_many(resources, batch_size)
+    return ids
+
+
+def compact(memory_path: str, embeddings: Embeddings | None = None) -> list[str]:
+    """Remove the superseded solutions from the memory at `memory_path`. Return ids of the removed solutions."""
+    db = _solution_db(os.path.join(memory_path, SOLUTIONS_DIR_NAME), embeddings)
+    return db.compact()
+
+
+def migrate(memory_path: str, embeddings: Embeddings | None = None) -> dict[str, int]:
+    """Move the solutions and resources of the memory at `memory_path` to the payload stores.
+
+    Return numbers of the migrated solutions and resources.
+    """
+    solution_db = _solution_db(os.path.join(memory_path, SOLUTIONS_DIR_NAME), embeddings)
+    resource_db = _resource_db(os.path.join(memory_path, RESOURCES_DIR_NAME), embeddings)
+    return {"solutions": solution_db.migrate(), "resources": resource_db.migrate()}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m tool.memory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import", help="Import solutions and resources from a JSONL file."
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--memory-path", default=DEFAULT_MEMORY_PATH)
+    import_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    compact_parser = commands.add_parser(
+        "compact", help="Remove superseded solutions of the same task."
+    )
+    compact_parser.add_argument("--memory-path", default=DEFAULT_MEMORY_PATH)
+    migrate_parser = commands.add_parser(
+        "migrate", help="Move stored solutions and resources to the payload stores."
+    )
+    migrate_parser.add_argument("--memory-path", default=DEFAULT_MEMORY_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        ids = import_jsonl(args.path, args.memory_path, args.batch_size)
+        print(
+            f"Imported {len(ids['solutions'])} solutions and {len(ids['resources'])} resources "
+            f"into '{args.memory_path}'."
+        )
+    elif args.command == "compact":
+        removed = compact(args.memory_path)
+        print(f"Removed {len(removed)} superseded solutions from '{args.memory_path}'.")
+    elif args.command == "migrate":
+        counts = migrate(args.memory_path)
+        print(
+            f"Migrated {counts['solutions']} solutions and {counts['resources']} resources "
+            f"in '{args.memory_path}'."
+        )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
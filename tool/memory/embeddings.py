@@ -0,0 +1,135 @@
+from __future__ import annotations
+import array
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_CACHE_FILE_NAME = "embedding_cache.sqlite"
+MAX_CACHED_EMBEDDINGS = 100_000
+
+
+class CachedEmbeddings(Embeddings):
+    """This class puts a persistent cache in front of the embeddings. The embeddings are stored in a SQLite database
+    keyed by the model name and hash of the embedded text.
+
+    When there are more than `max_entries` embeddings stored, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: str,
+        model: str = EMBEDDING_MODEL,
+        max_entries: int = MAX_CACHED_EMBEDDINGS,
+    ) -> None:
+        self._embeddings = embeddings
+        self._model = model
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._lookup(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            computed = dict(zip(missing, self._embeddings.embed_documents(missing)))
+            self._store(computed)
+            vectors = [computed[t] if v is None else v for t, v in zip(texts, vectors)]
+        return vectors  # type: ignore
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self._lookup([text])[0]
+        if vector is None:
+            vector = self._embeddings.embed_query(text)
+            self._store({text: vector})
+        return vector
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _key(self, text: str) -> str:
+        return self._model + ":" + hashlib.sha256(text.encode()).hexdigest()
+
+    def _lookup(self, texts: list[str]) -> list[list[float] | None]:
+        keys = [self._key(t) for t in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            found: dict[str, list[float]] = {}
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start : start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((key, array.array("d", vector).tolist()) for key, vector in rows)
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._connection.commit()
+            vectors = [found.get(key) for key in keys]
+            hits = sum(v is not None for v in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def _store(self, vectors: dict[str, list[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(self._key(t), array.array("d", v).tobytes(), now) for t, v in vectors.items()],
+            )
+            self._connection.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            self._connection.commit()
+
+
+_cached_embeddings: dict[tuple[str, str], CachedEmbeddings] = {}
+_cached_embeddings_lock = threading.Lock()
+
+
+def get_cached_embeddings(path: str, model: str = EMBEDDING_MODEL) -> CachedEmbeddings:
+    """Get OpenAI embeddings cached in the SQLite database at `path`. All callers asking for the same database
+    and model share a single instance."""
+    key = (os.path.abspath(path), model)
+    with _cached_embeddings_lock:
+        if key not in _cached_embeddings:
+            _cached_embeddings[key] = CachedEmbeddings(OpenAIEmbeddings(model=model), path, model)
+        return _cached_embeddings[key]
+
+
+def default_cache_path(persist_directory: str) -> str:
+    """Get the path of the embedding cache of a database opened without embeddings. The cache is stored in the
+    directory of the database, so that nothing is written outside of it."""
+    return os.path.join(persist_directory, EMBEDDING_CACHE_FILE_NAME)
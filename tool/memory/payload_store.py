@@ -0,0 +1,70 @@
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import zlib
+
+from langchain_core.documents import Document
+
+
+PAYLOAD_FILE_NAME = "payloads.sqlite"
+
+
+class PayloadStore:
+    """This class stores the full content of the items of a vector database, keyed by the ids of the items.
+
+    The vector database then holds only the embedded text and a few fields used for filtering, while the content
+    is compressed and loaded only for the items actually returned by a search.
+    """
+
+    def __init__(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS payloads (id TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def put_many(self, payloads: dict[str, str]) -> None:
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO payloads (id, data) VALUES (?, ?)",
+                [(id_, zlib.compress(payload.encode())) for id_, payload in payloads.items()],
+            )
+            self._connection.commit()
+
+    def get_many(self, ids: list[str]) -> dict[str, str]:
+        """Get the payloads of the items with given ids. The ids without any payload are missing in the result."""
+        found: dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                rows = self._connection.execute(
+                    f"SELECT id, data FROM payloads WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((id_, zlib.decompress(data).decode()) for id_, data in rows)
+        return found
+
+    def delete(self, ids: list[str]) -> None:
+        with self._lock:
+            self._connection.executemany("DELETE FROM payloads WHERE id = ?", [(i,) for i in ids])
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def hydrate(store: PayloadStore, results: list[tuple[Document, float]]) -> list[tuple[str, float]]:
+    """Get the payloads of the search results together with their scores. The items stored before the payloads
+    were moved to the payload store carry their payload in the `json` metadata field."""
+    payloads = store.get_many([d.id for d, _ in results if "json" not in d.metadata and d.id])
+    hydrated = []
+    for document, score in results:
+        payload = document.metadata.get("json") or payloads.get(str(document.id))
+        if payload is not None:
+            hydrated.append((str(payload), score))
+    return hydrated
@@ -1,15 +1,22 @@
 from __future__ import annotations
-from typing import Literal
+from typing import Any, Literal
+import asyncio
 import json
+from uuid import uuid4
 
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, AnyMessage
-from langchain_openai import ChatOpenAI
 
+from tool.llm import get_chat_model
 from tool.models import Solution as _Solution
+from tool.memory.thresholds import (
+    SimilarityThresholds as _SimilarityThresholds,
+    SOLUTION_THRESHOLDS as _SOLUTION_THRESHOLDS,
+)
 from tool.memory.solution_db import (
     get_solution_database as _get_database,
     SolutionDB as _SolutionDB,
 )
+from tool.memory.solution_index import SolutionIndex as _SolutionIndex
 
 
 SOLUTION_RECALL_PROMPT = """
@@ -65,9 +72,26 @@ You will respond with an index of that solution. If none of the solutions is rel
 
 class Recaller:
 
-    def __init__(self, db_dir_path: str, openai_model: str = "gpt-4o-mini") -> None:
-        self._db = _get_database(db_dir_path)
-        self._model = ChatOpenAI(model=openai_model)
+    def __init__(
+        self,
+        db_dir_path: str = "",
+        openai_model: str = "gpt-4o-mini",
+        db: _SolutionDB | None = None,
+        thresholds: _SimilarityThresholds = _SOLUTION_THRESHOLDS,
+        validated_only: bool = False,
+    ) -> None:
+        """Create the recaller. It uses the given solution database or opens the database at `db_dir_path`.
+
+        The `thresholds` decide, which recalled solutions are used directly or ignored based on their distance
+        from the task, without asking the model.
+
+        Only the solutions of the same form as the solved task are recalled. If `validated_only` is set,
+        the solutions, that did not pass all their tests, are not recalled either.
+        """
+        self._db = db or _get_database(db_dir_path)
+        self._model = get_chat_model(openai_model)
+        self._thresholds = thresholds
+        self._validated_only = validated_only
 
     @property
     def solution_db(self) -> _SolutionDB:
@@ -75,29 +99,34 @@ class Recaller:
 
     def recall(self, empty_solution: _Solution) -> _Solution:
         """Recall the solution from the memory and pick the most relevant. If none of the recalled solutions is relevant, return an empty solution."""
-        assert empty_solution.solution == "", "The solution must be empty."
-        assert empty_solution.task != "", "The task must be provided."
-        assert empty_solution.context != "", "The context must be provided."
-        assert len(empty_solution.requirements) > 0, "The requirements must be provided."
-        solutions: list[_Solution] = self._db.get_solutions(
-            empty_solution.task, empty_solution.context, empty_solution.requirements, k=3
-        )
-        directly_usable_solution_index = self._pick_directly_usable_solution(
-            empty_solution, solutions
-        )
-        # check solution form
+        result, solutions = self._recall_without_model(empty_solution, self._scored(empty_solution))
+        if result is not None:
+            return result
+        messages = self._usable_solution_messages(empty_solution, solutions)
+        directly_usable_solution_index = self._solution_index(self._ask(messages))
         if directly_usable_solution_index is not None:
-            solution = solutions[directly_usable_solution_index]
-            if solution.form == empty_solution.form:
-                solution.task = empty_solution.task
-                solution.context = empty_solution.context
-                solution.requirements = empty_solution.requirements
-                return solution
-
-        picked = self._pick_solutions(empty_solution, solutions)
-        picked_solutions_contents = ",\n".join(s.solution for s in picked)
-        empty_solution.similar_solutions = picked_solutions_contents
-        return empty_solution
+            return self._use_recalled(empty_solution, solutions[directly_usable_solution_index])
+
+        messages = self._pick_solutions_messages(empty_solution, solutions)
+        messages = self._indices_messages(messages, self._ask(messages))
+        picked = self._picked(solutions, self._ask(messages))
+        return self._with_similar_solutions(empty_solution, picked)
+
+    async def arecall(self, empty_solution: _Solution) -> _Solution:
+        """Asynchronous version of `recall`. The solution database is queried in a separate thread."""
+        scored = await asyncio.to_thread(self._scored, empty_solution)
+        result, solutions = self._recall_without_model(empty_solution, scored)
+        if result is not None:
+            return result
+        messages = self._usable_solution_messages(empty_solution, solutions)
+        directly_usable_solution_index = self._solution_index(await self._aask(messages))
+        if directly_usable_solution_index is not None:
+            return self._use_recalled(empty_solution, solutions[directly_usable_solution_index])
+
+        messages = self._pick_solutions_messages(empty_solution, solutions)
+        messages = self._indices_messages(messages, await self._aask(messages))
+        picked = self._picked(solutions, await self._aask(messages))
+        return self._with_similar_solutions(empty_solution, picked)
 
     def recalled_or_new(
         self,
@@ -108,10 +137,71 @@ class Recaller:
             return "recalled"
         return "new"
 
-    def _pick_directly_usable_solution(
-        self, empty_solution: _Solution, solutions: list[_Solution]
-    ) -> int | None:
+    def _scored(self, empty_solution: _Solution) -> list[tuple[_Solution, float]]:
+        assert empty_solution.solution == "", "The solution must be empty."
+        assert empty_solution.task != "", "The task must be provided."
+        assert empty_solution.context != "", "The context must be provided."
+        assert len(empty_solution.requirements) > 0, "The requirements must be provided."
+        return self._db.get_solutions_with_scores(
+            empty_solution.task,
+            empty_solution.context,
+            empty_solution.requirements,
+            k=3,
+            where=self._where(empty_solution),
+        )
 
+    def _recall_without_model(
+        self, empty_solution: _Solution, scored: list[tuple[_Solution, float]]
+    ) -> tuple[_Solution | None, list[_Solution]]:
+        """Return the result of the recall, if it is decided without the model, i.e., the closest solution is close
+        enough to be used directly, or there is no solution to be assessed. Otherwise, return the solutions
+        to be assessed by the model."""
+        accepted, solutions = self._accepted_and_candidates(scored)
+        if accepted is not None:
+            return self._use_recalled(empty_solution, accepted), []
+        if not solutions:
+            return empty_solution, []
+        return None, solutions
+
+    def _ask(self, messages: list[AnyMessage]) -> str:
+        return str(self._model.invoke(messages).content)
+
+    async def _aask(self, messages: list[AnyMessage]) -> str:
+        return str((await self._model.ainvoke(messages)).content)
+
+    def _accepted_and_candidates(
+        self, scored: list[tuple[_Solution, float]]
+    ) -> tuple[_Solution | None, list[_Solution]]:
+        """Return the closest solution, if it is close enough to be used directly.
+        Otherwise, return the solutions, that are not too distant, to be assessed by the model."""
+        candidates = []
+        for solution, distance in scored:
+            verdict = self._thresholds.verdict(distance)
+            if verdict == "accept" and not candidates:
+                return solution, []
+            if verdict != "reject":
+                candidates.append(solution)
+        return None, candidates
+
+    def _where(self, empty_solution: _Solution) -> dict[str, Any]:
+        if self._validated_only:
+            return {"$and": [{"form": empty_solution.form}, {"validated": True}]}
+        return {"form": empty_solution.form}
+
+    def _use_recalled(self, empty_solution: _Solution, solution: _Solution) -> _Solution:
+        """Adopt the recalled solution for the solved task. The solution adopted for another task gets a new id,
+        so that storing it does not replace the recalled solution of the original task."""
+        task_key = _SolutionIndex.key(solution)
+        solution.task = empty_solution.task
+        solution.context = empty_solution.context
+        solution.requirements = empty_solution.requirements
+        if _SolutionIndex.key(solution) != task_key:
+            solution.id = str(uuid4())
+        return solution
+
+    def _usable_solution_messages(
+        self, empty_solution: _Solution, solutions: list[_Solution]
+    ) -> list[AnyMessage]:
         recalled_solutions_str = "\n"
         for k in range(len(solutions)):
             recalled_solutions_str += f"{k:2}. Solution:\n" + self._recalled_solution_description(
@@ -123,8 +213,10 @@ class Recaller:
             f"Solution requirements: {', '.join(empty_solution.requirements)}\n"
             f"Recalled solutions: {recalled_solutions_str}"
         )
-        messages = [SystemMessage(content=USABLE_SOLUTION_PROMPT), HumanMessage(content=query)]
-        response = str(self._model.invoke(messages).content)
+        return [SystemMessage(content=USABLE_SOLUTION_PROMPT), HumanMessage(content=query)]
+
+    @staticmethod
+    def _solution_index(response: str) -> int | None:
         if response.isdigit():
             return int(response)
         return None
@@ -132,9 +224,9 @@ class Recaller:
     def _recalled_solution_description(self, solution: _Solution) -> str:
         return f"Task: {solution.task}\nContext: {solution.context}\nRequirements: {', '.join(solution.requirements)}"
 
-    def _pick_solutions(
+    def _pick_solutions_messages(
         self, empty_solution: _Solution, solutions: list[_Solution]
-    ) -> list[_Solution]:
+    ) -> list[AnyMessage]:
         solutions_str = ""
         for i, solution in enumerate(solutions):
             solutions_str += f"Solution {i}:\n{self._recalled_solution_description(solution)}\n"
@@ -146,14 +238,23 @@ class Recaller:
             requirements=requirements_str,
             solutions=solutions_str,
         )
-        messages: list[AnyMessage] = [SystemMessage(content=formatted_system_prompt)]
-        picked_solution = str(self._model.invoke(messages).content)
-        messages.append(AIMessage(content=picked_solution))
-        messages.append(
+        return [SystemMessage(content=formatted_system_prompt)]
+
+    @staticmethod
+    def _indices_messages(messages: list[AnyMessage], picked_solution: str) -> list[AnyMessage]:
+        return messages + [
+            AIMessage(content=picked_solution),
             HumanMessage(
                 content="What are the indices of the useful solutions? Return a list of integers separated by commas. If none of the solutions is relevant, return an empty list."
-            )
-        )
-        result = str(self._model.invoke(messages).content)
+            ),
+        ]
+
+    @staticmethod
+    def _picked(solutions: list[_Solution], result: str) -> list[_Solution]:
         indices = [int(i) for i in json.loads(result) if str(i).isdigit()]
         return [solutions[int(i)] for i in indices if 0 <= i < len(solutions)]
+
+    @staticmethod
+    def _with_similar_solutions(empty_solution: _Solution, picked: list[_Solution]) -> _Solution:
+        empty_solution.similar_solutions = ",\n".join(s.solution for s in picked)
+        return empty_solution
@@ -1,30 +1,89 @@
 from __future__ import annotations
-import json
+import os
+from uuid import uuid4
 
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 
+from tool.memory.embeddings import (
+    default_cache_path as _default_cache_path,
+    get_cached_embeddings as _get_cached_embeddings,
+)
+from tool.memory.payload_store import (
+    PayloadStore as _PayloadStore,
+    PAYLOAD_FILE_NAME,
+    hydrate as _hydrate,
+)
 from tool.models import Resource as _Resource, ResourceForm as _ResourceForm
 
 
+BATCH_SIZE = 256
+
+
 class ResourceDB:
 
-    def __init__(self, persist_directory: str) -> None:
+    def __init__(self, persist_directory: str, embeddings: Embeddings | None = None) -> None:
+        """Open the database. Unless `embeddings` are given, OpenAI embeddings cached in its directory are used.
+
+        The vector databases hold only the embedded request and the form and origin of each resource.
+        The whole resources are stored compressed in a payload store in the same directory.
+        """
+        embeddings = embeddings or _get_cached_embeddings(_default_cache_path(persist_directory))
         self._db = {
-            "code": self.create_db("code_db", persist_directory),
-            "text": self.create_db("text_db", persist_directory),
+            "code": self.create_db("code_db", persist_directory, embeddings),
+            "text": self.create_db("text_db", persist_directory, embeddings),
         }
+        self._payloads = _PayloadStore(os.path.join(persist_directory, PAYLOAD_FILE_NAME))
 
     def add(self, resource: _Resource) -> _Resource:
-        retrieval_query = f"Context: {resource.context}\nTask: {resource.request}"
-        id_ = self._db[resource.form].add_texts(
-            texts=[retrieval_query],
-            metadatas=[{"json": resource.model_dump_json(indent=4)}],
-        )[0]
-        resource.id = id_
+        id_ = self.add_many([resource])[0]
         print(f"Resource added to memory with id: {id_}")
         return resource
 
+    def add_many(self, resources: list[_Resource], batch_size: int = BATCH_SIZE) -> list[str]:
+        """Add the resources to memory. The resources are embedded and written in batches of `batch_size` items.
+        A resource is stored under its id, replacing the resource stored with the same id. Only the resources
+        without any id get a new one.
+
+        Return the ids of the resources in the order of the resources.
+        """
+        for resource in resources:
+            if not resource.id:
+                resource.id = str(uuid4())
+        for form, db in self._db.items():
+            of_form = [resource for resource in resources if resource.form == form]
+            for start in range(0, len(of_form), batch_size):
+                batch = of_form[start : start + batch_size]
+                self._payloads.put_many({r.id: r.model_dump_json() for r in batch})
+                db.add_texts(
+                    texts=[f"Context: {r.context}\nTask: {r.request}" for r in batch],
+                    metadatas=[self._metadata(r) for r in batch],
+                    ids=[r.id for r in batch],
+                )
+        return [resource.id for resource in resources]
+
+    def migrate(self) -> int:
+        """Move the resources stored as JSON in the metadata of the vector databases to the payload store.
+        Return the number of migrated resources."""
+        migrated = 0
+        for db in self._db.values():
+            records = db.get(include=["metadatas"])
+            legacy = {
+                i: m["json"] for i, m in zip(records["ids"], records["metadatas"]) if "json" in m
+            }
+            if not legacy:
+                continue
+            resources = {id_: _Resource.model_validate_json(j) for id_, j in legacy.items()}
+            for id_, r in resources.items():
+                r.id = id_
+            self._payloads.put_many({id_: r.model_dump_json() for id_, r in resources.items()})
+            db._collection.update(  # type: ignore
+                ids=list(resources),
+                metadatas=[{**self._metadata(r), "json": None} for r in resources.values()],
+            )
+            migrated += len(legacy)
+        return migrated
+
     def get(self, form: _ResourceForm, context: str, request: str, k: int = 3) -> list[_Resource]:
         """Retrieve most relevant resource from memory.
 
@@ -33,23 +92,35 @@ class ResourceDB:
         The `task` argument specifies the task of the resource.
         The `k` argument specifies the number of resources
         """
+        return [r for r, _ in self.get_with_scores(form, context, request, k)]
+
+    def get_with_scores(
+        self, form: _ResourceForm, context: str, request: str, k: int = 3
+    ) -> list[tuple[_Resource, float]]:
+        """Retrieve the `k` most similar resources together with their distances from the query,
+        ordered from the closest one."""
         request = f"Context: {context}\nTask: {request}"
+        results = self._db[form].similarity_search_with_score(request, k=k)
         return [
-            _Resource(**json.loads(d.metadata["json"]))
-            for d in self._db[form].similarity_search(request, k=k)
+            (_Resource.model_validate_json(payload), distance)
+            for payload, distance in _hydrate(self._payloads, results)
         ]
 
     @staticmethod
-    def create_db(collection_name: str, persist_directory: str) -> Chroma:
+    def _metadata(resource: _Resource) -> dict[str, str]:
+        return {"form": resource.form, "origin": resource.origin}
+
+    @staticmethod
+    def create_db(
+        collection_name: str, persist_directory: str, embeddings: Embeddings | None = None
+    ) -> Chroma:
         return Chroma(
             collection_name=collection_name,
-            embedding_function=OpenAIEmbeddings(model="text-embedding-3-small"),
+            embedding_function=embeddings
+            or _get_cached_embeddings(_default_cache_path(persist_directory)),
             persist_directory=persist_directory,
         )
 
 
-def new_custom_database(db_location: str = "") -> ResourceDB:
-    return ResourceDB(db_location)
-
-
-database = ResourceDB("./data")
+def new_custom_database(db_location: str = "", embeddings: Embeddings | None = None) -> ResourceDB:
+    return ResourceDB(db_location, embeddings)
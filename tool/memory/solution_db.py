@@ -1,42 +1,182 @@
 from __future__ import annotations
-import json
 import os
+import time
+from typing import Any
+from uuid import uuid4
 
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 
+from tool.memory.embeddings import (
+    default_cache_path as _default_cache_path,
+    get_cached_embeddings as _get_cached_embeddings,
+)
+from tool.memory.payload_store import (
+    PayloadStore as _PayloadStore,
+    PAYLOAD_FILE_NAME,
+    hydrate as _hydrate,
+)
+from tool.memory.solution_index import SolutionIndex as _SolutionIndex
 from tool.models import Solution as _Solution
 
 
+BATCH_SIZE = 256
+
+
 class SolutionDB:
 
-    def __init__(self, persist_directory: str) -> None:
+    def __init__(self, persist_directory: str, embeddings: Embeddings | None = None) -> None:
+        """Open the database. Unless `embeddings` are given, OpenAI embeddings cached in its directory are used.
+
+        The vector database holds only the task description and the fields used for filtering and compaction.
+        The whole solutions are stored compressed in a payload store in the same directory.
+        """
         self._db = Chroma(
             collection_name="solution",
-            embedding_function=OpenAIEmbeddings(model="text-embedding-3-small"),
+            embedding_function=embeddings
+            or _get_cached_embeddings(_default_cache_path(persist_directory)),
             persist_directory=persist_directory,
         )
+        self._payloads = _PayloadStore(os.path.join(persist_directory, PAYLOAD_FILE_NAME))
 
     def add_solution(self, solution: _Solution) -> _Solution:
-        id_ = self._db.add_texts(
-            texts=[solution.task_description],
-            metadatas=[{"json": solution.model_dump_json(indent=4)}],
-        )[0]
-        solution.id = id_
+        self.add_many([solution])
         return solution
 
+    def add_many(self, solutions: list[_Solution], batch_size: int = BATCH_SIZE) -> list[str]:
+        """Add the solutions to memory. The solutions are embedded and written in batches of `batch_size` items.
+        A solution is stored under its id, replacing the solution stored with the same id. Only the solutions
+        without any id get a new one.
+
+        Return the ids of the solutions in the order of the solutions.
+        """
+        for solution in solutions:
+            if not solution.id:
+                solution.id = str(uuid4())
+        for start in range(0, len(solutions), batch_size):
+            self._write(solutions[start : start + batch_size])
+        return [solution.id for solution in solutions]
+
+    def save(self, solution: _Solution) -> str:
+        """Store the solution under its id, replacing the previously stored version of the solution, if there is any.
+        A solution of another task stored under the same id is not replaced, the solution gets a new id instead.
+
+        Return the id of the solution.
+        """
+        stored = self._db.get(ids=[solution.id], include=["metadatas"])["metadatas"]
+        if stored and self._task_key(stored[0]) != _SolutionIndex.key(solution):
+            solution.id = str(uuid4())
+        self._write([solution])
+        return solution.id
+
+    def compact(self) -> list[str]:
+        """Remove the superseded solutions of the same task, keeping only the best one for each task. The validated
+        solutions are preferred, then the ones with the most passed tests and then the most recently stored ones.
+
+        Return the ids of the removed solutions.
+        """
+        records = self._db.get(include=["metadatas"])
+        best: dict[str, tuple[tuple, str]] = {}
+        removed: list[str] = []
+        for id_, metadata in zip(records["ids"], records["metadatas"]):
+            task_key = self._task_key(metadata)
+            rank = (
+                bool(metadata.get("validated", False)),
+                int(metadata.get("passed", 0)),
+                -int(metadata.get("failed", 0)),
+                float(metadata.get("stored", 0.0)),
+            )
+            if task_key not in best:
+                best[task_key] = (rank, id_)
+            elif rank > best[task_key][0]:
+                removed.append(best[task_key][1])
+                best[task_key] = (rank, id_)
+            else:
+                removed.append(id_)
+        if removed:
+            self._db.delete(ids=removed)
+            self._payloads.delete(removed)
+        return removed
+
+    def migrate(self) -> int:
+        """Move the solutions stored as JSON in the metadata of the vector database to the payload store
+        and add the fields used for filtering and compaction. Return the number of migrated solutions."""
+        records = self._db.get(include=["metadatas"])
+        legacy = [(i, m) for i, m in zip(records["ids"], records["metadatas"]) if "json" in m]
+        solutions = {id_: _Solution.model_validate_json(m["json"]) for id_, m in legacy}
+        for id_, s in solutions.items():
+            s.id = id_
+        self._payloads.put_many({id_: s.model_dump_json() for id_, s in solutions.items()})
+        if legacy:
+            metadatas = [
+                {**self._metadata(s), "stored": m.get("stored", 0.0), "json": None}
+                for (_, m), s in zip(legacy, solutions.values())
+            ]
+            self._db._collection.update(ids=list(solutions), metadatas=metadatas)  # type: ignore
+        return len(legacy)
+
+    def _write(self, solutions: list[_Solution]) -> None:
+        self._payloads.put_many({s.id: s.model_dump_json() for s in solutions})
+        self._db.add_texts(
+            texts=[solution.task_description for solution in solutions],
+            metadatas=[self._metadata(solution) for solution in solutions],
+            ids=[solution.id for solution in solutions],
+        )
+
+    @staticmethod
+    def _task_key(metadata: dict[str, Any]) -> str:
+        if "task_key" in metadata:
+            return str(metadata["task_key"])
+        return _SolutionIndex.key(_Solution.model_validate_json(metadata["json"]))
+
+    @staticmethod
+    def _metadata(solution: _Solution) -> dict[str, str | int | float | bool]:
+        passed = sum(test.result == "pass" for test in solution.tests)
+        failed = sum(test.result == "fail" for test in solution.tests)
+        return {
+            "form": solution.form,
+            "task_key": _SolutionIndex.key(solution),
+            "validated": bool(solution.tests) and passed == len(solution.tests),
+            "passed": passed,
+            "failed": failed,
+            "stored": time.time(),
+        }
+
     def get_solutions(
-        self, task: str, context: str, requirements: list[str], k: int = 3
+        self,
+        task: str,
+        context: str,
+        requirements: list[str],
+        k: int = 3,
+        where: dict[str, Any] | None = None,
     ) -> list[_Solution]:
+        return [s for s, _ in self.get_solutions_with_scores(task, context, requirements, k, where)]
+
+    def get_solutions_with_scores(
+        self,
+        task: str,
+        context: str,
+        requirements: list[str],
+        k: int = 3,
+        where: dict[str, Any] | None = None,
+    ) -> list[tuple[_Solution, float]]:
+        """Retrieve the `k` most similar solutions together with their distances from the query,
+        ordered from the closest one.
+
+        The `where` argument is a Chroma metadata filter, e.g. `{"form": "code"}`, applied before the search,
+        so all the `k` retrieved solutions satisfy it. The filterable fields are `form`, `validated`, `passed`,
+        `failed` and `stored`.
+        """
         requirement_str = "\n".join(requirements)
         query = f"Task: {task}\nContext: {context}\nRequirements: {requirement_str}"
+        results = self._db.similarity_search_with_score(query, k=k, filter=where)
         return [
-            _Solution(**json.loads(d.metadata["json"]))
-            for d in self._db.similarity_search(query, k=k)
+            (_Solution.model_validate_json(payload), distance)
+            for payload, distance in _hydrate(self._payloads, results)
         ]
 
 
-def get_solution_database(path: str) -> SolutionDB:
+def get_solution_database(path: str, embeddings: Embeddings | None = None) -> SolutionDB:
     """Create a SolutionDB instance, providing access to a Chroma vector database (https://www.trychroma.com/).
     The database is created in the directory specified by the `path` argument.
 
@@ -44,4 +184,4 @@ def get_solution_database(path: str) -> SolutionDB:
     """
     if not os.path.exists(path):
         os.makedirs(path)
-    return SolutionDB(path)
+    return SolutionDB(path, embeddings)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tool.models import Solution as _Solution
+
+
+SOLUTION_INDEX_FILE_NAME = "solution_index.sqlite"
+
+
+class SolutionIndex:
+    """This class maps the exact formulation of a task to its validated solution.
+
+    The solutions are stored in a SQLite database keyed by a hash of the task, context, requirements and form,
+    so that a repeated task is answered without any vector search or a call to the language model.
+    """
+
+    def __init__(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions "
+            "(key TEXT PRIMARY KEY, solution TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(solution: _Solution) -> str:
+        """Get the canonical hash of the task formulation. The whitespace and the order of requirements do not matter."""
+
+        def normalized(text: str) -> str:
+            return " ".join(text.split())
+
+        data = [
+            normalized(solution.task),
+            normalized(solution.context),
+            sorted(normalized(r) for r in solution.requirements),
+            solution.form,
+        ]
+        return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+    def get(self, key: str) -> _Solution | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT solution FROM solutions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return _Solution.model_validate_json(row[0])
+
+    def add(self, key: str, solution: _Solution) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO solutions (key, solution, updated) VALUES (?, ?, ?)",
+                (key, solution.model_dump_json(), time.time()),
+            )
+            self._connection.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
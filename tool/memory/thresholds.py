@@ -0,0 +1,37 @@
+import math
+from typing import Literal
+
+
+Verdict = Literal["accept", "reject", "judge"]
+
+
+class SimilarityThresholds:
+    """This class decides about a recalled item using only its vector distance from the query.
+
+    Items closer than `accept_below` are accepted and items farther than `reject_above` are rejected without asking
+    the language model. The items in between are left to be judged by the model. The distances are the Chroma's
+    default squared L2 distances, which for normalized embeddings range from 0 (identical) to 4 (opposite).
+    """
+
+    def __init__(self, accept_below: float = 0.0, reject_above: float = math.inf) -> None:
+        assert accept_below <= reject_above, "The acceptance threshold exceeds the rejection one."
+        self.accept_below = accept_below
+        self.reject_above = reject_above
+
+    def verdict(self, distance: float) -> Verdict:
+        if distance < self.accept_below:
+            return "accept"
+        if distance > self.reject_above:
+            return "reject"
+        return "judge"
+
+    def __repr__(self) -> str:
+        return f"SimilarityThresholds(accept_below={self.accept_below}, reject_above={self.reject_above})"
+
+
+# Every recalled item is judged by the model.
+NO_THRESHOLDS = SimilarityThresholds()
+# A resource is stored under the same text it is searched by, so a repeated request is an almost exact match.
+RESOURCE_THRESHOLDS = SimilarityThresholds(accept_below=0.05, reject_above=1.4)
+# A solution is searched also by its context, that is not part of the stored text, so only the rejection is used.
+SOLUTION_THRESHOLDS = SimilarityThresholds(reject_above=1.4)
@@ -37,12 +37,16 @@ class Solution(pydantic.BaseModel):
     requirements: list[str] = pydantic.Field(default_factory=list)
     structure: list[str] = pydantic.Field(default_factory=list)
     resources: Annotated[dict[str, str], dict_reducer] = pydantic.Field(default_factory=dict)
+    resource_forms: Annotated[dict[str, ResourceForm], dict_reducer] = pydantic.Field(
+        default_factory=dict
+    )
     tests: list[Test] = pydantic.Field(default_factory=list)
     form: Literal["text", "code"] = "text"
     solution: str = ""
     similar_solutions: str = ""
-    id: str = str(uuid4())
+    id: str = pydantic.Field(default_factory=lambda: str(uuid4()))
     proposal_tries: int = 0
+    index_key: str = ""
 
     def empty(self) -> bool:
         return not bool(self.solution.strip())
@@ -57,6 +61,7 @@ class Test(pydantic.BaseModel):
 
     description: str
     implementation: str = ""
+    implementation_key: str = ""
     form: TestForm = "text"
     last_output: str = ""
     critique_of_last_run: str = ""
@@ -64,53 +69,19 @@ class Test(pydantic.BaseModel):
 
 
 class SolutionWithTestsToRun(pydantic.BaseModel):
-    task: str
-    context: str
-    requirements: list[str]
-    resources: dict[str, str]
-    structure: list[str]
-    tests_to_run: dict[int, Test]
-    run_tests: dict[int, Test]
-    form: ResourceForm = "text"
-    proposal_tries: int
+    """This class is a view of a solution for the nodes implementing and running the tests. It holds only
+    the solution text and the tests, with the tests yet to be run referenced by their indices."""
+
     solution: str
+    tests: list[Test]
+    tests_to_run: list[int]
 
     @staticmethod
     def from_solution(solution: Solution) -> SolutionWithTestsToRun:
-        tests_to_run, run_tests = dict(), dict()
-        for t in solution.tests:
-            if t.critique_of_last_run:
-                run_tests[solution.tests.index(t)] = t
-            else:
-                tests_to_run[solution.tests.index(t)] = t
+        """Get the view of the solution, with the tests, that have not been criticized yet, to be run."""
+        tests_to_run = [i for i, t in enumerate(solution.tests) if not t.critique_of_last_run]
         return SolutionWithTestsToRun(
-            task=solution.task,
-            context=solution.context,
-            resources=solution.resources,
-            requirements=solution.requirements,
-            structure=solution.structure,
-            tests_to_run=tests_to_run,
-            run_tests=run_tests,
-            form=solution.form,
-            solution=solution.solution,
-            proposal_tries=solution.proposal_tries,
-        )
-
-    @staticmethod
-    def to_solution(solution_with_next_test: SolutionWithTestsToRun) -> Solution:
-        all_tests = solution_with_next_test.tests_to_run.copy()
-        all_tests.update(solution_with_next_test.run_tests)
-        tests = [all_tests[k] for k in sorted(all_tests.keys())]
-        return Solution(
-            task=solution_with_next_test.task,
-            requirements=solution_with_next_test.requirements,
-            context=solution_with_next_test.context,
-            resources=solution_with_next_test.resources,
-            structure=solution_with_next_test.structure,
-            tests=tests,
-            form=solution_with_next_test.form,
-            solution=solution_with_next_test.solution,
-            proposal_tries=solution_with_next_test.proposal_tries,
+            solution=solution.solution, tests=solution.tests, tests_to_run=tests_to_run
         )
 
 
@@ -120,4 +91,4 @@ class Resource(pydantic.BaseModel):
     request: str
     content: str
     origin: str = "unknown"
-    id: str = str(uuid4())
+    id: str = pydantic.Field(default_factory=lambda: str(uuid4()))
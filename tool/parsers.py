@@ -1,12 +1,13 @@
-from langchain_openai import ChatOpenAI
+import functools
+
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import Runnable
 from trustcall import create_extractor
 
+from tool.llm import get_chat_model
 from tool.models import Solution as _Solution, State as _State
 
 
-model = ChatOpenAI(name="gpt-4o-mini")
-task_extractor = create_extractor(model, tools=[_Solution], tool_choice="Solution")
 TASK_EXTRACTOR_PROMPT = (
     "Extract a task context and the required form of solution from the following messages."
 )
@@ -17,5 +18,17 @@ def task_parser(state: _State) -> _Solution:
     containing the task - an empty solution.
     """
     messages = [SystemMessage(TASK_EXTRACTOR_PROMPT)] + state["messages"]  # type: ignore
-    result: _Solution = task_extractor.invoke({"messages": messages})["responses"][0]
+    result: _Solution = _task_extractor().invoke({"messages": messages})["responses"][0]
     return _Solution(task=result.task, context=result.context, form=result.form)
+
+
+async def atask_parser(state: _State) -> _Solution:
+    """Asynchronous version of `task_parser`."""
+    messages = [SystemMessage(TASK_EXTRACTOR_PROMPT)] + state["messages"]  # type: ignore
+    result: _Solution = (await _task_extractor().ainvoke({"messages": messages}))["responses"][0]
+    return _Solution(task=result.task, context=result.context, form=result.form)
+
+
+@functools.cache
+def _task_extractor() -> Runnable:
+    return create_extractor(get_chat_model(), tools=[_Solution], tool_choice="Solution")
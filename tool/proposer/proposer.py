@@ -1,9 +1,8 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
 
+from tool.llm import get_chat_model
 from tool.logs import get_logger
 from tool.models import Solution as _Solution, State as _State
-from tool.memory.solution_db import get_solution_database as _get_database
 
 
 logger = get_logger()
@@ -29,12 +28,32 @@ Please, follow these guidelines:
 """
 
 
+_REPAIR_SOLUTION_PROMPT = """
+You are an experienced problem solver, that helps me to fix a solution to a task, which failed some of its tests.
+I will provide you with a following information:
+
+Context: ...
+Task: ...
+Information resources: ...
+Previous solution: ...
+Failed tests: ...
+
+Please, follow these guidelines:
+- Address the critique from the last run of every failed test.
+- Keep the parts of the Previous solution, that are not concerned by any critique, unchanged.
+- Use the provided Resources for fixing the solution. Do not make any assumptions or ad-hoc information retrievals.
+- Write only the whole fixed solution. DO NOT write tests into the solution. Do not write anything else.
+{form_specific_guidelines}
+"""
+
+
 CODE_GUIDELINES = """
 - Add type hints to the function arguments and return value, for example
     def my_function(arg1: int, arg2: str) -> float:
        ...
 - First write any helper functions if needed. Then write the main function solving the task.
 - Do not write any tests or examples.
+- Respond with the code only, without any code block marks.
 """
 
 
@@ -45,12 +64,57 @@ TEXT_GUIDELINES = """
 
 class Compiler:
 
-    def __init__(self, db_dir_path: str, openai_model: str = "gpt-4o-mini") -> None:
-        self._db = _get_database(db_dir_path)
-        self._model = ChatOpenAI(model=openai_model)
+    def __init__(self, openai_model: str = "gpt-4o-mini") -> None:
+        """Create the compiler. The proposed solutions are not stored, as only the solution that went through
+        the validation is stored by the solver."""
+        self._model = get_chat_model(openai_model)
 
     def compile(self, solution: _Solution) -> _Solution:
-        """Propose a solution to the task and store it in the solution database."""
+        """Propose a solution to the task."""
+        messages = self._messages(solution)
+        solution.proposal_tries += 1
+        logger.debug(f"Compiling solution for task: {solution.task}")
+        solution.solution = str(self._model.invoke(messages).content)
+        logger.debug(
+            f"Compiled solution (attempt no. {solution.proposal_tries}): {solution.solution}"
+        )
+        return solution
+
+    async def acompile(self, solution: _Solution) -> _Solution:
+        """Asynchronous version of `compile`."""
+        messages = self._messages(solution)
+        solution.proposal_tries += 1
+        logger.debug(f"Compiling solution for task: {solution.task}")
+        solution.solution = str((await self._model.ainvoke(messages)).content)
+        logger.debug(
+            f"Compiled solution (attempt no. {solution.proposal_tries}): {solution.solution}"
+        )
+        return solution
+
+    def repair(self, solution: _Solution) -> _Solution:
+        """Fix the previous solution, so that it addresses the critiques of the failed tests. Unlike `compile`,
+        the prompt contains only the failed tests and not the solution structure."""
+        messages = self._repair_messages(solution)
+        solution.proposal_tries += 1
+        logger.debug(f"Repairing solution for task: {solution.task}")
+        solution.solution = str(self._model.invoke(messages).content)
+        logger.debug(
+            f"Repaired solution (attempt no. {solution.proposal_tries}): {solution.solution}"
+        )
+        return solution
+
+    async def arepair(self, solution: _Solution) -> _Solution:
+        """Asynchronous version of `repair`."""
+        messages = self._repair_messages(solution)
+        solution.proposal_tries += 1
+        logger.debug(f"Repairing solution for task: {solution.task}")
+        solution.solution = str((await self._model.ainvoke(messages)).content)
+        logger.debug(
+            f"Repaired solution (attempt no. {solution.proposal_tries}): {solution.solution}"
+        )
+        return solution
+
+    def _messages(self, solution: _Solution) -> list[BaseMessage]:
         query = (
             f"Context: {solution.context}\n"
             f"Task: {solution.task}\n"
@@ -62,7 +126,7 @@ class Compiler:
         form_specific_guidelines = (
             CODE_GUIDELINES if solution.structure == "code" else TEXT_GUIDELINES
         )
-        messages = [
+        return [
             SystemMessage(
                 content=_PROPOSE_SOLUTION_PROMPT.format(
                     form_specific_guidelines=form_specific_guidelines
@@ -70,15 +134,27 @@ class Compiler:
             ),
             HumanMessage(content=query),
         ]
-        solution.proposal_tries += 1
-        logger.debug(f"Compiling solution for task: {solution.task}")
-        solution_content = str(self._model.invoke(messages).content)
-        solution.solution = solution_content
-        self._db.add_solution(solution)
-        logger.debug(
-            f"Compiled solution (attempt no. {solution.proposal_tries}): {solution_content}"
+
+    def _repair_messages(self, solution: _Solution) -> list[BaseMessage]:
+        failed_tests = "\n".join(
+            f"- {test.description}\n  Critique: {test.critique_of_last_run}"
+            for test in solution.tests
+            if test.result == "fail"
         )
-        return solution
+        query = (
+            f"Context: {solution.context}\n"
+            f"Task: {solution.task}\n"
+            f"Information resources: {solution.resources}\n"
+            f"Previous solution: {solution.solution}\n"
+            f"Failed tests:\n{failed_tests}"
+        )
+        guidelines = CODE_GUIDELINES if solution.form == "code" else TEXT_GUIDELINES
+        return [
+            SystemMessage(
+                content=_REPAIR_SOLUTION_PROMPT.format(form_specific_guidelines=guidelines)
+            ),
+            HumanMessage(content=query),
+        ]
 
     def print_solution(self, solution: _Solution) -> _State:
         return _State(messages=[AIMessage(content=solution.solution)])
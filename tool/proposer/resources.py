@@ -1,10 +1,12 @@
+import asyncio
 import json
 import os
+import re
 from typing import TypedDict
 
 from IPython.display import Image
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from langchain_core.runnables import Runnable
 from langgraph.prebuilt.chat_agent_executor import create_react_agent
 from langchain_community.tools.wikipedia.tool import WikipediaQueryRun, WikipediaAPIWrapper
 from langchain_community.tools import DuckDuckGoSearchRun
@@ -12,8 +14,20 @@ from langgraph.graph import StateGraph as _StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph as _CompiledStateGraph
 from langgraph.constants import Send
 
+from tool.llm import get_chat_model
 from tool.logs import get_logger
-from tool.models import Solution as _Solution, ResourceForm, EMPTY_RESOURCE
+from tool.runnables import node as _node
+from tool.single_flight import SingleFlight as _SingleFlight
+from tool.models import (
+    Solution as _Solution,
+    Resource as _Resource,
+    ResourceForm,
+    EMPTY_RESOURCE,
+)
+from tool.memory.thresholds import (
+    SimilarityThresholds as _SimilarityThresholds,
+    RESOURCE_THRESHOLDS as _RESOURCE_THRESHOLDS,
+)
 from tool.memory.resource_db import ResourceDB as _ResourceDB, new_custom_database as _resource_db
 
 
@@ -24,6 +38,28 @@ class ResourceInfo(TypedDict):
     task: str
     context: str
     request: str
+    form: ResourceForm | None
+
+
+CODE_KEYWORDS = ("code", "python", "snippet", "function", "program", "script")
+TEXT_KEYWORDS = ("text", "definition", "explanation", "description", "summary", "number", "value")
+
+
+def classify_resource_form(request: str) -> ResourceForm | None:
+    """Decide the form of the resource from the keywords in the request, without asking the language model.
+
+    Only the whole words in the statement of the expected result at the end of the request ("I expect ...")
+    are considered. Return None, if there is no such statement, or if it names both forms or none of them.
+    """
+    request = request.lower()
+    if "i expect" not in request:
+        return None
+    words = set(re.findall(r"\w+", request.rpartition("i expect")[2]))
+    is_code = not words.isdisjoint(CODE_KEYWORDS)
+    is_text = not words.isdisjoint(TEXT_KEYWORDS)
+    if is_code == is_text:
+        return None
+    return "code" if is_code else "text"
 
 
 _IDENTIFY_SOURCES_PROMPT = """
@@ -60,6 +96,32 @@ Do not write anything else except the list.
 """
 
 
+_IDENTIFY_SOURCES_FROM_CRITIQUES_PROMPT = """
+You are a helpful assistant, that collects for me a knowledge missing in a solution of given task.
+The solution failed some of its tests and each failed test has a critique.
+
+I will give you the following information:
+
+Task: ...
+Context: ...
+Critiques of the failed tests: ...
+Already requested resources: ...
+
+You will then write for me a list of new requests for resources, that are necessary to address the critiques
+and that are not among the Already requested resources.
+If the critiques can be addressed without any new information, just return an empty list.
+
+Otherwise, for each item, provide description of the source required in the form "Give me <resource description>.
+I expect <form of the result/response>. For example:
+[
+    "I need to find the definition of the term 'machine learning'. I expect to get it as a plain text.",
+    "I need a Pythonic program for calculating the least common divisor. I expect to get it as a Python code snippet."
+    ...
+]
+Do not write anything else except the list.
+"""
+
+
 _RESOURCE_FORM_PROMPT = """
 You are a helpful assistant that is focused on deciding the form of a resource.
 
@@ -132,16 +194,33 @@ class ResourceManager:
 
     SINGLE_RESOURCE_NODE = "get_resource"
 
-    def __init__(self, db_dir_path: str, openai_model: str = "gpt-4o-mini") -> None:
-        self._model = ChatOpenAI(model=openai_model)
-        self._form_model = ChatOpenAI(model="gpt-3.5-turbo")
+    def __init__(
+        self,
+        db_dir_path: str = "",
+        openai_model: str = "gpt-4o-mini",
+        db: _ResourceDB | None = None,
+        classify_forms_locally: bool = False,
+        thresholds: _SimilarityThresholds = _RESOURCE_THRESHOLDS,
+    ) -> None:
+        """Create the resource manager. It uses the given resource database or opens the database at `db_dir_path`.
+
+        With `classify_forms_locally`, the language model decides the form of a resource only if the form cannot
+        be recognized from the keywords in the expected result stated in the request. The `thresholds` decide,
+        which recalled resources are accepted or rejected based on their distance from the request, without
+        assessing their relevance by the model.
+        """
+        self._model = get_chat_model(openai_model)
+        self._form_model = get_chat_model("gpt-3.5-turbo")
         _wikis = [
             WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(lang=lang))
             for lang in ["en", "de", "fr", "es", "it", "cs", "sk", "pl", "ru", "uk", "ja", "zh"]
         ]
         _external_tools = [DuckDuckGoSearchRun(), *_wikis]  # type: ignore
         self._provider = create_react_agent(self._model, tools=_external_tools)
-        self._resource_db = _resource_db(db_dir_path)
+        self._resource_db = db or _resource_db(db_dir_path)
+        self._in_flight: _SingleFlight[str] = _SingleFlight()
+        self._classify_forms_locally = classify_forms_locally
+        self._thresholds = thresholds
         self._construct_graph()
 
     @property
@@ -153,14 +232,52 @@ class ResourceManager:
         """Get the solver's compiled graph."""
         return self._graph
 
+    @property
+    def repair_graph(self) -> _CompiledStateGraph:
+        """Get the graph getting only the resources newly requested by the critiques of the failed tests.
+        The resources already obtained for the solution are kept."""
+        return self._repair_graph
+
     def invoke(self, solution: _Solution) -> _Solution:
         return self._graph.invoke(solution)
 
+    async def ainvoke(self, solution: _Solution) -> _Solution:
+        return await self._graph.ainvoke(solution)
+
     def print_graph_png(self, path: str, name: str = "resource_manager") -> None:
         with open(os.path.join(path, name.rstrip(".png") + ".png"), "wb") as f:
             f.write(Image(self._graph.get_graph().draw_mermaid_png()).data)
 
     def get_new_requests_for_resources(self, solution: _Solution) -> list[str]:
+        messages = self._new_requests_messages(solution)
+        new_requests = json.loads(str(self._model.invoke(messages).content))
+        return new_requests
+
+    async def aget_new_requests_for_resources(self, solution: _Solution) -> list[str]:
+        messages = self._new_requests_messages(solution)
+        return json.loads(str((await self._model.ainvoke(messages)).content))
+
+    def get_requests_from_critiques(self, solution: _Solution) -> list[str]:
+        messages = self._critique_requests_messages(solution)
+        if messages is None:
+            return []
+        return json.loads(str(self._model.invoke(messages).content))
+
+    async def aget_requests_from_critiques(self, solution: _Solution) -> list[str]:
+        messages = self._critique_requests_messages(solution)
+        if messages is None:
+            return []
+        return json.loads(str((await self._model.ainvoke(messages)).content))
+
+    def memory_relevance(self, task: str, context: str, request: str, memory: str) -> str:
+        answer = self._model.invoke(self._relevance_messages(task, context, request, memory))
+        return str(answer.content)
+
+    async def amemory_relevance(self, task: str, context: str, request: str, memory: str) -> str:
+        answer = await self._model.ainvoke(self._relevance_messages(task, context, request, memory))
+        return str(answer.content)
+
+    def _new_requests_messages(self, solution: _Solution) -> list[BaseMessage]:
         assert isinstance(solution, _Solution), f"Expected Solution, got {type(solution)}"
         task, context = solution.task, solution.context
         requests = solution.resources.keys()
@@ -170,71 +287,243 @@ class ResourceManager:
             f"Solution structure: {solution.structure}\n"
             f"Already requested resources: {requests})"
         )
-        messages = [SystemMessage(_IDENTIFY_SOURCES_PROMPT), HumanMessage(query)]
-        new_requests = json.loads(str(self._model.invoke(messages).content))
-        return new_requests
+        return [SystemMessage(_IDENTIFY_SOURCES_PROMPT), HumanMessage(query)]
+
+    def _critique_requests_messages(self, solution: _Solution) -> list[BaseMessage] | None:
+        """Get the messages asking for the resources missing according to the critiques of the failed tests.
+        Return None, if there is no such critique."""
+        critiques = [
+            test.critique_of_last_run
+            for test in solution.tests
+            if test.result == "fail" and test.critique_of_last_run.strip()
+        ]
+        if not critiques:
+            return None
+        query = (
+            f"Task: {solution.task}\n"
+            f"Context: {solution.context}\n"
+            f"Critiques of the failed tests: {critiques}\n"
+            f"Already requested resources: {list(solution.resources.keys())}"
+        )
+        return [SystemMessage(_IDENTIFY_SOURCES_FROM_CRITIQUES_PROMPT), HumanMessage(query)]
 
-    def memory_relevance(self, task: str, context: str, request: str, memory: str) -> str:
+    def _relevance_messages(
+        self, task: str, context: str, request: str, memory: str
+    ) -> list[BaseMessage]:
         query = f"Task: {task}\nContext: {context}\nRequest: {request}\nMemory: {memory}"
-        answer = self._model.invoke(
-            [SystemMessage(_ASSESS_RESOURCE_RELEVANCE_PROMPT), HumanMessage(query)]
-        )
-        return str(answer.content)
+        return [SystemMessage(_ASSESS_RESOURCE_RELEVANCE_PROMPT), HumanMessage(query)]
 
     def _add_requests(self, solution: _Solution) -> _Solution:
+        """Add the new requests for resources to the solution together with the forms of the resources."""
         assert isinstance(solution, _Solution), f"Expected _Solution, got {type(solution)}"
         new_requests = self.get_new_requests_for_resources(solution)
-        solution.resources.update({request: EMPTY_RESOURCE for request in new_requests})
+        solution.resources = {**solution.resources, **dict.fromkeys(new_requests, EMPTY_RESOURCE)}
+        solution.resource_forms = {**solution.resource_forms, **self._resource_forms(new_requests)}
+        return solution
+
+    async def _aadd_requests(self, solution: _Solution) -> _Solution:
+        new_requests = await self.aget_new_requests_for_resources(solution)
+        solution.resources = {**solution.resources, **dict.fromkeys(new_requests, EMPTY_RESOURCE)}
+        forms = await self._aresource_forms(new_requests)
+        solution.resource_forms = {**solution.resource_forms, **forms}
+        return solution
+
+    def _add_requests_from_critiques(self, solution: _Solution) -> _Solution:
+        """Add the requests for resources missing according to the critiques of the failed tests."""
+        new_requests = self.get_requests_from_critiques(solution)
+        solution.resources = {**solution.resources, **dict.fromkeys(new_requests, EMPTY_RESOURCE)}
+        solution.resource_forms = {**solution.resource_forms, **self._resource_forms(new_requests)}
+        return solution
+
+    async def _aadd_requests_from_critiques(self, solution: _Solution) -> _Solution:
+        new_requests = await self.aget_requests_from_critiques(solution)
+        solution.resources = {**solution.resources, **dict.fromkeys(new_requests, EMPTY_RESOURCE)}
+        forms = await self._aresource_forms(new_requests)
+        solution.resource_forms = {**solution.resource_forms, **forms}
         return solution
 
     def _construct_graph(self) -> None:
+        self._graph = self._compile_graph(
+            "add_requests", _node(self._add_requests, self._aadd_requests)
+        )
+        self._repair_graph = self._compile_graph(
+            "add_requests_from_critiques",
+            _node(self._add_requests_from_critiques, self._aadd_requests_from_critiques),
+        )
+
+    def _compile_graph(self, requests_node: str, add_requests: Runnable) -> _CompiledStateGraph:
+        """Compile the graph adding the requests for resources and then getting all the requested resources,
+        that are still missing, at the same time."""
         bld = _StateGraph(_Solution)
-        bld.add_node("add_requests", self._add_requests, input=_Solution)
-        bld.add_node(self.SINGLE_RESOURCE_NODE, self._get_single_resource, input=ResourceInfo)
+        bld.add_node(requests_node, add_requests, input=_Solution)
+        bld.add_node(
+            self.SINGLE_RESOURCE_NODE,
+            _node(self._get_single_resource, self._aget_single_resource),
+            input=ResourceInfo,
+        )
 
-        bld.add_edge(START, "add_requests")
+        bld.add_edge(START, requests_node)
         bld.add_conditional_edges(
-            "add_requests", self._get_resources, [self.SINGLE_RESOURCE_NODE, END]
+            requests_node, self._get_resources, [self.SINGLE_RESOURCE_NODE, END]
         )
         bld.add_edge(self.SINGLE_RESOURCE_NODE, END)
-        self._graph = bld.compile()
+        return bld.compile()
 
     def _get_resources(self, solution: _Solution) -> list[Send]:
         return [
             Send(
                 self.SINGLE_RESOURCE_NODE,
-                ResourceInfo(task=solution.task, context=solution.context, request=request),
+                ResourceInfo(
+                    task=solution.task,
+                    context=solution.context,
+                    request=request,
+                    form=solution.resource_forms.get(request),
+                ),
             )
             for request in solution.resources
             if not solution.resources[request] or solution.resources[request] == EMPTY_RESOURCE
         ]
 
     def _get_single_resource(self, info: ResourceInfo) -> dict:
-        result = self._get_single_memory(info)
-        content = result["resources"][info["request"]]
+        """Get the resource from memory or a new one from the provider. Concurrent requests for the same resource
+        share a single search, so that the new resource is obtained and stored in memory only once."""
+        form = info.get("form") or self._resource_forms([info["request"]])[info["request"]]
+        content = self._in_flight.do(
+            self._flight_key(info["request"], form), lambda: self._get_content(info, form)
+        )
+        return {"resources": {info["request"]: content}}
+
+    async def _aget_single_resource(self, info: ResourceInfo) -> dict:
+        form = info.get("form") or (await self._aresource_forms([info["request"]]))[info["request"]]
+        content = await self._in_flight.ado(
+            self._flight_key(info["request"], form), lambda: self._aget_content(info, form)
+        )
+        return {"resources": {info["request"]: content}}
+
+    def _get_content(self, info: ResourceInfo, form: ResourceForm) -> str:
+        content = self._pick_relevant_recalled_result(
+            info["task"], info["context"], info["request"], form
+        )
+        if not content or content == EMPTY_RESOURCE:
+            messages = self._new_resource_messages(info["request"], form)
+            content = str(self._provider.invoke({"messages": messages})["messages"][-1].content)
+            self._resource_db.add(self._new_resource(info, form, content))
+        return content
+
+    async def _aget_content(self, info: ResourceInfo, form: ResourceForm) -> str:
+        content = await self._apick_relevant_recalled_result(
+            info["task"], info["context"], info["request"], form
+        )
         if not content or content == EMPTY_RESOURCE:
-            result = self._get_single_new_resource(info["request"])
-        return result
-
-    def _get_single_memory(self, info: ResourceInfo) -> dict:
-        memory = self._pick_relevant_recalled_result(info["task"], info["context"], info["request"])
-        return {"resources": {info["request"]: memory}}
-
-    def _get_single_new_resource(self, request: str) -> dict:
-        query = f"Request: {request}\nForm: {self._resource_form(request)}"
-        messages = [SystemMessage(_GET_RESOURCE_PROMPT), HumanMessage(query)]
-        response = self._provider.invoke({"messages": messages})["messages"][-1].content
-        return {"resources": {request: response}}
-
-    def _resource_form(self, request: str) -> ResourceForm:
-        form_query = f"Query: {request}"
-        form_messages = [SystemMessage(_RESOURCE_FORM_PROMPT), HumanMessage(form_query)]
-        return "code" if "code" in self._form_model.invoke(form_messages).content else "text"
-
-    def _pick_relevant_recalled_result(self, task: str, context: str, request: str) -> str:
-        form = self._resource_form(request)
-        results = self._resource_db.get(form, context, request)
-        for result in results:
-            if "True" in self.memory_relevance(task, context, request, result.content):
-                return result
+            messages = self._new_resource_messages(info["request"], form)
+            response = await self._provider.ainvoke({"messages": messages})
+            content = str(response["messages"][-1].content)
+            await asyncio.to_thread(self._resource_db.add, self._new_resource(info, form, content))
+        return content
+
+    @staticmethod
+    def _flight_key(request: str, form: ResourceForm) -> tuple[str, str]:
+        return " ".join(request.lower().split()), form
+
+    @staticmethod
+    def _new_resource(info: ResourceInfo, form: ResourceForm, content: str) -> _Resource:
+        return _Resource(
+            form=form,
+            context=info["context"],
+            request=info["request"],
+            content=content,
+            origin="provider",
+        )
+
+    def _new_resource_messages(self, request: str, form: ResourceForm) -> list[BaseMessage]:
+        query = f"Request: {request}\nForm: {form}"
+        return [SystemMessage(_GET_RESOURCE_PROMPT), HumanMessage(query)]
+
+    def _resource_forms(self, requests: list[str]) -> dict[str, ResourceForm]:
+        """Decide the forms of the requested resources. The forms, that are not obvious from the requests,
+        are decided by the language model in a single batch."""
+        forms, undecided = self._locally_classified_forms(requests)
+        responses = self._form_model.batch([self._resource_form_messages(r) for r in undecided])
+        forms.update(zip(undecided, map(self._form_from_response, responses)))
+        return forms
+
+    async def _aresource_forms(self, requests: list[str]) -> dict[str, ResourceForm]:
+        forms, undecided = self._locally_classified_forms(requests)
+        responses = await self._form_model.abatch(
+            [self._resource_form_messages(r) for r in undecided]
+        )
+        forms.update(zip(undecided, map(self._form_from_response, responses)))
+        return forms
+
+    def _locally_classified_forms(
+        self, requests: list[str]
+    ) -> tuple[dict[str, ResourceForm], list[str]]:
+        forms: dict[str, ResourceForm] = {}
+        if self._classify_forms_locally:
+            for request in requests:
+                form = classify_resource_form(request)
+                if form is not None:
+                    forms[request] = form
+        return forms, [r for r in requests if r not in forms]
+
+    @staticmethod
+    def _form_from_response(response: BaseMessage) -> ResourceForm:
+        return "code" if "code" in str(response.content) else "text"
+
+    def _resource_form_messages(self, request: str) -> list[BaseMessage]:
+        return [SystemMessage(_RESOURCE_FORM_PROMPT), HumanMessage(f"Query: {request}")]
+
+    def _pick_relevant_recalled_result(
+        self, task: str, context: str, request: str, form: ResourceForm
+    ) -> str:
+        """Return content of the highest ranked recalled resource, that is relevant to the request.
+
+        The resources close enough to the request are relevant and the distant ones are not, without asking the model.
+        The relevance of the remaining resources ranked above the first relevant one is assessed in a single batch.
+        """
+        candidates = self._candidates(self._resource_db.get_with_scores(form, context, request))
+        answers = self._model.batch(
+            [
+                self._relevance_messages(task, context, request, r.content)
+                for r, accepted in candidates
+                if not accepted
+            ]
+        )
+        return self._first_relevant(candidates, answers)
+
+    async def _apick_relevant_recalled_result(
+        self, task: str, context: str, request: str, form: ResourceForm
+    ) -> str:
+        scored = await asyncio.to_thread(self._resource_db.get_with_scores, form, context, request)
+        candidates = self._candidates(scored)
+        answers = await self._model.abatch(
+            [
+                self._relevance_messages(task, context, request, r.content)
+                for r, accepted in candidates
+                if not accepted
+            ]
+        )
+        return self._first_relevant(candidates, answers)
+
+    def _candidates(self, scored: list[tuple[_Resource, float]]) -> list[tuple[_Resource, bool]]:
+        """Get the resources that are not rejected, up to the first accepted one, with a flag marking the accepted one.
+        Only the resources without the flag need to be assessed by the model."""
+        candidates: list[tuple[_Resource, bool]] = []
+        for resource, distance in scored:
+            verdict = self._thresholds.verdict(distance)
+            if verdict == "accept":
+                candidates.append((resource, True))
+                break
+            if verdict == "judge":
+                candidates.append((resource, False))
+        return candidates
+
+    def _first_relevant(
+        self, candidates: list[tuple[_Resource, bool]], answers: list[BaseMessage]
+    ) -> str:
+        to_be_judged = [resource for resource, accepted in candidates if not accepted]
+        verdicts = {id(r): "True" in str(a.content) for r, a in zip(to_be_judged, answers)}
+        for resource, accepted in candidates:
+            if accepted or verdicts[id(resource)]:
+                return resource.content
         return EMPTY_RESOURCE
@@ -1,8 +1,8 @@
 import json
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 
+from tool.llm import get_chat_model
 from tool.models import Solution, Solution
 
 
@@ -25,17 +25,24 @@ Do not write anything else.
 """
 
 
-_model = ChatOpenAI(model="gpt-4o-mini")
+def draft_solution(solution: Solution) -> Solution:
+    result = get_chat_model().invoke(_messages(solution))
+    solution.structure = list(json.loads(str(result.content)))
+    return solution
 
 
-def draft_solution(solution: Solution) -> Solution:
+async def adraft_solution(solution: Solution) -> Solution:
+    """Asynchronous version of `draft_solution`."""
+    result = await get_chat_model().ainvoke(_messages(solution))
+    solution.structure = list(json.loads(str(result.content)))
+    return solution
+
+
+def _messages(solution: Solution) -> list[BaseMessage]:
     task_str = (
         f"Task: {solution.task}\n"
         f"Context: {solution.context}\n"
         f"Requirements: {solution.requirements}\n"
         f"Tests: {solution.tests}"
     )
-    messages = [SystemMessage(content=SOLUTION_PROMPT), HumanMessage(content=task_str)]
-    result = _model.invoke(messages)
-    solution.structure = list(json.loads(str(result.content)))
-    return solution
+    return [SystemMessage(content=SOLUTION_PROMPT), HumanMessage(content=task_str)]
@@ -1,8 +1,8 @@
 import json
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 
+from tool.llm import get_chat_model
 from tool.models import Solution
 
 
@@ -32,13 +32,20 @@ Do not write anything else.
 """
 
 
-_model = ChatOpenAI(model="gpt-4o-mini")
-
-
 def get_requirements(empty_solution: Solution) -> Solution:
-    task_str = f"Task: {empty_solution.task}\nContext: {empty_solution.context}"
-    messages = [SystemMessage(content=SOLUTION_REQUIREMENT_PROMPT), HumanMessage(content=task_str)]
-    result = _model.invoke(messages)
+    result = get_chat_model().invoke(_messages(empty_solution))
     reqs = list(json.loads(str(result.content)))
     empty_solution.requirements = reqs
     return empty_solution
+
+
+async def aget_requirements(empty_solution: Solution) -> Solution:
+    """Asynchronous version of `get_requirements`."""
+    result = await get_chat_model().ainvoke(_messages(empty_solution))
+    empty_solution.requirements = list(json.loads(str(result.content)))
+    return empty_solution
+
+
+def _messages(empty_solution: Solution) -> list[BaseMessage]:
+    task_str = f"Task: {empty_solution.task}\nContext: {empty_solution.context}"
+    return [SystemMessage(content=SOLUTION_REQUIREMENT_PROMPT), HumanMessage(content=task_str)]
@@ -0,0 +1,11 @@
+from typing import Any, Awaitable, Callable
+
+from langchain_core.runnables import Runnable, RunnableLambda
+
+
+def node(func: Callable[..., Any], afunc: Callable[..., Awaitable[Any]]) -> Runnable:
+    """Combine synchronous and asynchronous implementation of a graph node.
+
+    The graph calls `func`, when it is invoked, and awaits `afunc`, when it is invoked asynchronously.
+    """
+    return RunnableLambda(func, afunc=afunc)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+_T = TypeVar("_T")
+
+
+class SingleFlight(Generic[_T]):
+    """This class makes concurrent calls with the same key share a single computation.
+
+    The first caller computes the result, while the others wait for it. When the computation finishes, the key is
+    released, so the next call with the key computes the result again. If the computation raises, all the waiting
+    callers get the exception.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future[_T]] = {}
+        self._async_calls: dict[tuple[int, Hashable], asyncio.Future[_T]] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, compute: Callable[[], _T]) -> _T:
+        """Return the result of `compute`, unless there already is a computation running for the key.
+        In that case, wait for the running computation and return its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    async def ado(self, key: Hashable, compute: Callable[[], Awaitable[_T]]) -> _T:
+        """Asynchronous version of `do`. Only the callers running in the same event loop share the computation."""
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(loop_key)
+            leader = future is None
+            if future is None:
+                future = self._async_calls[loop_key] = loop.create_future()
+            else:
+                self.shared += 1
+        if not leader:
+            return await asyncio.shield(future)
+        try:
+            future.set_result(await compute())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._async_calls[loop_key]
+        return future.result()
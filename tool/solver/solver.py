@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Literal
 
@@ -6,53 +7,70 @@ from langgraph.graph.state import CompiledStateGraph as _CompiledStateGraph
 from langchain_core.messages import AIMessage, HumanMessage
 from IPython.display import Image
 
+from tool.components import Components
 from tool.models import Solution as _Solution, State as _State
-from tool.memory.recaller import Recaller
-from tool.proposer.proposer import Compiler
-from tool.proposer.resources import ResourceManager
-from tool.parsers import task_parser
-from tool.requirements.requirements import get_requirements
-from tool.test_writer.tests import get_tests
-from tool.proposer.structure import draft_solution
-from tool.validator import Validator
+from tool.parsers import task_parser, atask_parser
+from tool.requirements.requirements import get_requirements, aget_requirements
+from tool.test_writer.tests import get_tests, aget_tests
+from tool.proposer.structure import draft_solution, adraft_solution
+from tool.runnables import node as _node
 from tool.memory.resource_db import ResourceDB as _ResourceDB
 from tool.memory.solution_db import SolutionDB as _SolutionDB
-
-
-SOLUTIONS_DIR_NAME = "solutions"
-RESOURCES_DIR_NAME = "resources"
+from tool.memory.solution_index import SolutionIndex as _SolutionIndex
 
 
 class Proposer:
 
-    def __init__(self, memory_path: str) -> None:
+    def __init__(self, memory_path: str, components: Components | None = None) -> None:
         self._memory_path = memory_path
-        self._resource_manager = ResourceManager(os.path.join(memory_path, RESOURCES_DIR_NAME))
-        self._compiler = Compiler(os.path.join(memory_path, SOLUTIONS_DIR_NAME))
+        components = components or Components(memory_path)
+        self._resource_manager = components.resource_manager
+        self._compiler = components.compiler
         self._construct_graph()
         assert self._graph is not None
+        self._entry_graph: _CompiledStateGraph | None = None
 
     @property
     def graph(self) -> _CompiledStateGraph:
         """Get the solver's compiled graph."""
         return self._graph
 
+    @property
+    def repair_graph(self) -> _CompiledStateGraph:
+        """Get the graph fixing a solution, that failed some of its tests. It keeps the structure and resources
+        of the solution and gets only the resources newly requested by the critiques."""
+        return self._repair_graph
+
     @property
     def resource_db(self) -> _ResourceDB:
         return self._resource_manager.db
 
+    @property
+    def entry_graph(self) -> _CompiledStateGraph:
+        """Get the graph solving a task given as a plain text. It is compiled on first use and then reused."""
+        if self._entry_graph is None:
+            self._entry_graph = self._compile_entry_graph()
+        return self._entry_graph
+
     def invoke(self, task: str) -> AIMessage:
-        """Build an ad-hoc graph to solve a task."""
+        """Solve a task using the precompiled entry graph."""
+        return self.entry_graph.invoke({"messages": [HumanMessage(content=task)]})["messages"][-1]
+
+    async def ainvoke(self, task: str) -> AIMessage:
+        """Solve a task asynchronously, so that multiple tasks can be solved concurrently."""
+        result = await self.entry_graph.ainvoke({"messages": [HumanMessage(content=task)]})
+        return result["messages"][-1]
+
+    def _compile_entry_graph(self) -> _CompiledStateGraph:
         builder = _StateGraph(_State)
-        builder.add_node("parse_task", task_parser)
+        builder.add_node("parse_task", _node(task_parser, atask_parser), input=_State)
         builder.add_node("propose", self._graph, input=_Solution)
         builder.add_node("print_solution", self._print_solution, input=_Solution)
         builder.add_edge(START, "parse_task")
         builder.add_edge("parse_task", "propose")
         builder.add_edge("propose", "print_solution")
         builder.add_edge("print_solution", END)
-        graph = builder.compile()
-        return graph.invoke({"messages": [HumanMessage(content=task)]})["messages"][-1]
+        return builder.compile()
 
     def print_graph_png(self, path: str, name: str = "solver") -> None:
         with open(os.path.join(path, name.rstrip(".png") + ".png"), "wb") as f:
@@ -61,9 +79,13 @@ class Proposer:
     def _construct_graph(self) -> None:
         builder = _StateGraph(_Solution)
 
-        builder.add_node("get_structure", draft_solution, input=_Solution)
+        builder.add_node("get_structure", _node(draft_solution, adraft_solution), input=_Solution)
         builder.add_node("get_resources", self._resource_manager.graph, input=_Solution)
-        builder.add_node("compile_solution", self._compiler.compile, input=_Solution)
+        builder.add_node(
+            "compile_solution",
+            _node(self._compiler.compile, self._compiler.acompile),
+            input=_Solution,
+        )
 
         builder.add_edge(START, "get_structure")
         builder.add_edge("get_structure", "get_resources")
@@ -71,6 +93,20 @@ class Proposer:
         builder.add_edge("compile_solution", END)
         self._graph = builder.compile()
 
+        builder = _StateGraph(_Solution)
+        builder.add_node(
+            "get_requested_resources", self._resource_manager.repair_graph, input=_Solution
+        )
+        builder.add_node(
+            "repair_solution",
+            _node(self._compiler.repair, self._compiler.arepair),
+            input=_Solution,
+        )
+        builder.add_edge(START, "get_requested_resources")
+        builder.add_edge("get_requested_resources", "repair_solution")
+        builder.add_edge("repair_solution", END)
+        self._repair_graph = builder.compile()
+
     def _print_solution(self, solution: _Solution) -> _State:
         return _State(messages=[AIMessage(content=solution.solution)])
 
@@ -79,20 +115,39 @@ class IterativeProposer:
 
     MAX_ATTEMPTS = 2
 
-    def __init__(self, memory_path: str) -> None:
+    def __init__(
+        self,
+        memory_path: str,
+        components: Components | None = None,
+        proposer: Proposer | None = None,
+    ) -> None:
         self._memory_path = memory_path
-        self._proposer = Proposer(memory_path)
-        self._validator = Validator()
+        components = components or Components(memory_path)
+        self._proposer = proposer or Proposer(memory_path, components)
+        self._validator = components.validator
         self._construct_graph()
         assert self._graph is not None
+        self._entry_graph: _CompiledStateGraph | None = None
 
     @property
     def graph(self) -> _CompiledStateGraph:
         """Get the solver's compiled graph."""
         return self._graph
 
+    @property
+    def entry_graph(self) -> _CompiledStateGraph:
+        """Get the graph solving a task given as a solution. It is compiled on first use and then reused."""
+        if self._entry_graph is None:
+            self._entry_graph = self._compile_entry_graph()
+        return self._entry_graph
+
     def invoke(self, solution: _Solution) -> AIMessage:
-        """Build an ad-hoc graph to solve a task."""
+        """Solve a task using the precompiled entry graph."""
+        return self.entry_graph.invoke(
+            {"messages": [HumanMessage(content=str(solution.model_dump_json(indent=4)))]}
+        )["messages"][-1]
+
+    def _compile_entry_graph(self) -> _CompiledStateGraph:
         builder = _StateGraph(_Solution)
         builder.add_node("solve", self._graph, input=_Solution)
         builder.add_node("print_solution", self._print_solution, input=_Solution)
@@ -100,11 +155,7 @@ class IterativeProposer:
         builder.add_edge(START, "solve")
         builder.add_edge("solve", "print_solution")
         builder.add_edge("print_solution", END)
-
-        graph = builder.compile()
-        return graph.invoke(
-            {"messages": [HumanMessage(content=str(solution.model_dump_json(indent=4)))]}
-        )["messages"][-1]
+        return builder.compile()
 
     def print_graph_png(self, path: str, name: str = "solver") -> None:
         with open(os.path.join(path, name.rstrip(".png") + ".png"), "wb") as f:
@@ -114,13 +165,17 @@ class IterativeProposer:
         builder = _StateGraph(_Solution)
 
         builder.add_node("input", self._input, input=_Solution)
-        builder.add_node("propose", self._proposer.graph, input=_Solution)
-        builder.add_node("validate", self._validator.review, input=_Solution)
+        builder.add_node("repair", self._proposer.repair_graph, input=_Solution)
+        builder.add_node("reset_test_runs", self._reset_test_runs, input=_Solution)
+        builder.add_node(
+            "validate", _node(self._validator.review, self._validator.areview), input=_Solution
+        )
 
         builder.add_edge(START, "input")
         builder.add_edge("input", "validate")
-        builder.add_conditional_edges("validate", self._retry, {"retry": "propose", "end": END})
-        builder.add_edge("propose", "validate")
+        builder.add_conditional_edges("validate", self._retry, {"retry": "repair", "end": END})
+        builder.add_edge("repair", "reset_test_runs")
+        builder.add_edge("reset_test_runs", "validate")
         self._graph = builder.compile()
 
     def _failed_test(self, solution: _Solution) -> bool:
@@ -133,6 +188,16 @@ class IterativeProposer:
     def _print_solution(self, solution: _Solution) -> _State:
         return _State(messages=[AIMessage(content=solution.solution)])
 
+    def _reset_test_runs(self, solution: _Solution) -> _Solution:
+        """Clear the results of the last run of all the tests, so that they are run again on the repaired solution."""
+        solution.tests = [
+            test.model_copy(
+                update={"last_output": "", "critique_of_last_run": "", "result": "unknown"}
+            )
+            for test in solution.tests
+        ]
+        return solution
+
     def _retry(self, solution: _Solution) -> Literal["retry", "end"]:
         max_attempts = max(self.MAX_ATTEMPTS, 1)
         if self._failed_test(solution):
@@ -151,31 +216,58 @@ class IterativeProposer:
 
 class Solver:
 
-    def __init__(self, memory_path: str) -> None:
-        self._recaller = Recaller(os.path.join(memory_path, SOLUTIONS_DIR_NAME))
-        self._proposer = Proposer(memory_path)
-        self._iterator = IterativeProposer(memory_path)
+    def __init__(self, memory_path: str, components: Components | None = None) -> None:
+        """Create the solver. All its parts share the components working with the memory at `memory_path`."""
+        self._components = components or Components(memory_path)
+        self._recaller = self._components.recaller
+        self._index = self._components.solution_index
+        self._proposer = Proposer(memory_path, self._components)
+        self._iterator = IterativeProposer(memory_path, self._components, self._proposer)
         self._construct_graph()
         assert self._graph is not None
+        self._entry_graph: _CompiledStateGraph | None = None
 
     @property
     def graph(self) -> _CompiledStateGraph:
         """Get the solver's compiled graph."""
         return self._graph
 
+    @property
+    def components(self) -> Components:
+        return self._components
+
     @property
     def resource_db(self) -> _ResourceDB:
-        return self._proposer.resource_db
+        return self._components.resource_db
 
     @property
     def solution_db(self) -> _SolutionDB:
-        return self._recaller.solution_db
+        return self._components.solution_db
+
+    @property
+    def solution_index(self) -> _SolutionIndex:
+        return self._index
+
+    @property
+    def entry_graph(self) -> _CompiledStateGraph:
+        """Get the graph solving a task given as a plain text. It is compiled on first use and then reused."""
+        if self._entry_graph is None:
+            self._entry_graph = self._compile_entry_graph()
+        return self._entry_graph
 
     def invoke(self, task: str) -> AIMessage:
-        """Build an ad-hoc graph to solve a task."""
+        """Solve a task using the precompiled entry graph."""
+        return self.entry_graph.invoke({"messages": [HumanMessage(content=task)]})["messages"][-1]
+
+    async def ainvoke(self, task: str) -> AIMessage:
+        """Solve a task asynchronously, so that multiple tasks can be solved concurrently."""
+        result = await self.entry_graph.ainvoke({"messages": [HumanMessage(content=task)]})
+        return result["messages"][-1]
+
+    def _compile_entry_graph(self) -> _CompiledStateGraph:
         builder = _StateGraph(_State)
 
-        builder.add_node("parse_task", task_parser)
+        builder.add_node("parse_task", _node(task_parser, atask_parser), input=_State)
         builder.add_node("solve", self._graph, input=_Solution)
         builder.add_node("print_solution", self._print_solution, input=_Solution)
 
@@ -183,9 +275,7 @@ class Solver:
         builder.add_edge("parse_task", "solve")
         builder.add_edge("solve", "print_solution")
         builder.add_edge("print_solution", END)
-
-        graph = builder.compile()
-        return graph.invoke({"messages": [HumanMessage(content=task)]})["messages"][-1]
+        return builder.compile()
 
     def print_graph_png(self, path: str, name: str = "solver") -> None:
         with open(os.path.join(path, name.rstrip(".png") + ".png"), "wb") as f:
@@ -193,13 +283,22 @@ class Solver:
 
     def _construct_graph(self) -> None:
         builder = _StateGraph(_Solution)
-        builder.add_node("get_requirements", get_requirements)
-        builder.add_node("recall", self._recaller.recall, input=_Solution)
-        builder.add_node("add_tests", get_tests, input=_Solution)
+        builder.add_node("look_up", _node(self._look_up, self._alook_up), input=_Solution)
+        builder.add_node(
+            "get_requirements", _node(get_requirements, aget_requirements), input=_Solution
+        )
+        builder.add_node(
+            "recall", _node(self._recaller.recall, self._recaller.arecall), input=_Solution
+        )
+        builder.add_node("add_tests", _node(get_tests, aget_tests), input=_Solution)
         builder.add_node("propose_new", self._proposer.graph, input=_Solution)
         builder.add_node("validate_and_improve", self._iterator.graph, input=_Solution)
+        builder.add_node("remember", _node(self._remember, self._aremember), input=_Solution)
 
-        builder.add_edge(START, "get_requirements")
+        builder.add_edge(START, "look_up")
+        builder.add_conditional_edges(
+            "look_up", self._exact_or_new, {"exact": END, "new": "get_requirements"}
+        )
         builder.add_edge("get_requirements", "recall")
         builder.add_conditional_edges(
             "recall",
@@ -208,8 +307,41 @@ class Solver:
         )
         builder.add_edge("add_tests", "propose_new")
         builder.add_edge("propose_new", "validate_and_improve")
-        builder.add_edge("validate_and_improve", END)
+        builder.add_edge("validate_and_improve", "remember")
+        builder.add_edge("remember", END)
         self._graph = builder.compile()
 
+    def _look_up(self, solution: _Solution) -> _Solution:
+        """Return the validated solution of the exactly same task, if there is any. Otherwise, return the task
+        with the key, under which its solution will be stored after the validation."""
+        key = self._index.key(solution)
+        stored = self._index.get(key)
+        if stored is None:
+            solution.index_key = key
+            return solution
+        stored.task, stored.context = solution.task, solution.context
+        stored.index_key = key
+        return stored
+
+    async def _alook_up(self, solution: _Solution) -> _Solution:
+        """Asynchronous version of `_look_up`. The index is queried in a separate thread."""
+        return await asyncio.to_thread(self._look_up, solution)
+
+    def _exact_or_new(self, solution: _Solution) -> Literal["exact", "new"]:
+        return "exact" if solution.solution else "new"
+
+    def _remember(self, solution: _Solution) -> _Solution:
+        """Store the validated solution in the solution database together with the results of its tests.
+        If it passed all its tests, store it also in the index."""
+        self.solution_db.save(solution)
+        passed = solution.tests and all(test.result == "pass" for test in solution.tests)
+        if solution.index_key and passed:
+            self._index.add(solution.index_key, solution)
+        return solution
+
+    async def _aremember(self, solution: _Solution) -> _Solution:
+        """Asynchronous version of `_remember`. The solution is stored in a separate thread."""
+        return await asyncio.to_thread(self._remember, solution)
+
     def _print_solution(self, solution: _Solution) -> _State:
         return _State(messages=[AIMessage(content=solution.solution)])
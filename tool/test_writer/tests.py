@@ -1,8 +1,8 @@
 import json
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 
+from tool.llm import get_chat_model
 from tool.logs import get_logger
 from tool.models import Solution, Test
 
@@ -34,18 +34,29 @@ Do not write anything else.
 """
 
 
-_model = ChatOpenAI(model="gpt-4o-mini")
+def get_tests(solution: Solution) -> Solution:
+    result = get_chat_model().invoke(_messages(solution))
+    return _add_tests(solution, result)
 
 
-def get_tests(solution: Solution) -> Solution:
+async def aget_tests(solution: Solution) -> Solution:
+    """Asynchronous version of `get_tests`."""
+    result = await get_chat_model().ainvoke(_messages(solution))
+    return _add_tests(solution, result)
+
+
+def _messages(solution: Solution) -> list[BaseMessage]:
     task_str = (
         f"Task: {solution.task}\nContext: {solution.context}\nRequirements: {solution.requirements}"
     )
-    messages = [SystemMessage(content=SOLUTION_REQUIREMENT_PROMPT), HumanMessage(content=task_str)]
-    result = _model.invoke(messages)
+    return [SystemMessage(content=SOLUTION_REQUIREMENT_PROMPT), HumanMessage(content=task_str)]
+
+
+def _add_tests(solution: Solution, result: BaseMessage) -> Solution:
     tests_str = list(json.loads(str(result.content)))
     tests = [Test(description=t, form=solution.form) for t in tests_str]
-    solution.tests.extend(tests)
+    # assigned rather than extended in place, so that the graph state registers the update
+    solution.tests = solution.tests + tests
     logger.info(
         f"Updated tests for solution of task '{solution.task}': {[t.description for t in solution.tests]}"
     )
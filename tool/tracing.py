@@ -0,0 +1,286 @@
+"""Per-node spans of the tool's graphs.
+
+A span covers a single run of a graph node. It records the wall time of the run and the calls to the chat models
+made directly by the node, with the tokens they used, their estimated cost and the number of answers taken
+from the response cache. The spans are collected by the `SpanTracker` callback handler and exported to sinks.
+"""
+
+from __future__ import annotations
+import abc
+import threading
+import time
+from typing import Any, Iterable
+from uuid import UUID
+
+import pydantic
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from tool.llm.cache import CACHE_HIT
+from tool.logs import TOOL_NAME
+
+
+PRICES_PER_MILLION_TOKENS: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+"""Prices of the prompt and completion tokens in USD. Calls of other models are counted with zero cost."""
+
+
+class Span(pydantic.BaseModel):
+    name: str
+    span_id: str
+    parent_id: str | None = None
+    start: float
+    end: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+    cost: float = 0.0
+    error: str | None = None
+
+    @pydantic.computed_field  # type: ignore[prop-decorator]
+    @property
+    def wall_time(self) -> float:
+        return self.end - self.start
+
+
+class SpanSink(abc.ABC):
+    """Receiver of the finished spans."""
+
+    @abc.abstractmethod
+    def export(self, span: Span) -> None:
+        """Export the finished span."""
+
+
+class JsonlSink(SpanSink):
+    """This sink appends each span as a JSON line to the file at `path`."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock, open(self._path, "a") as f:
+            f.write(span.model_dump_json() + "\n")
+
+
+class InMemorySink(SpanSink):
+    """This sink keeps all the spans, e.g. to summarize many runs of the tool."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> str:
+        with self._lock:
+            return format_summary(self.spans)
+
+
+class OpenTelemetrySink(SpanSink):
+    """This sink passes the spans to an OpenTelemetry tracer, by default the global tracer of the tool.
+    It requires the `opentelemetry-api` package. The spans are exported after they end, so they carry the ids
+    of their parents as attributes instead of being nested in the OpenTelemetry trace."""
+
+    def __init__(self, tracer: Any = None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetrySink requires the opentelemetry-api package.") from e
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer(TOOL_NAME)
+
+    def export(self, span: Span) -> None:
+        attributes = span.model_dump(exclude={"name", "start", "end", "error"}, exclude_none=True)
+        otel_span = self._tracer.start_span(
+            span.name, start_time=int(span.start * 1e9), attributes=attributes
+        )
+        if span.error is not None:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end * 1e9))
+
+
+class SpanTracker(BaseCallbackHandler):
+    """This callback handler records a span for each run of a graph node and passes it to the sinks when
+    the run ends. The calls to the chat models are attributed to the closest node they were made from.
+
+    A tracker is meant for a single invocation of a graph, e.g. `graph.invoke(state, {"callbacks": [tracker]})`.
+    The nested graphs are tracked too, as they inherit the callbacks.
+    """
+
+    run_inline = True
+
+    def __init__(self, sinks: Iterable[SpanSink] = ()) -> None:
+        self.spans: list[Span] = []
+        self._sinks = list(sinks)
+        self._open: dict[UUID, Span] = {}
+        self._parents: dict[UUID, UUID | None] = {}
+        self._models: dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name")
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            if not _is_node(name, metadata) or self._runs_function_of_node(parent_run_id, name):
+                return
+            parent = self._closest_span(parent_run_id)
+            self._open[run_id] = Span(
+                name=name,
+                span_id=str(run_id),
+                parent_id=parent.span_id if parent is not None else None,
+                start=time.time(),
+            )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, repr(error))
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            self._models[run_id] = str((metadata or {}).get("ls_model_name", ""))
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],
+        prompts: list[str],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.on_chat_model_start(
+            serialized, prompts, run_id=run_id, parent_run_id=parent_run_id, metadata=metadata
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            span = self._closest_span(self._parents.pop(run_id, None))
+            model = self._models.pop(run_id, "")
+            if span is None:
+                return
+            span.llm_calls += 1
+            for generation in (g for gs in response.generations for g in gs):
+                if (generation.generation_info or {}).get(CACHE_HIT):
+                    span.cache_hits += 1
+                    continue
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    span.prompt_tokens += usage["input_tokens"]
+                    span.completion_tokens += usage["output_tokens"]
+                    span.cost += _cost(model, usage["input_tokens"], usage["output_tokens"])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            self._models.pop(run_id, None)
+
+    def summary(self) -> str:
+        with self._lock:
+            return format_summary(self.spans)
+
+    def _runs_function_of_node(self, parent_run_id: UUID | None, name: str | None) -> bool:
+        """Tell if the run is of the function wrapped by the node of the same name."""
+        return parent_run_id in self._open and self._open[parent_run_id].name == name
+
+    def _closest_span(self, run_id: UUID | None) -> Span | None:
+        while run_id is not None:
+            if run_id in self._open:
+                return self._open[run_id]
+            run_id = self._parents.get(run_id)
+        return None
+
+    def _finish(self, run_id: UUID, error: str | None = None) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return
+            span.end, span.error = time.time(), error
+            self.spans.append(span)
+        for sink in self._sinks:
+            sink.export(span)
+
+
+def _is_node(name: str | None, metadata: dict[str, Any] | None) -> bool:
+    """Tell the runs of the graph nodes from the other runs, e.g. of the conditional edges
+    or of the functions called inside the nodes. The graphs' own start nodes are left out."""
+    return (
+        name is not None
+        and not name.startswith("__")
+        and (metadata or {}).get("langgraph_node") == name
+    )
+
+
+def _cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+def format_summary(spans: Iterable[Span]) -> str:
+    """Summarize the spans by the node names, in the order of the first run of each node.
+
+    The wall times of the nodes running nested graphs include the times of the nested nodes, while the calls
+    to the chat models are counted only for the node making them.
+    """
+    totals: dict[str, dict[str, float]] = {}
+    for span in sorted(spans, key=lambda s: s.start):
+        total = totals.setdefault(span.name, dict.fromkeys(_COLUMNS, 0.0))
+        total["runs"] += 1
+        total["errors"] += span.error is not None
+        for column in _COLUMNS[2:]:
+            total[column] += getattr(span, column)
+    header = f"{'node':<40}" + "".join(f"{c:>18}" for c in _COLUMNS)
+    rows = [
+        f"{name:<40}" + "".join(f"{_format(c, total[c]):>18}" for c in _COLUMNS)
+        for name, total in totals.items()
+    ]
+    return "\n".join([header, *rows])
+
+
+_COLUMNS = (
+    "runs",
+    "errors",
+    "wall_time",
+    "llm_calls",
+    "prompt_tokens",
+    "completion_tokens",
+    "cache_hits",
+    "cost",
+)
+
+
+def _format(column: str, value: float) -> str:
+    if column == "wall_time":
+        return f"{value:.3f} s"
+    if column == "cost":
+        return f"${value:.5f}"
+    return str(int(value))
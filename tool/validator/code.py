@@ -1,12 +1,24 @@
+import ast
+import asyncio
+import hashlib
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Literal
 
 import dotenv
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_experimental.utilities import PythonREPL
+from langchain_core.messages import SystemMessage
 
-from tool.models import Solution, SolutionWithTestsToRun
+from tool.llm import get_chat_model
+from tool.lru_cache import LRUCache as _LRUCache
+from tool.models import Solution, SolutionWithTestsToRun, Test
+from tool.runnables import node as _node
+from tool.validator.critic import (
+    critique_tests as _critique_tests,
+    acritique_tests as _acritique_tests,
+)
+from tool.validator.executor import get_executor as _get_executor
 
 
 dotenv.load_dotenv()
@@ -21,13 +33,12 @@ The tested solution is:
 {solution}
 
 Repond with only a python code wihout any code block marks. The reponse will in plain text contain (in the same order):
-- the pasted solution code,
 - the test code,
 - call of the test code.
 
 Follow these guidelines:
-1) The result must be self-contained and executable in python REPL.
-2) Always place the solution code in front of the test code.
+1) Do not paste the solution code. It will be placed in front of the test code, so that the result is executable in python REPL.
+2) Use only the names of functions and classes defined in the solution, not their implementation details, so that the test code stays valid after the solution is modified.
 3) Add necessary comments explaining the test code. At the end, there must be a print statement printing the test result.
 4) Use ordinary assert statements, avoid using pytest or unittest. Add string after asserted statement to indicate the test description. The string must describe, what was the expected result.
 5) When assesing equality of two floats, allow for a small error margin.
@@ -56,10 +67,17 @@ Do not write anything else.
 
 
 TEXT_TESTER_END = "__text_tester_end__"
+TEST_TIMEOUT = 15
+IMPLEMENTATION_CACHE_SIZE = 1024
 
 
-_model = ChatOpenAI(name="gpt-4o-mini")
-_python_repl = PythonREPL()
+implementation_cache: _LRUCache[str, str] = _LRUCache(IMPLEMENTATION_CACHE_SIZE)
+"""Test code written for a test description and the interface of the tested solution.
+
+The test code does not contain the solution itself, so it can be reused, when the solution implementation changes,
+but the names and signatures of its functions and classes do not. The test code of a failed test is evicted,
+as the test code itself may be wrong.
+"""
 
 
 def prepare_solution_with_tests_to_run(solution: Solution) -> SolutionWithTestsToRun:
@@ -78,26 +96,23 @@ def any_next_test(
     return "end"
 
 
-def return_solution_with_updated_tests(
-    solution_with_next_test: SolutionWithTestsToRun,
-) -> Solution:
-    return SolutionWithTestsToRun.to_solution(solution_with_next_test)
-
-
 def implement_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTestsToRun:
     """Provide the implementation for the selected test identified by its id in the list of all tests.
 
     The implementation is list of questions that will be answered to verify the correctness of the solution.
     """
     assert isinstance(solution_with_next_test, SolutionWithTestsToRun)
-    test_id = list(solution_with_next_test.tests_to_run.keys())[0]
-    assert test_id is not None
-    test = solution_with_next_test.tests_to_run[test_id]
-    prompt = TEST_CODE_WRITER_PROMPT.format(
-        test_description=test.description, solution=solution_with_next_test.solution
-    )
-    response = _model.invoke([SystemMessage(content=prompt)])
-    solution_with_next_test.tests_to_run[test_id].implementation = str(response.content)
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run[0]]
+    _implement(test, solution_with_next_test.solution)
+    return solution_with_next_test
+
+
+async def aimplement_test(
+    solution_with_next_test: SolutionWithTestsToRun,
+) -> SolutionWithTestsToRun:
+    """Asynchronous version of `implement_test`."""
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run[0]]
+    await _aimplement(test, solution_with_next_test.solution)
     return solution_with_next_test
 
 
@@ -106,59 +121,224 @@ def run_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTes
 
     The test is run by asking the questions that were formulated during the implementation phase.
     """
-    test_id = list(solution_with_next_test.tests_to_run.keys())[0]
-    test = solution_with_next_test.tests_to_run.pop(test_id)
-    response = run_python_code(code=test.implementation)
-    solution_with_next_test.run_tests[test_id] = test
-    solution_with_next_test.run_tests[test_id].last_output = response
+    test, code = _next_test_code(solution_with_next_test)
+    test.last_output = run_python_code(code=code)
     return solution_with_next_test
 
 
+async def arun_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTestsToRun:
+    """Asynchronous version of `run_test`. The code runs in a separate thread, not blocking the event loop."""
+    test, code = _next_test_code(solution_with_next_test)
+    test.last_output = await asyncio.to_thread(run_python_code, code=code)
+    return solution_with_next_test
+
+
+def _next_test_code(solution_with_next_test: SolutionWithTestsToRun) -> tuple[Test, str]:
+    """Take the next test to be run and get its code with the solution put in front of it."""
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run.pop(0)]
+    return test, executable_test_code(solution_with_next_test.solution, test)
+
+
+def implement_and_run_tests(
+    solution_with_tests: SolutionWithTestsToRun, max_concurrency: int
+) -> SolutionWithTestsToRun:
+    """Implement and run all the tests, that are yet to be run, at the same time.
+
+    At most `max_concurrency` tests are processed concurrently. The results are stored in place of the tests.
+    """
+    assert max_concurrency > 0, "The concurrency limit must be a positive integer."
+    tests = [(i, solution_with_tests.tests[i]) for i in solution_with_tests.tests_to_run]
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = executor.map(
+            lambda item: _implement_and_run_test(item[1], solution_with_tests.solution), tests
+        )
+        for (test_id, _), test in zip(tests, results):
+            solution_with_tests.tests[test_id] = test
+    solution_with_tests.tests_to_run.clear()
+    return solution_with_tests
+
+
+async def aimplement_and_run_tests(
+    solution_with_tests: SolutionWithTestsToRun, max_concurrency: int
+) -> SolutionWithTestsToRun:
+    """Asynchronous version of `implement_and_run_tests`."""
+    assert max_concurrency > 0, "The concurrency limit must be a positive integer."
+    tests = [(i, solution_with_tests.tests[i]) for i in solution_with_tests.tests_to_run]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def implement_and_run(test: Test) -> Test:
+        async with semaphore:
+            return await _aimplement_and_run_test(test, solution_with_tests.solution)
+
+    results = await asyncio.gather(*(implement_and_run(test) for _, test in tests))
+    for (test_id, _), test in zip(tests, results):
+        solution_with_tests.tests[test_id] = test
+    solution_with_tests.tests_to_run.clear()
+    return solution_with_tests
+
+
+def executable_test_code(solution: str, test: Test) -> str:
+    """Put the solution code in front of the test implementation."""
+    return f"{solution_code(solution)}\n\n\n{test.implementation}"
+
+
+def solution_code(solution: str) -> str:
+    """Get the code of the solution without the code block marks, that the model may have wrapped it in."""
+    code = textwrap.dedent(solution).strip()
+    if code.startswith("```"):
+        code = code.partition("\n")[2]
+    if code.endswith("```"):
+        code = code[:-3]
+    return textwrap.dedent(code).strip()
+
+
+def implementation_key(test_description: str, solution: str) -> str:
+    """Get the key identifying the test code for given test description and the interface of the tested solution."""
+    data = f"{test_description}\n{_solution_interface(solution)}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _implement_and_run_test(test: Test, solution: str) -> Test:
+    _implement(test, solution)
+    test.last_output = run_python_code(code=executable_test_code(solution, test))
+    return test
+
+
+async def _aimplement_and_run_test(test: Test, solution: str) -> Test:
+    await _aimplement(test, solution)
+    code = executable_test_code(solution, test)
+    test.last_output = await asyncio.to_thread(run_python_code, code=code)
+    return test
+
+
+def _implement(test: Test, solution: str) -> None:
+    """Provide the test with a test code. The test code is written only if neither the test, nor the test code cache
+    already contain the code for the test description and the current solution interface."""
+    key, test_code = _cached_implementation(test, solution)
+    if test_code is None:
+        messages = _test_code_messages(test, solution)
+        test_code = str(get_chat_model().invoke(messages).content)
+    _set_implementation(test, key, test_code)
+
+
+async def _aimplement(test: Test, solution: str) -> None:
+    key, test_code = _cached_implementation(test, solution)
+    if test_code is None:
+        messages = _test_code_messages(test, solution)
+        test_code = str((await get_chat_model().ainvoke(messages)).content)
+    _set_implementation(test, key, test_code)
+
+
+def _cached_implementation(test: Test, solution: str) -> tuple[str, str | None]:
+    key = implementation_key(test.description, solution)
+    if test.implementation.strip() and test.implementation_key == key:
+        implementation_cache.add(key, test.implementation)
+    return key, implementation_cache.get(key)
+
+
+def _set_implementation(test: Test, key: str, test_code: str) -> None:
+    implementation_cache.add(key, test_code)
+    test.implementation = test_code
+    test.implementation_key = key
+
+
+def _test_code_messages(test: Test, solution: str) -> list[SystemMessage]:
+    prompt = TEST_CODE_WRITER_PROMPT.format(test_description=test.description, solution=solution)
+    return [SystemMessage(content=prompt)]
+
+
+def _solution_interface(solution: str) -> str:
+    """Get signatures of the top-level functions and classes of the solution. If the solution cannot be parsed,
+    return the whole solution code."""
+    code = solution_code(solution)
+    try:
+        module = ast.parse(code)
+    except SyntaxError:
+        return code
+    signatures = []
+    for node in module.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            signatures.append(f"def {node.name}({ast.unparse(node.args)}){returns}")
+        elif isinstance(node, ast.ClassDef):
+            methods = [
+                n.name for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            signatures.append(f"class {node.name}: {', '.join(methods)}")
+    return "\n".join(signatures)
+
+
 def run_python_code(code: str) -> str:
-    response = _python_repl.run(code, timeout=15)
-    return str(response)
+    return _get_executor().run(code, timeout=TEST_TIMEOUT)
 
 
 def criticize(solution: Solution) -> Solution:
+    """Critique the last run of all the tests, skipping the passed tests that did not change since their last critique.
+    The test code of the failed tests is forgotten, so that it is written again for the next run."""
+    return _forget_implementations_of_failed_tests(
+        _critique_tests(solution, get_chat_model(), CRITIC_PROMPT)
+    )
+
+
+async def acriticize(solution: Solution) -> Solution:
+    solution = await _acritique_tests(solution, get_chat_model(), CRITIC_PROMPT)
+    return _forget_implementations_of_failed_tests(solution)
+
+
+def _forget_implementations_of_failed_tests(solution: Solution) -> Solution:
+    """Evict the test code of the failed tests from the cache and from the tests. A test may fail, because its code
+    is wrong, and the same code would be reused for every repair of the solution keeping its interface.
+    """
     for test in solution.tests:
-        query = (
-            f"Solution: {solution.solution}\nTest description: {test.description}\n"
-            f"Test implementation: {test.implementation}\nTest result: {test.last_output}"
-        )
-        response = _model.invoke(
-            [SystemMessage(content=CRITIC_PROMPT), HumanMessage(content=query)]
-        )
-        test.critique_of_last_run = str(response.content)
-        if "TEST_PASSED" in response.content:
-            test.result = "pass"
-        else:
-            test.result = "fail"
+        if test.result == "fail" and test.implementation_key:
+            implementation_cache.discard(test.implementation_key)
+            test.implementation, test.implementation_key = "", ""
     return solution
 
 
-def get_code_validator_builder() -> StateGraph:
+def get_code_validator_builder(max_concurrency: int = 1) -> StateGraph:
+    """Get the builder of the code validator graph.
+
+    With `max_concurrency` equal to 1, the tests are implemented and run one by one. Otherwise, all the tests
+    are implemented and run at the same time, with at most `max_concurrency` tests being processed concurrently.
+    """
     builder = StateGraph(Solution)
     builder.add_node(
         "prepare_solution_with_no_test_to_run_next", prepare_solution_with_tests_to_run
     )
-    builder.add_node("pick_test", pick_test)
-    builder.add_node("implement_next_test", implement_test)
-    builder.add_node("run_test", run_test)
-    builder.add_node("return_solution_with_updated_tests", return_solution_with_updated_tests)
-    builder.add_node("critic", criticize)
-
+    builder.add_node("critic", _node(criticize, acriticize), input=Solution)
     builder.add_edge(START, "prepare_solution_with_no_test_to_run_next")
+    builder.add_edge("critic", END)
+
+    if max_concurrency > 1:
+        builder.add_node(
+            "implement_and_run_tests",
+            _node(
+                partial(implement_and_run_tests, max_concurrency=max_concurrency),
+                partial(aimplement_and_run_tests, max_concurrency=max_concurrency),
+            ),
+            input=SolutionWithTestsToRun,
+        )
+        builder.add_edge("prepare_solution_with_no_test_to_run_next", "implement_and_run_tests")
+        builder.add_edge("implement_and_run_tests", "critic")
+        return builder
+
+    builder.add_node("pick_test", pick_test)
+    builder.add_node(
+        "implement_next_test",
+        _node(implement_test, aimplement_test),
+        input=SolutionWithTestsToRun,
+    )
+    builder.add_node("run_test", _node(run_test, arun_test), input=SolutionWithTestsToRun)
     builder.add_edge("prepare_solution_with_no_test_to_run_next", "pick_test")
     builder.add_conditional_edges(
         "pick_test",
         any_next_test,
         path_map={
-            "end": "return_solution_with_updated_tests",
+            "end": "critic",
             "next_test": "implement_next_test",
         },
     )
     builder.add_edge("implement_next_test", "run_test")
     builder.add_edge("run_test", "pick_test")
-    builder.add_edge("return_solution_with_updated_tests", "critic")
-    builder.add_edge("critic", END)
     return builder
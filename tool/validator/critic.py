@@ -0,0 +1,103 @@
+from __future__ import annotations
+import hashlib
+import json
+
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from langchain_core.runnables import Runnable
+
+from tool.logs import get_logger
+from tool.lru_cache import LRUCache as _LRUCache
+from tool.models import Solution as _Solution, Test as _Test
+
+
+logger = get_logger()
+
+
+CRITIC_MAX_CONCURRENCY = 8
+CRITIQUE_CACHE_SIZE = 1024
+
+
+class CritiqueCache(_LRUCache[str, str]):
+    """This class stores critiques of passed tests, so that a test is not critiqued again, when neither the solution,
+    nor the test implementation and its output changed. At most `maxsize` most recently used critiques are kept.
+    """
+
+    def __init__(self, maxsize: int = CRITIQUE_CACHE_SIZE) -> None:
+        super().__init__(maxsize)
+
+    def get_critique(self, solution: str, test: _Test) -> str | None:
+        """Return the critique of the passed test with identical solution, implementation and output, if there is any."""
+        return self.get(self.key(solution, test))
+
+    def add_critique(self, solution: str, test: _Test) -> None:
+        """Store the critique of the test. Only critiques of passed tests are stored."""
+        if test.result == "pass":
+            self.add(self.key(solution, test), test.critique_of_last_run)
+
+    @staticmethod
+    def key(solution: str, test: _Test) -> str:
+        data = [test.form, solution, test.description, test.implementation, test.last_output]
+        return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+critique_cache = CritiqueCache()
+
+
+def critique_tests(solution: _Solution, model: Runnable, prompt: str) -> _Solution:
+    """Critique the last run of all the tests of the solution and decide, whether they passed or failed.
+
+    Tests found in the critique cache keep their cached verdict. The remaining tests are critiqued in a single batch
+    of at most `CRITIC_MAX_CONCURRENCY` concurrent requests.
+    """
+    cached, tests_to_critique, queries = _queries(solution, prompt)
+    responses = model.batch(queries, config={"max_concurrency": CRITIC_MAX_CONCURRENCY})
+    return _apply_critiques(solution, cached, tests_to_critique, responses)
+
+
+async def acritique_tests(solution: _Solution, model: Runnable, prompt: str) -> _Solution:
+    """Asynchronous version of `critique_tests`."""
+    cached, tests_to_critique, queries = _queries(solution, prompt)
+    responses = await model.abatch(queries, config={"max_concurrency": CRITIC_MAX_CONCURRENCY})
+    return _apply_critiques(solution, cached, tests_to_critique, responses)
+
+
+def _queries(
+    solution: _Solution, prompt: str
+) -> tuple[list[str | None], list[_Test], list[list[BaseMessage]]]:
+    cached = [critique_cache.get_critique(solution.solution, test) for test in solution.tests]
+    tests_to_critique = [test for test, critique in zip(solution.tests, cached) if critique is None]
+    queries: list[list[BaseMessage]] = [
+        [
+            SystemMessage(content=prompt),
+            HumanMessage(
+                content=f"Solution: {solution.solution}\nTest description: {test.description}\n"
+                f"Test implementation: {test.implementation}\nTest result: {test.last_output}"
+            ),
+        ]
+        for test in tests_to_critique
+    ]
+    return cached, tests_to_critique, queries
+
+
+def _apply_critiques(
+    solution: _Solution,
+    cached: list[str | None],
+    tests_to_critique: list[_Test],
+    responses: list[BaseMessage],
+) -> _Solution:
+    for test, response in zip(tests_to_critique, responses):
+        test.critique_of_last_run = str(response.content)
+        if "TEST_PASSED" in response.content:
+            test.result = "pass"
+        else:
+            test.result = "fail"
+        critique_cache.add_critique(solution.solution, test)
+    for test, critique in zip(solution.tests, cached):
+        if critique is not None:
+            test.critique_of_last_run = critique
+            test.result = "pass"
+    logger.debug(
+        f"Critiqued {len(tests_to_critique)} out of {len(solution.tests)} tests, "
+        f"the rest was found in the critique cache. Critique cache: {critique_cache.stats()}"
+    )
+    return solution
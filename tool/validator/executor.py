@@ -0,0 +1,199 @@
+from __future__ import annotations
+import abc
+import atexit
+import json
+import os
+import queue
+import select
+import signal
+import subprocess
+import sys
+import threading
+
+from tool.logs import get_logger
+
+
+logger = get_logger()
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+TIMEOUT_MESSAGE = "Execution timed out"
+
+
+class CodeExecutor(abc.ABC):
+    """This class represents a backend running the Python code of the tests."""
+
+    @abc.abstractmethod
+    def run(self, code: str, timeout: float) -> str:
+        """Run the code and return its printed output or representation of the raised error."""
+
+    def close(self) -> None:
+        """Release all resources held by the executor."""
+
+
+class ReplExecutor(CodeExecutor):
+    """This executor runs the code using a single shared PythonREPL from langchain_experimental."""
+
+    def __init__(self) -> None:
+        from langchain_experimental.utilities import PythonREPL
+
+        self._repl = PythonREPL()
+
+    def run(self, code: str, timeout: float) -> str:
+        return str(self._repl.run(code, timeout=int(timeout)))
+
+
+class _WorkerDied(Exception):
+    pass
+
+
+class _Worker:
+    """A warm Python process running the sandbox worker script."""
+
+    def __init__(self, memory_limit: int) -> None:
+        self._process = subprocess.Popen(
+            [sys.executable, "-I", "-u", WORKER_SCRIPT, str(memory_limit)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        self.runs = 0
+
+    def run(self, code: str, cpu_time_limit: float, timeout: float) -> str:
+        assert self._process.stdin is not None and self._process.stdout is not None
+        self.runs += 1
+        try:
+            request = json.dumps({"code": code, "cpu_time_limit": cpu_time_limit})
+            self._process.stdin.write(request + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise _WorkerDied(self._process.poll()) from e
+        ready, _, _ = select.select([self._process.stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError
+        line = self._process.stdout.readline()
+        if not line:
+            raise _WorkerDied(self._process.wait())
+        return json.loads(line)["output"]
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        for stream in (self._process.stdin, self._process.stdout):
+            if stream is not None:
+                stream.close()
+
+
+class SandboxedPool(CodeExecutor):
+    """This executor runs the code in a pool of warm worker processes, each of them running a single code at a time.
+
+    Every run has its CPU time and memory limited. A worker, that exceeds the limits or the timeout, is killed and
+    replaced by a new one without blocking the other workers. A worker is also replaced after `max_runs_per_worker` runs.
+    If no worker becomes available within `acquire_timeout` seconds, the run raises `RuntimeError`.
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        cpu_time_limit: float = 15,
+        memory_limit: int = 512 * 1024**2,
+        max_runs_per_worker: int = 50,
+        acquire_timeout: float = 600,
+    ) -> None:
+        self._size = size or os.cpu_count() or 1
+        self._cpu_time_limit = cpu_time_limit
+        self._memory_limit = memory_limit
+        self._max_runs_per_worker = max_runs_per_worker
+        self._acquire_timeout = acquire_timeout
+        # an empty slot (None) is filled with a new worker by the next run taking it
+        self._idle: queue.SimpleQueue[_Worker | None] = queue.SimpleQueue()
+        self._workers: set[_Worker] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self._size):
+            self._idle.put(self._new_worker())
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def run(self, code: str, timeout: float) -> str:
+        if self._closed:
+            raise RuntimeError("The executor is closed.")
+        try:
+            worker = self._idle.get(timeout=self._acquire_timeout)
+        except queue.Empty:
+            raise RuntimeError(
+                f"No worker became available within {self._acquire_timeout} s."
+            ) from None
+        # the slot is returned even if a new worker cannot be started, so that the pool does not shrink
+        try:
+            if worker is None:
+                worker = self._new_worker()
+            try:
+                output = worker.run(code, self._cpu_time_limit, timeout)
+            except TimeoutError:
+                output = TIMEOUT_MESSAGE
+                worker = self._retire(worker)
+            except _WorkerDied as e:
+                output = self._death_message(e.args[0])
+                worker = self._retire(worker)
+            except BaseException:
+                worker = self._retire(worker)
+                raise
+            else:
+                if worker.runs >= self._max_runs_per_worker:
+                    worker = self._retire(worker)
+            if worker is None:
+                worker = self._new_worker()
+            return output
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, set()
+        for worker in workers:
+            worker.close()
+
+    def _new_worker(self) -> _Worker:
+        worker = _Worker(self._memory_limit)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker) -> None:
+        with self._lock:
+            self._workers.discard(worker)
+        worker.close()
+
+    def _death_message(self, returncode: int | None) -> str:
+        if returncode == -getattr(signal, "SIGXCPU", 0):
+            return f"Execution exceeded the CPU time limit of {self._cpu_time_limit} s"
+        return f"Execution terminated unexpectedly (exit code {returncode})"
+
+
+_executor: CodeExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> CodeExecutor:
+    """Get the executor used for running code tests. The default executor is created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = SandboxedPool() if os.name == "posix" else ReplExecutor()
+            atexit.register(_executor.close)
+        return _executor
+
+
+def set_executor(executor: CodeExecutor) -> None:
+    """Replace the executor used for running code tests. The previous executor is closed."""
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, executor
+    if previous is not None and previous is not executor:
+        previous.close()
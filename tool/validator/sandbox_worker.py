@@ -0,0 +1,70 @@
+"""This script runs inside a worker process of the sandboxed code executor.
+
+It reads requests from its standard input, each being a JSON object on a single line with the code to be run and
+the CPU time limit for the run. For each request, it writes a JSON object with the output of the code on a single line
+to its standard output. The script must not import anything from the `tool` package, so the worker stays lightweight.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+
+def _limit_memory(limit: int) -> None:
+    if resource is None or limit <= 0:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _limit_cpu_time(seconds: float) -> None:
+    """Allow the process to spend at most `seconds` of CPU time from now on. The process is killed by the SIGXCPU
+    signal, when it exceeds the limit."""
+    if resource is None or seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _execute(code: str) -> str:
+    """Run the code with fresh globals and return what it printed. If the code raises, return representation of the error."""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            exec(code, {"__name__": "__main__"})
+        return buffer.getvalue()
+    except (Exception, SystemExit) as e:
+        return repr(e)
+
+
+def main(memory_limit: int) -> None:
+    # The protocol uses duplicates of the standard streams, while the code itself cannot read or write them directly.
+    requests = os.fdopen(os.dup(0), "r")
+    responses = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    _limit_memory(memory_limit)
+    for line in requests:
+        request = json.loads(line)
+        _limit_cpu_time(request["cpu_time_limit"])
+        output = _execute(request["code"])
+        responses.write(json.dumps({"output": output}) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]))
@@ -2,63 +2,29 @@ from __future__ import annotations
 from typing import Literal
 
 import dotenv
-import pydantic
 from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage
 
-from tool.models import Solution as _Solution, Test as _Test
+from tool.llm import get_chat_model
+from tool.models import (
+    Solution as _Solution,
+    SolutionWithTestsToRun as _SolutionWithTestsToRun,
+    Test as _Test,
+)
+from tool.runnables import node as _node
+from tool.validator.critic import (
+    critique_tests as _critique_tests,
+    acritique_tests as _acritique_tests,
+)
 
 
 dotenv.load_dotenv()
 
 
-class SolutionWithTestsToRun(pydantic.BaseModel):
-    task: str
-    context: str
-    requirements: list[str]
+class SolutionWithTestsAndResources(_SolutionWithTestsToRun):
+    """The view of a solution for running the text tests, which are answered with the resources at hand."""
+
     resources: dict[str, str]
-    structure: list[str]
-    tests_to_run: dict[int, _Test]
-    run_tests: dict[int, _Test]
-    proposal_tries: int
-    solution: str
-
-    @staticmethod
-    def fromSolution(solution: _Solution) -> SolutionWithTestsToRun:
-        tests_to_run, run_tests = dict(), dict()
-        for t in solution.tests:
-            if t.critique_of_last_run:
-                run_tests[solution.tests.index(t)] = t
-            else:
-                tests_to_run[solution.tests.index(t)] = t
-        return SolutionWithTestsToRun(
-            task=solution.task,
-            context=solution.context,
-            resources=solution.resources,
-            requirements=solution.requirements,
-            structure=solution.structure,
-            tests_to_run=tests_to_run,
-            run_tests=run_tests,
-            solution=solution.solution,
-            proposal_tries=solution.proposal_tries,
-        )
-
-    @staticmethod
-    def toSolution(solution_with_next_test: SolutionWithTestsToRun) -> _Solution:
-        all_tests = solution_with_next_test.tests_to_run.copy()
-        all_tests.update(solution_with_next_test.run_tests)
-        tests = [all_tests[k] for k in sorted(all_tests.keys())]
-        return _Solution(
-            task=solution_with_next_test.task,
-            requirements=solution_with_next_test.requirements,
-            context=solution_with_next_test.context,
-            resources=solution_with_next_test.resources,
-            structure=solution_with_next_test.structure,
-            tests=tests,
-            solution=solution_with_next_test.solution,
-            proposal_tries=solution_with_next_test.proposal_tries,
-        )
 
 
 QUESTION_FORMULATION_PROMPT = """
@@ -132,83 +98,90 @@ Example of your response:
 TEXT_TESTER_END = "__text_tester_end__"
 
 
-_model = ChatOpenAI(name="gpt-4o-mini")
-
-
-def prepare_solution_with_tests_to_run(solution: _Solution) -> SolutionWithTestsToRun:
-    return SolutionWithTestsToRun.fromSolution(solution)
+def prepare_solution_with_tests_to_run(solution: _Solution) -> _SolutionWithTestsToRun:
+    return _SolutionWithTestsToRun.from_solution(solution)
 
 
-def pick_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTestsToRun:
+def pick_test(solution_with_next_test: _SolutionWithTestsToRun) -> _SolutionWithTestsToRun:
     return solution_with_next_test
 
 
 def any_next_test(
-    solution_with_next_test: SolutionWithTestsToRun,
+    solution_with_next_test: _SolutionWithTestsToRun,
 ) -> Literal["end", "next_test"]:
     if solution_with_next_test.tests_to_run:
         return "next_test"
     return "end"
 
 
-def return_solution_with_updated_tests(
-    solution_with_next_test: SolutionWithTestsToRun,
-) -> _Solution:
-    return SolutionWithTestsToRun.toSolution(solution_with_next_test)
-
-
-def implement_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTestsToRun:
+def implement_test(solution_with_next_test: _SolutionWithTestsToRun) -> _SolutionWithTestsToRun:
     """Provide the implementation for the selected test identified by its id in the list of all tests.
 
     The implementation is list of questions that will be answered to verify the correctness of the solution.
     """
-    assert isinstance(solution_with_next_test, SolutionWithTestsToRun)
-    test_id = list(solution_with_next_test.tests_to_run.keys())[0]
-    assert test_id is not None
-    test = solution_with_next_test.tests_to_run[test_id]
+    assert isinstance(solution_with_next_test, _SolutionWithTestsToRun)
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run[0]]
+    if not test.implementation.strip():
+        response = get_chat_model().invoke(_question_formulation_messages(test))
+        test.implementation = str(response.content)
+    return solution_with_next_test
 
-    if test.implementation.strip():
-        return solution_with_next_test
-    else:
-        prompt = QUESTION_FORMULATION_PROMPT.format(test_description=test.description)
-        response = _model.invoke([SystemMessage(content=prompt)])
-        solution_with_next_test.tests_to_run[test_id].implementation = str(response.content)
-        return solution_with_next_test
+
+async def aimplement_test(
+    solution_with_next_test: _SolutionWithTestsToRun,
+) -> _SolutionWithTestsToRun:
+    """Asynchronous version of `implement_test`."""
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run[0]]
+    if not test.implementation.strip():
+        response = await get_chat_model().ainvoke(_question_formulation_messages(test))
+        test.implementation = str(response.content)
+    return solution_with_next_test
 
 
-def run_test(solution_with_next_test: SolutionWithTestsToRun) -> SolutionWithTestsToRun:
+def run_test(solution_with_next_test: SolutionWithTestsAndResources) -> _SolutionWithTestsToRun:
     """Run the test identified by its id in the list of all tests.
 
     The test is run by asking the questions that were formulated during the implementation phase.
     """
-    test_id = list(solution_with_next_test.tests_to_run.keys())[0]
-    test = solution_with_next_test.tests_to_run.pop(test_id)
+    test, messages = _next_test_run(solution_with_next_test)
+    test.last_output = str(get_chat_model().invoke(messages).content)
+    return solution_with_next_test
+
+
+async def arun_test(
+    solution_with_next_test: SolutionWithTestsAndResources,
+) -> _SolutionWithTestsToRun:
+    """Asynchronous version of `run_test`."""
+    test, messages = _next_test_run(solution_with_next_test)
+    test.last_output = str((await get_chat_model().ainvoke(messages)).content)
+    return solution_with_next_test
+
+
+def _question_formulation_messages(test: _Test) -> list[SystemMessage]:
+    prompt = QUESTION_FORMULATION_PROMPT.format(test_description=test.description)
+    return [SystemMessage(content=prompt)]
+
+
+def _next_test_run(
+    solution_with_next_test: SolutionWithTestsAndResources,
+) -> tuple[_Test, list[SystemMessage]]:
+    """Take the next test to be run and get the messages asking the questions of the test."""
+    test = solution_with_next_test.tests[solution_with_next_test.tests_to_run.pop(0)]
     prompt = TEST_RUNNER_PROMPT.format(
         solution=solution_with_next_test.solution,
         questions=test.implementation,
         resources=solution_with_next_test.resources,
     )
-    response = _model.invoke([SystemMessage(content=prompt)])
-    test.last_output = str(response.content)
-    solution_with_next_test.run_tests[test_id] = test
-    return solution_with_next_test
+    return test, [SystemMessage(content=prompt)]
 
 
 def criticize(solution: _Solution) -> _Solution:
-    for test in solution.tests:
-        query = (
-            f"Solution: {solution.solution}\nTest description: {test.description}\n"
-            f"Test implementation: {test.implementation}\nTest result: {test.last_output}"
-        )
-        response = _model.invoke(
-            [SystemMessage(content=CRITIC_PROMPT), HumanMessage(content=query)]
-        )
-        test.critique_of_last_run = str(response.content)
-        if "TEST_PASSED" in response.content:
-            test.result = "pass"
-        else:
-            test.result = "fail"
-    return solution
+    """Critique the last run of all the tests, skipping the passed tests that did not change since their last critique."""
+    return _critique_tests(solution, get_chat_model(), CRITIC_PROMPT)
+
+
+async def acriticize(solution: _Solution) -> _Solution:
+    return await _acritique_tests(solution, get_chat_model(), CRITIC_PROMPT)
 
 
 def get_text_validator_builder() -> StateGraph:
@@ -217,12 +190,15 @@ def get_text_validator_builder() -> StateGraph:
         "prepareSolution_with_no_test_to_run_next", prepare_solution_with_tests_to_run
     )
     text_validator_builder.add_node("pick_test", pick_test)
-    text_validator_builder.add_node("implement_next_test", implement_test)
-    text_validator_builder.add_node("run_test", run_test)
     text_validator_builder.add_node(
-        "returnSolution_with_updated_tests", return_solution_with_updated_tests
+        "implement_next_test",
+        _node(implement_test, aimplement_test),
+        input=_SolutionWithTestsToRun,
+    )
+    text_validator_builder.add_node(
+        "run_test", _node(run_test, arun_test), input=SolutionWithTestsAndResources
     )
-    text_validator_builder.add_node("critic", criticize)
+    text_validator_builder.add_node("critic", _node(criticize, acriticize), input=_Solution)
 
     text_validator_builder.add_edge(START, "prepareSolution_with_no_test_to_run_next")
     text_validator_builder.add_edge("prepareSolution_with_no_test_to_run_next", "pick_test")
@@ -230,12 +206,11 @@ def get_text_validator_builder() -> StateGraph:
         "pick_test",
         any_next_test,
         path_map={
-            "end": "returnSolution_with_updated_tests",
+            "end": "critic",
             "next_test": "implement_next_test",
         },
     )
     text_validator_builder.add_edge("implement_next_test", "run_test")
     text_validator_builder.add_edge("run_test", "pick_test")
-    text_validator_builder.add_edge("returnSolution_with_updated_tests", "critic")
     text_validator_builder.add_edge("critic", END)
     return text_validator_builder
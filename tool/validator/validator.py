@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import dotenv
-from langchain_openai import ChatOpenAI
 
 from tool.models import Solution as _Solution
+from tool.validator.critic import CritiqueCache as _CritiqueCache, critique_cache as _critique_cache
 from tool.validator.validator_graph import get_validator_builder as _get_validator_builder
 
 
@@ -13,16 +13,30 @@ dotenv.load_dotenv()
 class Validator:
     """This class is responsible for looping over solution tests and them."""
 
-    def __init__(self, openai_model: str = "gpt-4o-mini") -> None:
-        self._model = ChatOpenAI(model=openai_model)
+    MAX_TEST_CONCURRENCY = 4
+
+    def __init__(self, max_test_concurrency: int = MAX_TEST_CONCURRENCY) -> None:
+        self._max_test_concurrency = max_test_concurrency
         self._compile_graph()
 
+    @property
+    def critique_cache(self) -> _CritiqueCache:
+        """Get the cache of critiques of passed tests shared by the validators, including its hit and miss counters."""
+        return _critique_cache
+
     def _compile_graph(self) -> None:
-        builder = _get_validator_builder()
+        builder = _get_validator_builder(self._max_test_concurrency)
         self._graph = builder.compile()
 
     def review(self, solution: _Solution) -> _Solution:
-        result = self._graph.invoke(solution.model_dump(), {"recursion_limit": 50})
-        for key, value in result.items():
-            setattr(solution, key, value)
+        """Run and critique the tests of the solution. The solution is passed to the graph without copying
+        and only its tests are updated."""
+        result = self._graph.invoke(dict(solution), {"recursion_limit": 50})
+        solution.tests = result["tests"]
+        return solution
+
+    async def areview(self, solution: _Solution) -> _Solution:
+        """Asynchronous version of `review`."""
+        result = await self._graph.ainvoke(dict(solution), {"recursion_limit": 50})
+        solution.tests = result["tests"]
         return solution
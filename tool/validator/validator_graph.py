@@ -15,10 +15,16 @@ def decide_test_form(solution: _Solution) -> str:
     return "test_text"
 
 
-def get_validator_builder() -> StateGraph:
+def get_validator_builder(max_test_concurrency: int = 1) -> StateGraph:
+    """Get the builder of the validator graph.
+
+    The `max_test_concurrency` argument limits the number of code tests, that are implemented and run at the same time.
+    """
     validator_builder = StateGraph(_Solution)
     validator_builder.add_node("test_text", _get_text_validator_builder().compile())
-    validator_builder.add_node("test_code", _get_code_validator_builder().compile())
+    validator_builder.add_node(
+        "test_code", _get_code_validator_builder(max_test_concurrency).compile()
+    )
 
     validator_builder.add_conditional_edges(
         START,